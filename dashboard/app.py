@@ -3,8 +3,9 @@ from __future__ import annotations
 from pathlib import Path
 import streamlit as st
 
-from src.storage.match_db import list_matches, get_match, list_artifacts
+from src.storage.match_db import list_matches, get_match, list_artifacts, list_stage_metrics
 from src.config.settings import PROJECT_ROOT, DATA_DIR
+from src.utils.instrument import summarize_stage_metrics
 from src.utils.io import read_json
 
 def safe_exists(p: Path) -> bool:
@@ -225,6 +226,36 @@ if meta_path.exists():
 else:
     st.info("meta/meta.json not found yet (pipeline may not have run).")
 
+# ---- Stage metrics ----
+st.subheader("Stage metrics (latest run)")
+stage_rows = list_stage_metrics(match_id=selected_match_id, last_runs=1)
+if stage_rows:
+    st.caption(f"Run {stage_rows[0]['run_id']} started {stage_rows[0]['started_at']}")
+    st.dataframe(
+        [
+            {
+                "stage": r["stage"],
+                "status": "cached" if r["cached"] else r["status"],
+                "wall_s": r["wall_s"],
+                "cpu_s": r["cpu_s"],
+                "cpu_approx": r["cpu_approx"],
+                "peak_rss_mb": r["peak_rss_mb"],
+                "items": ", ".join(f"{v} {k}" for k, v in r["items"].items()),
+                "per_s": ", ".join(
+                    f"{round(v / r['wall_s'], 1)} {k}" for k, v in r["items"].items()
+                ) if r["wall_s"] else "",
+            }
+            for r in stage_rows
+        ],
+        use_container_width=True,
+    )
+    st.bar_chart({"wall_s": {r["stage"]: r["wall_s"] for r in stage_rows if not r["cached"]}})
+    with st.expander(f"All stages on court {match['court_id']} (latest 20 runs)"):
+        court_rows = list_stage_metrics(court_id=match["court_id"], last_runs=20)
+        st.dataframe(summarize_stage_metrics(court_rows), use_container_width=True)
+else:
+    st.info("No stage metrics yet (recorded by run-match).")
+
 # ---- Calibration ----
 st.subheader("Calibration (calibration/homography.json)")
 if calib_path.exists():
@@ -1,5 +1,5 @@
 """
-CLI entry: calibrate-court, ingest-match, run-match, daily-check.
+CLI entry: calibrate-court, ingest-match, run-match, daily-check, worker, enqueue-match.
 Uses: pipeline/match_runner, court/registry, video/ingest.
 """
 from __future__ import annotations
@@ -130,6 +130,8 @@ def cmd_ingest_match(args: argparse.Namespace) -> None:
     add_artifact(match_id, "RAW_MERGED", str(match_mp4), status="READY", size_bytes=match_mp4.stat().st_size)
     update_match(match_id, state="FINALIZED", ended_at=utcnow_iso())
     print(f"FINALIZED {match_id} -> {output_dir_str}")
+    from src.storage.jobs import enqueue_job
+    enqueue_job(match_id)  # picked up by a running `worker` right away
 
     # Ask to define court points (manual calibration) for this court
     try:
@@ -194,20 +196,131 @@ def cmd_run_match(args: argparse.Namespace) -> None:
         track_iou=getattr(args, "iou", 0.5),
         track_tracker=getattr(args, "tracker", None),
         track_detection_model=getattr(args, "detection_model", None),
+        track_backend=getattr(args, "backend", "torch"),
+        track_imgsz=getattr(args, "imgsz", 640),
+        track_skip_decode=not getattr(args, "full_decode", False),
+        track_batch_size=getattr(args, "batch_size", 1),
+        track_threaded=getattr(args, "threaded", False),
+        track_roi_crop=getattr(args, "roi_crop", False),
+        track_roi_crop_margin=getattr(args, "roi_crop_margin", None),
+        track_detection_cache=getattr(args, "detection_cache", False),
+        track_motion_gate=getattr(args, "motion_gate", False),
+        track_motion_threshold=getattr(args, "motion_threshold", None),
+        track_motion_max_carry=getattr(args, "motion_max_carry", None),
+        track_decoder=getattr(args, "decoder", "opencv"),
+        track_decode_scale=not getattr(args, "decode_full_res", False),
+        track_flow=getattr(args, "flow", False),
+        track_cascade=getattr(args, "cascade", False),
+        track_cascade_fast_model=getattr(args, "cascade_fast_model", None),
+        track_decode_process=getattr(args, "decode_process", False),
+        track_workers=getattr(args, "workers", 1),
+        track_checkpoint_every_s=getattr(args, "checkpoint_every", 60.0),
+        track_tracks_format=getattr(args, "tracks_format", "jsonl"),
+        track_profile=getattr(args, "profile_stage02", False),
+        track_profile_stacks=getattr(args, "profile_stacks", False),
+        interpolate_max_gap=getattr(args, "interpolate_max_gap", 0),
+        interpolate_method=getattr(args, "interpolate_method", "linear"),
+        force=getattr(args, "force", False),
     )
     print(f"Highlights: {path}")
 
 
 def cmd_daily_check(args: argparse.Namespace) -> None:
-    """daily-check: process all FINALIZED matches (controller loop one-shot)."""
-    from src.storage.match_db import list_matches_by_state
+    """
+    daily-check: process all FINALIZED matches (controller loop one-shot).
+    Goes through the job queue (storage/jobs.py) like `worker --once`: matches are claimed under a lease,
+    so overlapping cron runs never process the same match. Runs share this process's YOLO model pool,
+    so only the first match pays model load + warm-up.
+    --streams N runs up to N matches at once in this process: one copy of the weights behind the
+    shared detection service, frames of concurrent matches batched together, one tracker per match.
+    """
+    from src.pipeline.worker import run_worker
     ensure_dirs()
     init_db()
-    for m in list_matches_by_state("FINALIZED"):
-        try:
-            run_match(m["match_id"])
-        except Exception as e:
-            print(f"FAILED {m['match_id']}: {e}")
+    counts = run_worker(concurrency=max(1, getattr(args, "streams", 1)), once=True)
+    print(f"daily-check: {counts['done']} done, {counts['retried']} to retry, {counts['failed']} failed")
+
+
+def cmd_worker(args: argparse.Namespace) -> None:
+    """
+    worker: long-running daemon. Claims queued matches (new FINALIZED matches are queued on every poll)
+    and processes up to --concurrency at once with warm models. Start several on one machine or on
+    machines sharing courtflow.db. SIGINT/SIGTERM stops claiming and waits for running matches.
+    """
+    import signal
+    import threading
+    from src.pipeline.worker import run_worker
+    ensure_dirs()
+    init_db()
+    stop = threading.Event()
+
+    def _stop(signum, _frame):
+        print("Stopping after the running matches (signal again to abort)...")
+        stop.set()
+        signal.signal(signum, signal.SIG_DFL)
+
+    signal.signal(signal.SIGINT, _stop)
+    signal.signal(signal.SIGTERM, _stop)
+    counts = run_worker(
+        concurrency=max(1, args.concurrency),
+        once=args.once,
+        poll_s=args.poll,
+        lease_s=args.lease,
+        backoff_s=args.backoff,
+        stop=stop,
+    )
+    print(f"worker: {counts['done']} done, {counts['retried']} to retry, {counts['failed']} failed")
+
+
+def cmd_enqueue_match(args: argparse.Namespace) -> None:
+    """enqueue-match: queue (or re-queue) a match for the workers, optionally with a higher priority."""
+    from src.storage.jobs import enqueue_job
+    init_db()
+    job_id = enqueue_job(args.match_id, priority=args.priority, max_attempts=args.max_attempts)
+    if job_id is None:
+        print(f"{args.match_id} already has a queued or running job (priority raised to at least {args.priority}).")
+    else:
+        print(f"Queued job {job_id} for {args.match_id} (priority {args.priority}).")
+
+
+def _fmt_items(items: dict, unit: str = "") -> str:
+    return ", ".join(f"{v} {k}{unit}" for k, v in items.items()) or "-"
+
+
+def cmd_stats(args: argparse.Namespace) -> None:
+    """
+    stats: per-stage wall/CPU time, peak RSS and throughput recorded by run-match. With --match_id the
+    stages of that match's latest run, otherwise a per-stage summary over the latest runs.
+    """
+    from src.storage.match_db import list_stage_metrics
+    from src.utils.instrument import summarize_stage_metrics
+    init_db()
+    rows = list_stage_metrics(match_id=args.match_id, court_id=args.court_id, last_runs=1 if args.match_id else args.last)
+    if not rows:
+        print("No stage metrics recorded yet (run-match records them).")
+        return
+    if args.match_id:
+        print(f"{args.match_id}, run {rows[0]['run_id']} ({rows[0]['started_at']}):")
+        print(f"{'stage':<18} {'status':<7} {'wall s':>8} {'cpu s':>8} {'rss MB':>8}  items")
+        for r in rows:
+            status = "cached" if r["cached"] else r["status"]
+            rss = "-" if r["peak_rss_mb"] is None else f"{r['peak_rss_mb']:.0f}"
+            rate = {k: round(v / r["wall_s"], 1) for k, v in r["items"].items()} if r["wall_s"] else {}
+            items = _fmt_items(r["items"]) + (f" ({_fmt_items(rate, '/s')})" if rate else "")
+            cpu = f"{'~' if r['cpu_approx'] else ''}{r['cpu_s']:.2f}"
+            print(f"{r['stage']:<18} {status:<7} {r['wall_s']:>8.2f} {cpu:>8} {rss:>8}  {items}")
+        if any(r["cpu_approx"] for r in rows):
+            print("~ CPU includes child processes that may belong to a stage running at the same time")
+        return
+    runs = len({r["run_id"] for r in rows})
+    print(f"Latest {runs} run(s){f' on court {args.court_id}' if args.court_id else ''}; cached stages excluded:")
+    print(f"{'stage':<18} {'runs':>5} {'failed':>6} {'p50 s':>8} {'p95 s':>8} {'cpu s':>8} {'max MB':>8}  throughput")
+    for s in summarize_stage_metrics(rows):
+        rss = "-" if s["peak_rss_max_mb"] is None else f"{s['peak_rss_max_mb']:.0f}"
+        print(
+            f"{s['stage']:<18} {s['runs']:>5} {s['failed']:>6} {s['wall_p50_s']:>8.2f} {s['wall_p95_s']:>8.2f} "
+            f"{s['cpu_mean_s']:>8.2f} {rss:>8}  {_fmt_items(s['items_per_s'], '/s')}"
+        )
 
 
 def cmd_upload_match(args: argparse.Namespace) -> None:
@@ -256,17 +369,66 @@ def main() -> None:
     p_run.add_argument("--clip_len", type=float, default=12.0)
     p_run.add_argument("--every", type=float, default=60.0)
     p_run.add_argument("--max_clips", type=int, default=10)
+    p_run.add_argument("--force", action="store_true", help="Rerun every stage, even those whose inputs are unchanged since their last run")
     p_run.add_argument("--sample_every", type=int, default=5, help="Track every N frames")
     p_run.add_argument("--conf", type=float, default=0.4, help="Detection confidence threshold")
     p_run.add_argument("--iou", type=float, default=0.5, help="NMS IoU threshold")
-    p_run.add_argument("--tracker", default=None, help="Tracker config e.g. bytetrack.yaml (default: BoT-SORT)")
+    p_run.add_argument("--tracker", default=None, help="Tracker config e.g. bytetrack.yaml (default: BoT-SORT), or courtflow for the built-in NumPy tracker")
     p_run.add_argument("--detection-model", dest="detection_model", default=None, help="Path to custom YOLO .pt weights (trained model); overrides COURTFLOW_DETECTION_MODEL; if unset uses pretrained")
+    p_run.add_argument("--backend", default="torch", choices=["torch", "onnx", "openvino"], help="Detection backend; onnx/openvino export the weights once and cache the export (CPU nodes)")
+    p_run.add_argument("--imgsz", type=int, default=640, help="Input size used when exporting for --backend onnx/openvino")
+    p_run.add_argument("--full-decode", dest="full_decode", action="store_true", help="Decode every frame (default: grab() over unsampled frames, decode only the ones sent to YOLO)")
+    p_run.add_argument("--batch-size", dest="batch_size", type=int, default=1, help="Sampled frames per batched YOLO predict (tracker updated per frame in order); 1 = per-frame model.track")
+    p_run.add_argument("--threaded", action="store_true", help="Overlap decode, inference and post-processing in stage 02 (bounded queues)")
+    p_run.add_argument("--roi-crop", dest="roi_crop", action="store_true", help="Run YOLO on the court ROI bounding box (+ margin) instead of the full frame")
+    p_run.add_argument("--roi-crop-margin", dest="roi_crop_margin", type=int, default=None, help="Pixels added around the ROI box for --roi-crop (default 120)")
+    p_run.add_argument("--detection-cache", dest="detection_cache", action="store_true", help="Cache raw detections in the match dir and replay them on reruns with the same video, weights and detection settings (for tuning tracker / ROI settings)")
+    p_run.add_argument("--motion-gate", dest="motion_gate", action="store_true", help="Skip YOLO on sampled frames where the court ROI barely changed and reuse the previous detections")
+    p_run.add_argument("--motion-threshold", dest="motion_threshold", type=float, default=None, help="Fraction of ROI pixels that must change to run YOLO with --motion-gate (default 0.002)")
+    p_run.add_argument("--motion-max-carry", dest="motion_max_carry", type=int, default=None, help="Max consecutive sampled frames --motion-gate may skip (default 6)")
+    p_run.add_argument("--decoder", default="opencv", choices=["opencv", "ffmpeg"], help="Stage 02 frame source; ffmpeg decodes multithreaded, drops unsampled frames and downscales to --imgsz before frames reach Python")
+    p_run.add_argument("--decode-full-res", dest="decode_full_res", action="store_true", help="With --decoder ffmpeg, keep frames at native resolution instead of scaling them to --imgsz")
+    p_run.add_argument("--flow", action="store_true", help="Emit tracked positions for every frame: YOLO on every --sample_every-th frame, boxes carried by optical flow in between (YOLO again where flow loses a player)")
+    p_run.add_argument("--cascade", action="store_true", help="Detect with a fast pretrained model first and re-run --detection-model (e.g. best.pt) only on frames where the fast result looks unreliable")
+    p_run.add_argument("--cascade-fast-model", dest="cascade_fast_model", default=None, help="Fast first-tier model for --cascade (default yolo26n.pt)")
+    p_run.add_argument("--decode-process", dest="decode_process", action="store_true", help="Decode stage 02 frames in a separate process that hands them over through a shared-memory ring (no frame copies between processes)")
+    p_run.add_argument("--workers", type=int, default=1, help="Track N time segments of the video in parallel processes (IDs stitched across segments)")
+    p_run.add_argument("--checkpoint-every", dest="checkpoint_every", type=float, default=60.0, help="Flush stage 02 tracks + checkpoint every N seconds of video; a rerun resumes from it (0 = off)")
+    p_run.add_argument("--tracks-format", dest="tracks_format", default="jsonl", choices=["jsonl", "binary"], help="On-disk format records are streamed to during stage 02 before tracks.json is finalized")
+    p_run.add_argument("--profile-stage02", dest="profile_stage02", action="store_true", help="Rerun stage 02 timing decode, inference, tracker, ROI filter, record building and output per frame; p50/p95/p99 go to logs/stage02_profile.json")
+    p_run.add_argument("--profile-stacks", dest="profile_stacks", action="store_true", help="Also sample stage 02 stacks every 10 ms into logs/stage02_stacks.folded for a flamegraph (flamegraph.pl / speedscope); implies --profile-stage02")
+    p_run.add_argument("--interpolate-max-gap", dest="interpolate_max_gap", type=int, default=0, help="After tracking, fill each player's missing frames across gaps of up to N frames (records flagged interpolated); 0 = off")
+    p_run.add_argument("--interpolate-method", dest="interpolate_method", default="linear", choices=["linear", "spline"], help="Gap interpolation: linear, or cubic spline through neighbouring detections")
     p_run.set_defaults(func=cmd_run_match)
 
     # daily-check
     p_daily = sub.add_parser("daily-check", help="Process all FINALIZED matches")
+    p_daily.add_argument("--streams", type=int, default=1, help="Matches processed at once in this process, sharing one detector (frames batched across matches)")
     p_daily.set_defaults(func=cmd_daily_check)
 
+    # worker
+    p_work = sub.add_parser("worker", help="Daemon: process queued matches as soon as they are finalized")
+    p_work.add_argument("--concurrency", type=int, default=1, help="Matches processed at once in this worker (shared detector when > 1)")
+    p_work.add_argument("--once", action="store_true", help="Exit when no job is due instead of waiting for new ones")
+    p_work.add_argument("--poll", type=float, default=5.0, help="Seconds between queue polls when idle")
+    p_work.add_argument("--lease", type=float, default=300.0, help="Job lease in seconds (heartbeat every lease/3); a dead worker's jobs are reclaimed after it")
+    p_work.add_argument("--backoff", type=float, default=60.0, help="Retry delay after the first failed attempt, doubled per attempt")
+    p_work.set_defaults(func=cmd_worker)
+
+    # enqueue-match
+    p_enq = sub.add_parser("enqueue-match", help="Queue a match for the workers")
+    p_enq.add_argument("--match_id", required=True)
+    p_enq.add_argument("--priority", type=int, default=0, help="Higher runs first")
+    p_enq.add_argument("--max_attempts", type=int, default=3)
+    p_enq.set_defaults(func=cmd_enqueue_match)
+
+    # stats
+    p_stats = sub.add_parser("stats", help="Per-stage time, CPU, peak memory and throughput of run-match")
+    p_stats.add_argument("--match_id", default=None, help="Show this match's latest run")
+    p_stats.add_argument("--court_id", default=None, help="Only matches on this court")
+    p_stats.add_argument("--last", type=int, default=20, help="Summarize the latest N runs")
+    p_stats.set_defaults(func=cmd_stats)
+
     # upload-match (cloud R2)
     p_up = sub.add_parser("upload-match", help="Upload match highlights + report to R2")
     p_up.add_argument("--match_id", default=None, help="Match ID (default: latest)")
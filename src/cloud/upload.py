@@ -9,6 +9,7 @@ from pathlib import Path
 from typing import Optional
 
 from src.config.settings import MATCHES_DIR
+from src.utils.instrument import count
 
 
 def upload_artifact(
@@ -22,7 +23,9 @@ def upload_artifact(
     Requires R2_* env vars (see .env.example).
     """
     from src.cloud.storage_r2 import upload_file
-    return upload_file(file_path, key=key, bucket=bucket)
+    key = upload_file(file_path, key=key, bucket=bucket)
+    count("bytes_uploaded", file_path.stat().st_size)
+    return key
 
 
 def upload_match_artifacts(
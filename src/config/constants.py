@@ -11,6 +11,24 @@ COURT_HEIGHT_M = 20.0  # full length
 # Default padding around court ROI in image (pixels) – for homography/ROI
 DEFAULT_ROI_PADDING_PX = 20
 
+# Margin around the ROI bounding rectangle when cropping frames before inference (pixels);
+# large enough to keep the heads of far-side players standing on the back line
+DEFAULT_ROI_CROP_MARGIN_PX = 120
+
+# Motion gate (stage 02): a sampled frame is only sent to YOLO when at least this fraction of ROI
+# pixels changed by more than MOTION_GATE_PIXEL_DELTA grey levels since the last inferred frame,
+# or after this many consecutive carried-forward frames
+DEFAULT_MOTION_THRESHOLD = 0.002
+DEFAULT_MOTION_MAX_CARRY = 6
+MOTION_GATE_PIXEL_DELTA = 25
+
+# Detector cascade (stage 02): the heavy model re-detects a sampled frame when the fast model does not
+# see this many players inside the ROI, when one of them is below the confidence floor, or when the
+# mean best IoU of the previous frame's boxes against this frame's drops below the IoU floor
+CASCADE_EXPECTED_PLAYERS = 4
+CASCADE_MIN_CONFIDENCE = 0.5
+CASCADE_MIN_IOU = 0.3
+
 # Schema versions for artifacts
 CALIBRATION_SCHEMA_VERSION = "v1"
 REPORT_SCHEMA_VERSION = "phase1_v1"
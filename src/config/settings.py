@@ -30,6 +30,9 @@ MATCHES_DIR = DATA_DIR / "matches"
 # Legacy: global SQLite for match registry + artifacts (optional; can move to Supabase later)
 DB_PATH = Path(os.getenv("COURTFLOW_DB_PATH", str(DATA_DIR / "courtflow.db")))
 
+# Exported detection models (ONNX / OpenVINO), keyed by weights hash + input size
+MODEL_CACHE_DIR = Path(os.getenv("COURTFLOW_MODEL_CACHE_DIR", str(PROJECT_ROOT / "models" / "cache")))
+
 # Defaults for ingest/pipeline
 DEFAULT_FPS = 30
 DEFAULT_VIDEO_BITRATE = "8M"
@@ -8,6 +8,7 @@ from pathlib import Path
 from typing import Any, Dict, List
 
 from src.video.clips import cut_clip, concat_clips, probe_duration
+from src.utils.instrument import count
 from src.utils.io import read_json, write_json_atomic, ensure_dir
 from src.utils.time import now_iso
 
@@ -47,6 +48,7 @@ def export_highlights(
         out_file = clips_dir / f"highlight_{i:03d}.mp4"
         cut_clip(video_path, out_file, float(seg["start"]), float(seg["end"]))
         clip_paths.append(out_file)
+        count("clips")
         exported.append({"file": out_file.name, **seg})
 
     highlights_mp4 = hdir / "highlights.mp4"
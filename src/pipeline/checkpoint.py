@@ -0,0 +1,132 @@
+"""
+Stage 02 checkpoint/resume on top of the streaming track sink (storage/track_sink.py): every
+interval_frames the sink is flushed (fsync) and tracks/checkpoint.json records the last processed
+frame, the sink's durable size and counters, and the byte offset of the resume warm-up window.
+A rerun with the same inputs truncates the sink to that size and resumes after that frame (see
+stage_02_track) instead of starting over; it seeks to the window instead of re-reading the file, so
+recovery time depends on the checkpoint interval, not on match length.
+Uses: storage/track_sink, utils/io.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.storage.track_sink import TrackSink
+from src.utils.io import read_json, write_json_atomic
+from src.utils.time import now_iso
+
+CHECKPOINT_FILENAME = "checkpoint.json"
+
+
+def tracking_fingerprint(video_path: Path, params: Dict[str, Any]) -> str:
+    """Identify a stage 02 run: video file (path, size, mtime) + tracking parameters."""
+    st = video_path.stat()
+    payload = {"video": [str(video_path), st.st_size, int(st.st_mtime)], "params": params}
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class TrackCheckpoint:
+    """
+    Writes frame records to sink and checkpoints it every interval_frames video frames.
+    warmup_frames: how far before the resume frame a rerun restarts tracking (resume_start_frame);
+    the checkpoint stores where that window starts in the sink.
+    """
+
+    def __init__(
+        self,
+        tracks_dir: Path,
+        sink: TrackSink,
+        fingerprint: str,
+        *,
+        interval_frames: int,
+        warmup_frames: int = 0,
+    ):
+        self.tracks_dir = tracks_dir
+        self.sink = sink
+        self.sink.index_frames = True
+        self.fingerprint = fingerprint
+        self.interval_frames = max(1, int(interval_frames))
+        self.warmup_frames = max(0, int(warmup_frames))
+        self.last_frame = -1
+        self._last_flushed_frame = -1
+        self._window: Optional[List[int]] = None  # [first frame, byte offset] of the resume warm-up window
+
+    @property
+    def checkpoint_path(self) -> Path:
+        return self.tracks_dir / CHECKPOINT_FILENAME
+
+    def load(self) -> int:
+        """
+        Restore a previous checkpoint for the same fingerprint and return the frame to resume at
+        (0 when there is nothing to resume; any stale sink file is then discarded). Records written
+        after the last checkpoint are truncated away.
+        """
+        ckpt = None
+        if self.checkpoint_path.exists() and self.sink.path.exists():
+            try:
+                ckpt = read_json(self.checkpoint_path)
+            except (OSError, ValueError):
+                ckpt = None
+        if not ckpt or ckpt.get("fingerprint") != self.fingerprint:
+            self.sink.discard()
+            return 0
+        window = ckpt.get("window")
+        self.sink.truncate(
+            int(ckpt.get("sink_bytes", 0)),
+            state=ckpt.get("sink_state"),
+            mark=tuple(window) if window else None,
+        )
+        self._window = window
+        self.last_frame = self._last_flushed_frame = int(ckpt.get("last_frame", -1))
+        return self.last_frame + 1
+
+    def add(self, frame_idx: int, records: List[dict]) -> None:
+        """Add one processed frame's records; checkpoints when interval_frames have passed since the last one."""
+        self.sink.write(records)
+        self.last_frame = frame_idx
+        if frame_idx - self._last_flushed_frame >= self.interval_frames:
+            self.flush()
+
+    def flush(self) -> None:
+        """Flush the sink durably, then atomically advance checkpoint.json."""
+        if self.last_frame <= self._last_flushed_frame:
+            return
+        size = self.sink.flush(fsync=True)
+        window_frame = resume_start_frame(self.last_frame + 1, self.warmup_frames)
+        self._window = [window_frame, self.sink.offset_of(window_frame)]
+        self.sink.forget_offsets_before(window_frame)  # later checkpoints only move the window forward
+        write_json_atomic(self.checkpoint_path, {
+            "fingerprint": self.fingerprint,
+            "last_frame": self.last_frame,
+            "sink": self.sink.path.name,
+            "sink_bytes": size,
+            "records": self.sink.records,
+            "sink_state": self.sink.state(),
+            "window": self._window,
+            "updated_at": now_iso(),
+        })
+        self._last_flushed_frame = self.last_frame
+
+    def clear(self) -> None:
+        """Remove the checkpoint once tracks.json has been written."""
+        if self.checkpoint_path.exists():
+            self.checkpoint_path.unlink()
+
+    def next_free_id(self) -> int:
+        return self.sink.max_player_id + 1
+
+    def window(self, from_frame: int) -> List[dict]:
+        """
+        Checkpointed records with frame >= from_frame (used to re-match IDs after the warm-up).
+        Reads from the stored window offset when from_frame is inside it, else from the start.
+        """
+        offset = self._window[1] if self._window and from_frame >= self._window[0] else 0
+        return [r for r in self.sink.iter_records(offset) if r["frame"] >= from_frame]
+
+
+def resume_start_frame(resume_frame: int, warmup_frames: int) -> int:
+    """First frame to track on resume: warmup_frames before the checkpoint so the tracker is re-primed."""
+    return max(0, resume_frame - max(0, warmup_frames))
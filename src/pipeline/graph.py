@@ -0,0 +1,63 @@
+"""
+Minimal task graph for the tail of run_match: each task runs in a thread as soon as the tasks it
+depends on have succeeded, so independent work (OpenCV renders, ffmpeg highlight export, R2 uploads)
+overlaps. The heavy parts release the GIL (cv2 decode/encode, ffmpeg subprocesses, network I/O), so
+threads are enough. A failing task never cancels the others: only the tasks that depend on it are
+skipped, and every outcome is returned.
+Uses: concurrent.futures.
+"""
+from __future__ import annotations
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+
+@dataclass
+class TaskResult:
+    status: str  # "ok" | "failed" | "skipped"
+    result: Any = None
+    error: Optional[BaseException] = None
+
+
+def run_graph(
+    tasks: Dict[str, Tuple[Callable[[], Any], Sequence[str]]],
+    *,
+    max_workers: Optional[int] = None,
+) -> Dict[str, TaskResult]:
+    """
+    Run tasks (name -> (fn, names it depends on)); returns name -> TaskResult. Exceptions are captured
+    per task; a task whose dependency did not succeed is "skipped" with that dependency's error.
+    """
+    for name, (_, deps) in tasks.items():
+        unknown = [d for d in deps if d not in tasks]
+        if unknown:
+            raise ValueError(f"Task {name!r} depends on unknown tasks {unknown}")
+    results: Dict[str, TaskResult] = {}
+    pending = dict(tasks)
+    running: Dict[Any, str] = {}
+    with ThreadPoolExecutor(max_workers=max_workers or len(tasks) or 1, thread_name_prefix="stage") as pool:
+        while pending or running:
+            progress = True
+            while progress:  # a skipped task can settle tasks listed before it
+                progress = False
+                for name, (fn, deps) in list(pending.items()):
+                    failed = next((d for d in deps if d in results and results[d].status != "ok"), None)
+                    if failed is not None:
+                        results[name] = TaskResult("skipped", error=results[failed].error)
+                    elif all(d in results for d in deps):
+                        running[pool.submit(fn)] = name
+                    else:
+                        continue
+                    del pending[name]
+                    progress = True
+            if not running:
+                if pending:  # only reachable with a dependency cycle
+                    raise ValueError(f"Dependency cycle between tasks {sorted(pending)}")
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = running.pop(fut)
+                err = fut.exception()
+                results[name] = TaskResult("ok", fut.result()) if err is None else TaskResult("failed", error=err)
+    return results
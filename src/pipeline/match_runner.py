@@ -1,23 +1,32 @@
 """
-Orchestrates ONCE-PER-MATCH sequential stages (no parallel).
+Orchestrates ONCE-PER-MATCH stages: 01–04 in order, then renders (05), highlight export (06) and
+the R2 uploads concurrently (pipeline/graph.py). Every stage is measured (utils/instrument.py: wall,
+CPU, peak RSS, items); the measurements go to meta.json "stage_metrics" and the stage_metrics table.
 Uses: court/registry, court/calibration/artifacts, video/frames_opencv, vision/*,
-      storage/tracks_db, analytics/report, highlights/export, pipeline/paths, pipeline/stages.
+      storage/tracks_db, analytics/report, highlights/export, pipeline/paths, pipeline/stages,
+      pipeline/stage_cache, pipeline/graph, utils/instrument.
 """
 from __future__ import annotations
 
 import os
+import uuid
 from pathlib import Path
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 from src.config.settings import ensure_dirs
 from src.pipeline.paths import match_dir, ensure_match_dirs
 from src.pipeline import stages
+from src.pipeline.graph import run_graph
+from src.pipeline.stage_cache import StageCache
 from src.storage.match_db import (
     get_match,
     update_match,
     add_artifact,
+    add_stage_metrics,
 )
+from src.utils.instrument import measure
+from src.utils.time import utcnow_iso
 
 
 @dataclass
@@ -36,13 +45,16 @@ def _r2_configured() -> bool:
     )
 
 
-def _upload_to_r2_if_configured(match_id: str) -> None:
-    """Upload match artifacts to R2 when env is set, so the website can show results. Never fails the pipeline."""
+def _upload_to_r2_if_configured(match_id: str, **only) -> None:
+    """
+    Upload match artifacts to R2 when env is set, so the website can show results. Never fails the pipeline.
+    only: upload_match_artifacts flags to leave some artifacts out (e.g. upload_heatmap=False).
+    """
     if not _r2_configured():
         return
     try:
         from src.cloud.upload import upload_match_artifacts
-        result = upload_match_artifacts(match_id)
+        result = upload_match_artifacts(match_id, **only)
         if result.get("keys"):
             print(f"   Uploaded to R2: {result['keys']}")
         else:
@@ -51,6 +63,25 @@ def _upload_to_r2_if_configured(match_id: str) -> None:
         print(f"   R2 upload failed (website may not show this match): {e}")
 
 
+def _record_stage_metrics(
+    out_dir: Path, match_id: str, court_id: str, run_id: str, metrics: List[Dict[str, Any]],
+) -> None:
+    """Write this run's stage measurements to meta.json and the stage_metrics table. Never fails the pipeline."""
+    try:
+        stages.update_meta_fields(out_dir, {"stage_metrics": {
+            "run_id": run_id,
+            "recorded_at": utcnow_iso(),
+            "stages": metrics,
+        }})
+        add_stage_metrics(run_id, match_id, court_id, metrics)
+    except Exception as e:
+        print(f"   Could not record stage metrics: {e}")
+        return
+    ran = [m for m in metrics if not m["cached"]]
+    if ran:
+        print("   Stage times: " + ", ".join(f"{m['stage']} {m['wall_s']}s" for m in ran))
+
+
 def run_match(
     match_id: str,
     cfg: Optional[HighlightConfig] = None,
@@ -60,10 +91,43 @@ def run_match(
     track_iou: float = 0.5,
     track_tracker: Optional[str] = None,
     track_detection_model: Optional[str] = None,
+    track_backend: str = "torch",
+    track_imgsz: int = 640,
+    track_skip_decode: bool = True,
+    track_batch_size: int = 1,
+    track_threaded: bool = False,
+    track_roi_crop: bool = False,
+    track_roi_crop_margin: Optional[int] = None,
+    track_detection_cache: bool = False,
+    track_motion_gate: bool = False,
+    track_motion_threshold: Optional[float] = None,
+    track_motion_max_carry: Optional[int] = None,
+    track_decoder: str = "opencv",
+    track_decode_scale: bool = True,
+    track_flow: bool = False,
+    track_cascade: bool = False,
+    track_cascade_fast_model: Optional[str] = None,
+    track_shared_detector: bool = False,
+    track_decode_process: bool = False,
+    track_workers: int = 1,
+    track_checkpoint_every_s: float = 60.0,
+    track_tracks_format: str = "jsonl",
+    track_profile: bool = False,
+    track_profile_stacks: bool = False,
+    interpolate_max_gap: int = 0,
+    interpolate_method: str = "linear",
+    force: bool = False,
 ) -> Path:
     """
     Run full pipeline for one match: load match from DB, ensure dirs, run stages 01–06,
     register HIGHLIGHTS_MP4 artifact, set state DONE/FAILED.
+    interpolate_max_gap > 0 fills track gaps of up to that many frames after stage 02 (0 = off).
+    Stages whose inputs are unchanged since their last run are skipped (pipeline/stage_cache.py):
+    e.g. a new max_clips only re-exports highlights. force=True reruns every stage.
+    track_profile / track_profile_stacks rerun stage 02 (even when cached) with per-frame latency
+    profiling (logs/stage02_profile.json, see vision/profile.py).
+    Per-stage wall/CPU time, peak RSS and items processed are recorded, also when the run fails
+    (meta.json "stage_metrics", stage_metrics table; `courtflow stats`).
     Returns path to highlights.mp4.
     """
     cfg = cfg or HighlightConfig()
@@ -92,54 +156,150 @@ def run_match(
 
     update_match(match_id, state="PROCESSING")
 
+    court_id = match["court_id"]
+    run_id = uuid.uuid4().hex
+    run_metrics: List[Dict[str, Any]] = []  # appended by the tail threads too (list.append is atomic)
     try:
         stages.ensure_meta_and_report(out_dir, video_path)
         stages.update_meta_status(out_dir, "running")
 
-        print("\n[01] Load calibration")
-        stages.stage_01_load_calibration(out_dir, match["court_id"], video_path)
-        print("\n[02] Player detection + tracking")
-        stages.stage_02_track(
-            out_dir,
-            video_path,
-            match["court_id"],
+        cache = StageCache(out_dir, force=force)
+
+        def _stage(name: str, fn, *, params=None, upstream=(), rerun=False):
+            with measure(name, into=run_metrics) as m:
+                result, ran = cache.run(
+                    name, fn,
+                    version=stages.STAGE_VERSIONS[name],
+                    params=params,
+                    files=stages.stage_input_files(name, out_dir, video_path, court_id),
+                    upstream=upstream,
+                    outputs=stages.STAGE_OUTPUTS[name],
+                    force=rerun,
+                )
+                m.cached = not ran
+            return result, ran
+
+        def _upload(name: str, **only):
+            if not _r2_configured():
+                return
+            with measure(name, into=run_metrics):
+                _upload_to_r2_if_configured(match_id, **only)
+
+        track_params = dict(
             sample_every_n_frames=track_sample_every_n_frames,
             conf=track_conf,
             iou=track_iou,
             tracker=track_tracker,
             detection_model=track_detection_model,
+            backend=track_backend,
+            imgsz=track_imgsz,
+            skip_decode=track_skip_decode,
+            batch_size=track_batch_size,
+            threaded=track_threaded,
+            roi_crop=track_roi_crop,
+            roi_crop_margin=track_roi_crop_margin,
+            detection_cache=track_detection_cache,
+            motion_gate=track_motion_gate,
+            motion_threshold=track_motion_threshold,
+            motion_max_carry=track_motion_max_carry,
+            decoder=track_decoder,
+            decode_scale=track_decode_scale,
+            flow=track_flow,
+            cascade=track_cascade,
+            cascade_fast_model=track_cascade_fast_model,
+            shared_detector=track_shared_detector,
+            decode_process=track_decode_process,
+            workers=track_workers,
+            checkpoint_every_s=track_checkpoint_every_s,
+            tracks_format=track_tracks_format,
+            profile=track_profile,
+            profile_stacks=track_profile_stacks,
+        )
+
+        print("\n[01] Load calibration")
+        _stage("01", lambda: stages.stage_01_load_calibration(out_dir, court_id, video_path), params={"court_id": court_id})
+        print("\n[02] Player detection + tracking")
+        _stage(
+            "02",
+            lambda: stages.stage_02_track(out_dir, video_path, court_id, **track_params),
+            params=stages.tracking_cache_params(track_params),
+            rerun=track_profile or track_profile_stacks,  # a profile needs an actual run
         )
+        tracks_stage = "02"
+        # Also runs (with 0 = strip filled points) when an earlier run interpolated this match's tracks
+        if interpolate_max_gap > 0 or "02b" in cache.records():
+            print("\n[02b] Track gap interpolation")
+            _stage(
+                "02b",
+                lambda: stages.stage_02_interpolate(out_dir, max_gap_frames=interpolate_max_gap, method=interpolate_method),
+                params={"max_gap_frames": interpolate_max_gap, "method": interpolate_method},
+                upstream=("02",),
+            )
+            tracks_stage = "02b"
         print("\n[03] Coordinate mapping")
-        stages.stage_03_map(out_dir, match["court_id"])
+        _stage("03", lambda: stages.stage_03_map(out_dir, court_id), upstream=("01", tracks_stage))
         print("\n[04] Analytics report")
-        stages.stage_04_report(out_dir, match)
-        print("\n[05] Render overlays")
-        stages.stage_05_renders(out_dir, video_path)
-        print("\n[06] Export highlights")
-        highlights_mp4 = stages.stage_06_highlights(
-            out_dir,
-            video_path,
-            clip_len_s=cfg.clip_len_s,
-            every_s=cfg.every_s,
-            max_clips=cfg.max_clips,
+        _stage(
+            "04",
+            lambda: stages.stage_04_report(out_dir, match),
+            params={"match_id": match_id, "court_id": court_id, "video": stages.read_meta(out_dir).get("video")},
+            upstream=("01", "03"),
         )
+        # The tail only needs the report (and the uploads 06's output): renders, highlight export and
+        # uploads run concurrently; a failing task does not cancel the others
+        def _tail_stage(name: str, title: str, fn, **kw):
+            print(f"\n[{name}] {title}")
+            return _stage(name, fn, **kw)[0]
+
+        tail = run_graph({
+            "05": (lambda: _tail_stage(
+                "05", "Render overlays",
+                lambda: stages.stage_05_renders(out_dir, video_path),
+                upstream=("03",),
+            ), ()),
+            "06": (lambda: _tail_stage(
+                "06", "Export highlights",
+                lambda: stages.stage_06_highlights(
+                    out_dir,
+                    video_path,
+                    clip_len_s=cfg.clip_len_s,
+                    every_s=cfg.every_s,
+                    max_clips=cfg.max_clips,
+                ),
+                params={"clip_len_s": cfg.clip_len_s, "every_s": cfg.every_s, "max_clips": cfg.max_clips},
+                upstream=("04",),
+            ), ()),
+            # Auto-upload to R2 when configured so the website can show results. The heatmap is final
+            # after 04; report.json gets the exported highlights in 06, so it goes up with the video.
+            "upload_heatmap": (lambda: _upload(
+                "upload_heatmap", upload_highlights_mp4=False, upload_report=False,
+            ), ()),
+            "upload_highlights": (lambda: _upload("upload_highlights", upload_heatmap=False), ("06",)),
+        })
+
+        highlights_mp4 = tail["06"].result or out_dir / stages.STAGE_OUTPUTS["06"][0]
+        if tail["06"].status == "ok":
+            add_artifact(
+                match_id,
+                "HIGHLIGHTS_MP4",
+                str(highlights_mp4),
+                status="READY",
+                size_bytes=highlights_mp4.stat().st_size if highlights_mp4.exists() else None,
+            )
+        errors = [(name, r.error) for name, r in tail.items() if r.status == "failed"]
+        if len(errors) == 1:
+            raise errors[0][1]
+        if errors:
+            raise RuntimeError("; ".join(f"stage {name} failed: {e}" for name, e in errors))
 
         stages.update_meta_status(out_dir, "pipeline_complete")
-        add_artifact(
-            match_id,
-            "HIGHLIGHTS_MP4",
-            str(highlights_mp4),
-            status="READY",
-            size_bytes=highlights_mp4.stat().st_size if highlights_mp4.exists() else None,
-        )
         update_match(match_id, state="DONE")
         print("\n✅ Pipeline finished.")
-
-        # Auto-upload to R2 when configured so the website can show results
-        _upload_to_r2_if_configured(match_id)
-
         return highlights_mp4
 
     except Exception as e:
         update_match(match_id, state="FAILED", last_error=str(e))
         raise
+    finally:
+        if run_metrics:
+            _record_stage_metrics(out_dir, match_id, court_id, run_id, run_metrics)
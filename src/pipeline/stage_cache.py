@@ -0,0 +1,135 @@
+"""
+Stage cache for run_match: each stage's run is identified by a fingerprint of its inputs (stage code
+version, parameters, content hashes of the external files it reads, and the runs of the upstream
+stages whose outputs it reads). The fingerprint is recorded in meta.json "stages" when the stage
+finishes; a rerun skips every stage whose fingerprint still matches and whose outputs still exist.
+Upstream outputs are covered by the upstream run (fingerprint + completed_at), not by hashing them:
+stages that rewrite tracks.json in place (02b, 03) would otherwise invalidate their own inputs. A
+stage that runs again therefore always invalidates the stages below it.
+Uses: utils/io, utils/time.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+from src.utils.io import read_json, write_json_atomic
+from src.utils.time import now_iso
+
+# Files up to this size are hashed in full; larger ones (videos) by size plus head, middle and tail
+# samples of _SAMPLE_BYTES each, so a rerun does not read a multi-GB video just to fingerprint it
+_FULL_HASH_MAX_BYTES = 8 << 20
+_SAMPLE_BYTES = 1 << 20
+
+
+def content_hash(path: Path) -> Optional[str]:
+    """SHA-1 of a file's content (sampled for large files); None when the file does not exist."""
+    path = Path(path)
+    if not path.is_file():
+        return None
+    size = path.stat().st_size
+    h = hashlib.sha1(str(size).encode("ascii"))
+    with path.open("rb") as f:
+        if size <= _FULL_HASH_MAX_BYTES:
+            for chunk in iter(lambda: f.read(_SAMPLE_BYTES), b""):
+                h.update(chunk)
+        else:
+            for offset in (0, (size - _SAMPLE_BYTES) // 2, size - _SAMPLE_BYTES):
+                f.seek(offset)
+                h.update(f.read(_SAMPLE_BYTES))
+    return h.hexdigest()
+
+
+class StageCache:
+    """
+    Fingerprints and records of one match's stages (meta/meta.json "stages": stage -> fingerprint,
+    version, completed_at, outputs). force=True runs every stage anyway (records are still refreshed,
+    so later cached runs see what is actually on disk).
+    """
+
+    def __init__(self, match_dir: Path, *, force: bool = False):
+        self.match_dir = match_dir
+        self.meta_path = match_dir / "meta" / "meta.json"
+        self.force = force
+        self._lock = threading.Lock()  # stages may finish concurrently (run_match tail)
+
+    def records(self) -> Dict[str, Dict[str, Any]]:
+        meta = read_json(self.meta_path) if self.meta_path.exists() else {}
+        return dict(meta.get("stages") or {})
+
+    def _save(self, stage: str, record: Optional[Dict[str, Any]]) -> None:
+        with self._lock:
+            meta = read_json(self.meta_path) if self.meta_path.exists() else {}
+            recs = dict(meta.get("stages") or {})
+            if record is None:
+                recs.pop(stage, None)
+            else:
+                recs[stage] = record
+            meta["stages"] = recs
+            meta["last_updated_at"] = now_iso()
+            write_json_atomic(self.meta_path, meta)
+
+    def fingerprint(
+        self,
+        *,
+        version: int,
+        params: Dict[str, Any],
+        files: Iterable[Path],
+        upstream: Sequence[str],
+    ) -> str:
+        recs = self.records()
+        payload = {
+            "version": version,
+            "params": params,
+            "files": {str(p): content_hash(p) for p in files},
+            "upstream": {
+                name: [recs[name].get("fingerprint"), recs[name].get("completed_at")] if name in recs else None
+                for name in upstream
+            },
+        }
+        return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def is_fresh(self, stage: str, fingerprint: str) -> bool:
+        """Recorded with this fingerprint and every output it produced is still there."""
+        rec = self.records().get(stage)
+        if not rec or rec.get("fingerprint") != fingerprint:
+            return False
+        return all((self.match_dir / rel).exists() for rel in rec.get("outputs", []))
+
+    def run(
+        self,
+        stage: str,
+        fn: Callable[[], Any],
+        *,
+        version: int,
+        params: Optional[Dict[str, Any]] = None,
+        files: Iterable[Path] = (),
+        upstream: Sequence[str] = (),
+        outputs: Sequence[str] = (),
+        force: bool = False,
+    ) -> Tuple[Any, bool]:
+        """
+        Run fn() unless the stage is fresh; return (fn's result or None, ran). outputs: paths relative to
+        the match dir the stage writes; those that exist afterwards must still exist for a later skip.
+        force=True runs this stage even when fresh (e.g. to profile it).
+        """
+        fp = self.fingerprint(version=version, params=params or {}, files=files, upstream=upstream)
+        if not (self.force or force) and self.is_fresh(stage, fp):
+            rec = self.records()[stage]
+            print(f"   ✓ Up to date (inputs unchanged since {rec.get('completed_at')}); skipped.")
+            return None, False
+        self._save(stage, None)  # an interrupted run must not leave the previous record valid
+        t0 = time.perf_counter()
+        result = fn()
+        self._save(stage, {
+            "fingerprint": fp,
+            "version": version,
+            "completed_at": now_iso("milliseconds"),
+            "duration_s": round(time.perf_counter() - t0, 3),
+            "outputs": [rel for rel in outputs if (self.match_dir / rel).exists()],
+        })
+        return result, True
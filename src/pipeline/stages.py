@@ -7,6 +7,7 @@ from __future__ import annotations
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+from src.utils.instrument import count
 from src.utils.io import read_json, write_json
 from src.utils.time import now_iso
 from src.domain.models import CalibrationHomography
@@ -43,6 +44,11 @@ def ensure_meta_and_report(match_dir: Path, video_path: Path) -> None:
         write_json(report_path, {"created_at": now_iso(), "highlights": []})
 
 
+def read_meta(match_dir: Path) -> Dict[str, Any]:
+    meta_path = _meta_path(match_dir)
+    return read_json(meta_path) if meta_path.exists() else {}
+
+
 def update_meta_status(match_dir: Path, status: str) -> None:
     meta = read_json(_meta_path(match_dir))
     meta["status"] = status
@@ -50,6 +56,79 @@ def update_meta_status(match_dir: Path, status: str) -> None:
     write_json(_meta_path(match_dir), meta)
 
 
+def update_meta_fields(match_dir: Path, fields: Dict[str, Any]) -> None:
+    """Merge top-level fields into meta/meta.json (e.g. per-stage run counters)."""
+    meta_path = _meta_path(match_dir)
+    meta = read_json(meta_path) if meta_path.exists() else {}
+    meta.update(fields)
+    meta["last_updated_at"] = now_iso()
+    write_json(meta_path, meta)
+
+
+# Stage cache declarations (pipeline/stage_cache.py). Bump a stage's version when its output changes
+# for the same inputs (logic fix, new fields), so cached outputs are redone on the next run.
+STAGE_VERSIONS: Dict[str, int] = {"01": 1, "02": 1, "02b": 1, "03": 1, "04": 1, "05": 1, "06": 1}
+
+# Files each stage writes (relative to the match dir); a cached stage is only skipped while they exist
+STAGE_OUTPUTS: Dict[str, tuple] = {
+    "01": ("calibration/homography.json",),
+    "02": ("tracks/tracks.json",),
+    "02b": ("tracks/tracks.json",),
+    "03": ("tracks/tracks.json",),
+    "04": ("reports/report.json",),
+    "05": ("renders/track_overlay_preview.mp4",),
+    "06": ("highlights/highlights.mp4",),
+}
+
+# Stage 02 parameters that change speed or memory but not tracks.json
+_TRACK_PERF_PARAMS = ("batch_size", "threaded", "detection_cache", "shared_detector", "decode_process",
+                      "checkpoint_every_s", "tracks_format", "profile", "profile_stacks")
+
+
+def stage_input_files(stage: str, match_dir: Path, video_path: Path, court_id: str) -> List[Path]:
+    """
+    External files a stage reads, content-hashed into its fingerprint. Outputs of earlier stages
+    (tracks.json, the match calibration, report.json) are covered by the upstream stages' runs instead.
+    """
+    from src.court.calibration.roi import ROI_POLYGON_FILENAME
+    from src.pipeline.paths import court_calibration_dir, court_config_path
+
+    court_calib = court_calibration_dir(court_id)
+    if stage == "01":
+        return [video_path, court_calib / "homography.json", court_calib / ROI_POLYGON_FILENAME]
+    if stage == "02":
+        return [
+            video_path,
+            court_config_path(court_id),
+            match_dir / "calibration" / ROI_POLYGON_FILENAME,
+            court_calib / ROI_POLYGON_FILENAME,
+        ]
+    if stage in ("03", "04"):
+        return [court_calib / "homography.json"]  # fallback when stage 01 left no match calibration
+    if stage in ("05", "06"):
+        return [video_path]
+    return []
+
+
+def tracking_cache_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Stage 02 fingerprint parameters: stage_02_track kwargs minus speed-only ones, plus the identity of
+    the weights (file hash, so replacing best.pt re-tracks) and the installed ultralytics version.
+    """
+    from importlib.metadata import PackageNotFoundError, version
+    from src.vision.detection.yolo import DEFAULT_PRETRAINED, model_identity
+
+    out = {k: v for k, v in params.items() if k not in _TRACK_PERF_PARAMS}
+    out["detection_model"] = model_identity(params.get("detection_model"))
+    if params.get("cascade"):
+        out["cascade_fast_model"] = model_identity(params.get("cascade_fast_model") or DEFAULT_PRETRAINED)
+    try:
+        out["ultralytics"] = version("ultralytics")
+    except PackageNotFoundError:
+        out["ultralytics"] = None
+    return out
+
+
 def stage_01_load_calibration(match_dir: Path, court_id: str, video_path: Path) -> None:
     """
     Per-match calibration flow: manual once per court, then light auto-check per match.
@@ -100,6 +179,14 @@ def stage_01_load_calibration(match_dir: Path, court_id: str, video_path: Path)
     save_homography(match_calib_dir / "homography.json", calib)
 
 
+def _video_fps(video_path: Path) -> float:
+    import cv2
+    cap = cv2.VideoCapture(str(video_path))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.release()
+    return float(fps)
+
+
 def stage_02_track(
     match_dir: Path,
     video_path: Path,
@@ -110,9 +197,44 @@ def stage_02_track(
     iou: float = 0.5,
     tracker: Optional[str] = None,
     detection_model: Optional[str] = None,
+    backend: str = "torch",
+    imgsz: int = 640,
+    skip_decode: bool = True,
+    batch_size: int = 1,
+    threaded: bool = False,
+    roi_crop: bool = False,
+    roi_crop_margin: Optional[int] = None,
+    detection_cache: bool = False,
+    motion_gate: bool = False,
+    motion_threshold: Optional[float] = None,
+    motion_max_carry: Optional[int] = None,
+    decoder: str = "opencv",
+    decode_scale: bool = True,
+    flow: bool = False,
+    cascade: bool = False,
+    cascade_fast_model: Optional[str] = None,
+    shared_detector: bool = False,
+    decode_process: bool = False,
+    workers: int = 1,
+    checkpoint_every_s: float = 60.0,
+    resume_warmup_s: float = 2.0,
+    tracks_format: str = "jsonl",
+    profile: bool = False,
+    profile_stacks: bool = False,
 ) -> None:
-    """Player detection + tracking -> tracks/tracks.json. Delegates to vision.pipeline (intelligence layer)."""
-    from src.utils.io import write_json_atomic_any
+    """
+    Player detection + tracking -> tracks/tracks.json. Delegates to vision.pipeline (intelligence layer).
+    Records are streamed to tracks/tracks.partial.<jsonl|bin> (tracks_format) as frames are processed
+    and finalized into tracks.json at the end, so memory stays flat on long matches.
+    Every checkpoint_every_s of video the partial file is fsynced and the last processed frame recorded
+    in tracks/checkpoint.json. A rerun with the same video and parameters resumes after that frame,
+    re-priming the tracker on the preceding resume_warmup_s and re-matching IDs there.
+    checkpoint_every_s=0 disables checkpointing (also off with workers > 1).
+    profile: write per-frame latency percentiles of decode, inference, tracker, ROI filter, record
+    building and output to logs/stage02_profile.json (vision/profile.py); profile_stacks also samples
+    the stage 02 threads' stacks into logs/stage02_stacks.folded (flamegraph input).
+    """
+    from src.storage.track_sink import open_track_sink
     from src.vision.pipeline import run_tracking
 
     tracks_dir = match_dir / "tracks"
@@ -124,21 +246,192 @@ def stage_02_track(
         print("   (skip) Video not found; empty tracks.")
         return
 
-    tracks = run_tracking(
-        video_path, court_id, match_dir,
+    params: Dict[str, Any] = dict(
         sample_every_n_frames=sample_every_n_frames,
         conf=conf,
         iou=iou,
         tracker=tracker,
         detection_model=detection_model,
+        backend=backend,
+        imgsz=imgsz,
+        skip_decode=skip_decode,
+        batch_size=batch_size,
+        threaded=threaded,
+        roi_crop=roi_crop,
+        roi_crop_margin=roi_crop_margin,
+        detection_cache=detection_cache,
+        motion_gate=motion_gate,
+        motion_threshold=motion_threshold,
+        motion_max_carry=motion_max_carry,
+        decoder=decoder,
+        decode_scale=decode_scale,
+        flow=flow,
+        cascade=cascade,
+        cascade_fast_model=cascade_fast_model,
+        shared_detector=shared_detector,
+        decode_process=decode_process,
     )
-    write_json_atomic_any(tracks_file, tracks)
-    if not tracks:
+    stats: Dict[str, Any] = {}
+    prof = None
+    if profile or profile_stacks:
+        from src.vision.profile import Stage02Profile
+        prof = Stage02Profile(sample_stacks=profile_stacks)
+    sink = open_track_sink(tracks_dir, tracks_format)
+    ckpt = None
+    if checkpoint_every_s > 0 and workers <= 1:
+        from src.pipeline.checkpoint import TrackCheckpoint, resume_start_frame, tracking_fingerprint
+        from src.vision.tracking.stitch import StreamStitcher
+        fps = _video_fps(video_path)
+        fingerprint = tracking_fingerprint(video_path, {
+            **{k: v for k, v in params.items() if k not in ("batch_size", "threaded", "detection_cache")},
+            "tracks_format": tracks_format,
+        })
+        ckpt = TrackCheckpoint(
+            tracks_dir, sink, fingerprint,
+            interval_frames=int(checkpoint_every_s * fps),
+            warmup_frames=int(resume_warmup_s * fps),
+        )
+        resume_frame = ckpt.load()
+        start_frame = 0
+        stitcher = None
+        if resume_frame > 0:
+            start_frame = resume_start_frame(resume_frame, int(resume_warmup_s * fps))
+            stitcher = StreamStitcher(ckpt.window(start_frame), resume_frame, next_free_id=ckpt.next_free_id())
+            stats["resumed_from_frame"] = resume_frame
+            print(f"   Resuming from checkpoint at frame {resume_frame} ({sink.records} points kept)")
+
+        def _on_frame(frame_idx: int, records: List[dict]) -> None:
+            if stitcher is not None:
+                records = stitcher.feed(frame_idx, records)
+                if frame_idx < resume_frame:
+                    return
+            ckpt.add(frame_idx, records)
+
+        run_tracking(
+            video_path, court_id, match_dir,
+            start_frame=start_frame,
+            on_frame=_on_frame,
+            stats=stats,
+            profile=prof,
+            **params,
+        )
+        ckpt.flush()
+    else:
+        # Also with workers > 1: stitched segments are streamed in from the worker processes' files
+        sink.discard()
+        run_tracking(
+            video_path, court_id, match_dir,
+            workers=workers,
+            on_frame=lambda _idx, records: sink.write(records),
+            stats=stats,
+            profile=prof,
+            **params,
+        )
+    n_points, n_frames, n_players = sink.records, sink.frames, len(sink.player_ids)
+    count("frames", stats.get("frames_decoded", 0))
+    count("track_points", n_points)
+    sink.finalize(tracks_file)
+    if ckpt is not None:
+        ckpt.clear()
+    if stats:
+        update_meta_fields(match_dir, {"tracking": stats})
+        print(
+            f"   Frames decoded: {stats.get('frames_decoded', 0)}, "
+            f"skipped: {stats.get('frames_skipped', 0)}, inferred: {stats.get('frames_inferred', 0)}"
+            + (f", from detection cache: {stats['frames_from_cache']}" if "frames_from_cache" in stats else "")
+            + (f", motion-skipped: {stats['frames_motion_skipped']}" if "frames_motion_skipped" in stats else "")
+        )
+        if "frames_flow_propagated" in stats:
+            print(
+                f"   Optical flow: {stats['frames_flow_propagated']} frames propagated, "
+                f"{stats['frames_flow_redetected']} re-detected after flow lost a box"
+            )
+        if "cascade_frames" in stats:
+            print(
+                f"   Cascade: heavy model on {stats['cascade_heavy_frames']} of {stats['cascade_frames']} frames "
+                f"({round(100 * stats['cascade_heavy_fraction'])}%; reasons {stats['cascade_heavy_reasons']})"
+            )
+        if "decode_size" in stats:
+            print(f"   Decoded with {stats.get('decoder')}, scaled to {stats['decode_size'][0]}x{stats['decode_size'][1]}")
+        if "frame_transport" in stats:
+            print(
+                f"   Decoded in a separate process via {stats['frame_transport']} "
+                f"({stats['frame_transport_slots']} slots of {stats['frame_transport_frame_bytes']} bytes; "
+                f"{stats['frame_transport_bytes_copied_per_frame']} bytes copied per frame)"
+            )
+        if "model_load_s" in stats:
+            source = "reused from process pool" if stats.get("model_pooled") else "loaded + warmed up"
+            print(f"   Model {source} in {stats['model_load_s']}s")
+        if "roi_crop_xyxy" in stats:
+            print(
+                f"   ROI crop {stats['roi_crop_xyxy']} "
+                f"({round(100 * stats.get('roi_crop_pixel_fraction', 1.0))}% of frame pixels per inference)"
+            )
+    if prof is not None:
+        _write_stage02_profile(match_dir, prof, params, workers, stats)
+    if not n_points:
         print("   (skip) Vision deps missing (pip install ultralytics) or no detections; empty tracks.")
     else:
-        n_players = len(set(t["player_id"] for t in tracks))
-        n_frames = len(set(t["frame"] for t in tracks))
-        print(f"   ✓ Tracked {len(tracks)} points from {n_frames} frames ({n_players} players).")
+        print(f"   ✓ Tracked {n_points} points from {n_frames} frames ({n_players} players).")
+
+
+def _write_stage02_profile(
+    match_dir: Path, prof: Any, params: Dict[str, Any], workers: int, stats: Dict[str, Any],
+) -> None:
+    """logs/stage02_profile.json (+ logs/stage02_stacks.folded with stack sampling) and a summary line per step."""
+    logs_dir = match_dir / "logs"
+    logs_dir.mkdir(parents=True, exist_ok=True)
+    report = {
+        "created_at": now_iso(),
+        "config": {
+            **{k: params[k] for k in ("decoder", "batch_size", "threaded", "decode_process", "tracker", "backend", "imgsz")},
+            "workers": workers,
+        },
+        "frames_decoded": stats.get("frames_decoded", 0),
+        "frames_inferred": stats.get("frames_inferred", 0),
+        **prof.to_dict(),
+    }
+    if prof.sample_stacks:
+        prof.write_folded(logs_dir / "stage02_stacks.folded")
+        report["stacks_file"] = "logs/stage02_stacks.folded"
+    write_json(logs_dir / "stage02_profile.json", report)
+    for step, s in report["steps"].items():
+        print(f"   Profile {step:<10} p50 {s['p50_ms']:.3f} ms  p95 {s['p95_ms']:.3f} ms  p99 {s['p99_ms']:.3f} ms  ({s['total_s']}s total)")
+    print("   ✓ Wrote logs/stage02_profile.json" + (" and logs/stage02_stacks.folded" if prof.sample_stacks else ""))
+
+
+def stage_02_interpolate(match_dir: Path, *, max_gap_frames: int, method: str = "linear") -> None:
+    """
+    Densify tracks/tracks.json: fill frames between sampled detections of each player (gaps up to
+    max_gap_frames) so overlays and speeds see every frame. Filled records are flagged "interpolated".
+    Runs before stage 03, so filled points get court coordinates like observed ones.
+    max_gap_frames < 2 only removes points filled by an earlier run (interpolation switched off).
+    """
+    from src.utils.io import write_json_atomic_any
+    from src.vision.tracking.interpolate import interpolate_tracks
+
+    tracks_path = match_dir / "tracks" / "tracks.json"
+    if not tracks_path.exists():
+        print("   (skip) No tracks to interpolate.")
+        return
+    tracks = read_json(tracks_path)
+    if not isinstance(tracks, list) or not tracks:
+        print("   (skip) Empty tracks; nothing to interpolate.")
+        return
+    dense = interpolate_tracks(tracks, max_gap_frames=max_gap_frames, method=method)
+    n_filled = sum(1 for r in dense if r.get("interpolated"))
+    count("track_points", len(dense))
+    write_json_atomic_any(tracks_path, dense)
+    update_meta_fields(match_dir, {"interpolation": {
+        "method": method,
+        "max_gap_frames": max_gap_frames,
+        "points_observed": len(dense) - n_filled,
+        "points_interpolated": n_filled,
+    }})
+    if max_gap_frames < 2:
+        print(f"   ✓ Interpolation off; removed {len(tracks) - len(dense)} previously interpolated points.")
+        return
+    print(f"   ✓ Interpolated {n_filled} points ({method}, gaps up to {max_gap_frames} frames); {len(dense)} total.")
 
 
 def stage_03_map(match_dir: Path, court_id: str) -> None:
@@ -163,6 +456,7 @@ def stage_03_map(match_dir: Path, court_id: str) -> None:
         return
     from src.vision.mapping.img_to_court import apply_calibration_to_tracks
     apply_calibration_to_tracks(tracks_data, calib)
+    count("track_points", len(tracks_data))
     write_json_atomic_any(tracks_path, tracks_data)
     print(f"   ✓ Mapped {len(tracks_data)} track points to court coordinates.")
 
@@ -229,6 +523,7 @@ def stage_05_renders(match_dir: Path, video_path: Path) -> None:
         out = draw_tracks_on_frame(frame, tr)
         png_path = renders_dir / f"track_overlay_frame_{fi:05d}.png"
         cv2.imwrite(str(png_path), out)
+        count("frames")
     print(f"   ✓ Wrote {len(samples)} sample images to renders/")
 
     # Short overlay video (first 10 sec or 300 frames)
@@ -251,6 +546,7 @@ def stage_05_renders(match_dir: Path, video_path: Path) -> None:
         tr = by_frame.get(frame_idx, [])
         out = draw_tracks_on_frame(frame, tr)
         writer.write(out)
+        count("frames")
     writer.release()
     cap.release()
     print(f"   ✓ Wrote overlay video: renders/track_overlay_preview.mp4 ({max_overlay_frames} frames)")
@@ -0,0 +1,121 @@
+"""
+Worker daemon: claims run-match jobs from the persistent queue (storage/jobs.py) and runs up to
+concurrency matches at once in this process. Models stay warm between matches (process-level pool,
+vision/detection/registry.py); with concurrency > 1 the matches share one detector through the
+detection service, like daily-check --streams. A heartbeat thread extends the leases of the running
+jobs, so another worker only takes a job over once this process stopped heartbeating (crash, kill).
+Several workers (processes or machines sharing courtflow.db) never run the same job twice.
+Uses: storage/jobs, pipeline/match_runner.
+"""
+from __future__ import annotations
+
+import os
+import socket
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from src.storage.jobs import (
+    DEFAULT_BACKOFF_S,
+    DEFAULT_LEASE_S,
+    claim_job,
+    complete_job,
+    enqueue_finalized_matches,
+    fail_job,
+    heartbeat_job,
+)
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _run_match_job(match_id: str, *, shared_detector: bool) -> Any:
+    from src.pipeline.match_runner import run_match
+    return run_match(match_id, track_shared_detector=shared_detector)
+
+
+def run_worker(
+    *,
+    concurrency: int = 1,
+    once: bool = False,
+    poll_s: float = 5.0,
+    lease_s: float = DEFAULT_LEASE_S,
+    backoff_s: float = DEFAULT_BACKOFF_S,
+    worker_id: Optional[str] = None,
+    stop: Optional[threading.Event] = None,
+    process: Optional[Callable[[str], Any]] = None,
+) -> Dict[str, int]:
+    """
+    Claim and process jobs until stop is set (running jobs are finished first), or, with once=True,
+    until no job is due and none is running. FINALIZED matches without a job are queued on every poll.
+    process(match_id) runs one job (default: run_match); an exception is a failed attempt, retried with
+    backoff (storage/jobs.fail_job). Returns counters: done, retried, failed.
+    """
+    concurrency = max(1, int(concurrency))
+    worker_id = worker_id or default_worker_id()
+    stop = stop or threading.Event()
+    if process is None:
+        def process(match_id: str) -> Any:
+            return _run_match_job(match_id, shared_detector=concurrency > 1)
+    counts = {"done": 0, "retried": 0, "failed": 0}
+    active: Dict[int, Tuple[Dict[str, Any], Future]] = {}
+    lock = threading.Lock()
+    beating = threading.Event()
+
+    def _heartbeat() -> None:
+        while not beating.wait(max(1.0, lease_s / 3)):
+            with lock:
+                job_ids = list(active)
+            for job_id in job_ids:
+                if not heartbeat_job(job_id, worker_id, lease_s=lease_s):
+                    print(f"[worker] Lost the lease on job {job_id}; another worker may take it over.")
+
+    def _settle() -> None:
+        for job_id, (job, fut) in list(active.items()):
+            if not fut.done():
+                continue
+            with lock:
+                del active[job_id]
+            err = fut.exception()
+            if err is None:
+                complete_job(job_id, worker_id)
+                counts["done"] += 1
+                print(f"[worker] Job {job_id} done (match {job['match_id']}).")
+                continue
+            state = fail_job(job_id, worker_id, f"{type(err).__name__}: {err}", backoff_s=backoff_s)
+            if state == "QUEUED":
+                counts["retried"] += 1
+                print(f"[worker] Job {job_id} failed (attempt {job['attempts']}/{job['max_attempts']}); will retry: {err}")
+            else:
+                counts["failed"] += 1
+                print(f"[worker] Job {job_id} failed for good (match {job['match_id']}): {err}")
+
+    heart = threading.Thread(target=_heartbeat, name="job-heartbeat", daemon=True)
+    heart.start()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="match") as pool:
+            while True:
+                _settle()
+                if stop.is_set():
+                    if not active:
+                        break
+                else:
+                    enqueue_finalized_matches()
+                    while len(active) < concurrency:
+                        job = claim_job(worker_id, lease_s=lease_s)
+                        if job is None:
+                            break
+                        print(f"[worker] Claimed job {job['id']} (match {job['match_id']}, attempt {job['attempts']}).")
+                        with lock:
+                            active[job["id"]] = (job, pool.submit(process, job["match_id"]))
+                    if once and not active:
+                        break
+                if active:
+                    wait([fut for _, fut in active.values()], timeout=poll_s, return_when=FIRST_COMPLETED)
+                else:
+                    stop.wait(poll_s)
+    finally:
+        beating.set()
+        heart.join()
+    return counts
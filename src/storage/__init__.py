@@ -8,6 +8,16 @@ from src.storage.match_db import (
     add_artifact,
     list_artifacts,
     upsert_court,
+    add_stage_metrics,
+    list_stage_metrics,
+)
+from src.storage.jobs import (
+    enqueue_job,
+    claim_job,
+    heartbeat_job,
+    complete_job,
+    fail_job,
+    list_jobs,
 )
 
 __all__ = [
@@ -20,4 +30,12 @@ __all__ = [
     "add_artifact",
     "list_artifacts",
     "upsert_court",
+    "add_stage_metrics",
+    "list_stage_metrics",
+    "enqueue_job",
+    "claim_job",
+    "heartbeat_job",
+    "complete_job",
+    "fail_job",
+    "list_jobs",
 ]
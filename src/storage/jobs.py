@@ -0,0 +1,181 @@
+"""
+Persistent job queue in courtflow.db (jobs table, schema in storage/match_db.py): one run-match job per
+match, claimed atomically by workers under a lease. A worker heartbeats to extend its lease; a job
+whose lease expired (worker crashed or was killed) is claimable again. Failures are retried with
+exponential backoff up to max_attempts; higher priority first, then oldest.
+Times are UTC ISO strings (utils/time.utcnow_iso format), so they compare as text.
+Uses: storage/match_db, domain/enums.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from src.domain.enums import JobState, MatchState
+from src.storage.match_db import connect
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_LEASE_S = 300.0
+DEFAULT_BACKOFF_S = 60.0
+
+
+def _iso(offset_s: float = 0.0) -> str:
+    return (datetime.now(timezone.utc) + timedelta(seconds=offset_s)).isoformat(timespec="seconds")
+
+
+def enqueue_job(
+    match_id: str,
+    *,
+    priority: int = 0,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+) -> Optional[int]:
+    """
+    Queue a run-match job for match_id. Returns the job id, or None when the match already has a queued
+    or running job (its priority is raised to priority if lower).
+    """
+    now = _iso()
+    with connect() as conn:
+        cur = conn.execute(
+            """
+            INSERT OR IGNORE INTO jobs (match_id, state, priority, max_attempts, run_after, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (match_id, JobState.QUEUED.value, priority, max(1, max_attempts), now, now, now),
+        )
+        if cur.rowcount:
+            return cur.lastrowid
+        conn.execute(
+            "UPDATE jobs SET priority=?, updated_at=? WHERE match_id=? AND state IN (?, ?) AND priority < ?",
+            (priority, now, match_id, JobState.QUEUED.value, JobState.RUNNING.value, priority),
+        )
+    return None
+
+
+def enqueue_finalized_matches(*, priority: int = 0) -> List[int]:
+    """Queue a job for every FINALIZED match that has never had one (matches ingested before the queue)."""
+    with connect() as conn:
+        rows = conn.execute(
+            """
+            SELECT match_id FROM matches
+            WHERE state=? AND match_id NOT IN (SELECT match_id FROM jobs)
+            ORDER BY created_at ASC
+            """,
+            (MatchState.FINALIZED.value,),
+        ).fetchall()
+    ids = [enqueue_job(r["match_id"], priority=priority) for r in rows]
+    return [i for i in ids if i is not None]
+
+
+def claim_job(worker_id: str, *, lease_s: float = DEFAULT_LEASE_S) -> Optional[Dict[str, Any]]:
+    """
+    Atomically take the next job: QUEUED and due, or RUNNING with an expired lease (its worker died).
+    Expired jobs that used up their attempts are failed instead. Returns the claimed row or None.
+    """
+    now = _iso()
+    conn = connect()
+    try:
+        conn.isolation_level = None
+        conn.execute("BEGIN IMMEDIATE")  # one claimer at a time across processes
+        conn.execute(
+            """
+            UPDATE jobs SET state=?, lease_owner=NULL, lease_expires_at=NULL, updated_at=?,
+                last_error=COALESCE(last_error, 'lease expired')
+            WHERE state=? AND lease_expires_at < ? AND attempts >= max_attempts
+            """,
+            (JobState.FAILED.value, now, JobState.RUNNING.value, now),
+        )
+        row = conn.execute(
+            """
+            SELECT * FROM jobs
+            WHERE (state=? AND run_after <= ?) OR (state=? AND lease_expires_at < ?)
+            ORDER BY priority DESC, created_at ASC, id ASC
+            LIMIT 1
+            """,
+            (JobState.QUEUED.value, now, JobState.RUNNING.value, now),
+        ).fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        conn.execute(
+            """
+            UPDATE jobs SET state=?, attempts=attempts + 1, lease_owner=?, lease_expires_at=?,
+                heartbeat_at=?, updated_at=?
+            WHERE id=?
+            """,
+            (JobState.RUNNING.value, worker_id, _iso(lease_s), now, now, row["id"]),
+        )
+        job = dict(conn.execute("SELECT * FROM jobs WHERE id=?", (row["id"],)).fetchone())
+        conn.execute("COMMIT")
+        return job
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def heartbeat_job(job_id: int, worker_id: str, *, lease_s: float = DEFAULT_LEASE_S) -> bool:
+    """Extend the lease. False when worker_id no longer holds the job (lease expired and reclaimed)."""
+    now = _iso()
+    with connect() as conn:
+        cur = conn.execute(
+            "UPDATE jobs SET lease_expires_at=?, heartbeat_at=?, updated_at=? WHERE id=? AND lease_owner=? AND state=?",
+            (_iso(lease_s), now, now, job_id, worker_id, JobState.RUNNING.value),
+        )
+    return cur.rowcount == 1
+
+
+def complete_job(job_id: int, worker_id: str) -> bool:
+    """Mark the job DONE (only by the worker holding it)."""
+    now = _iso()
+    with connect() as conn:
+        cur = conn.execute(
+            """
+            UPDATE jobs SET state=?, lease_owner=NULL, lease_expires_at=NULL, last_error=NULL, updated_at=?
+            WHERE id=? AND lease_owner=? AND state=?
+            """,
+            (JobState.DONE.value, now, job_id, worker_id, JobState.RUNNING.value),
+        )
+    return cur.rowcount == 1
+
+
+def fail_job(job_id: int, worker_id: str, error: str, *, backoff_s: float = DEFAULT_BACKOFF_S) -> Optional[str]:
+    """
+    Record a failed attempt: back to QUEUED after backoff_s * 2^(attempts - 1), or FAILED once
+    max_attempts is reached. Returns the new state, or None when worker_id no longer holds the job.
+    """
+    now = _iso()
+    with connect() as conn:
+        row = conn.execute(
+            "SELECT attempts, max_attempts FROM jobs WHERE id=? AND lease_owner=? AND state=?",
+            (job_id, worker_id, JobState.RUNNING.value),
+        ).fetchone()
+        if row is None:
+            return None
+        retry = row["attempts"] < row["max_attempts"]
+        state = JobState.QUEUED.value if retry else JobState.FAILED.value
+        delay = backoff_s * 2 ** max(0, row["attempts"] - 1) if retry else 0.0
+        conn.execute(
+            """
+            UPDATE jobs SET state=?, run_after=?, lease_owner=NULL, lease_expires_at=NULL, last_error=?, updated_at=?
+            WHERE id=?
+            """,
+            (state, _iso(delay), error[:2000], now, job_id),
+        )
+    return state
+
+
+def get_job(job_id: int) -> Optional[Dict[str, Any]]:
+    with connect() as conn:
+        row = conn.execute("SELECT * FROM jobs WHERE id=?", (job_id,)).fetchone()
+    return dict(row) if row else None
+
+
+def list_jobs(state: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+    with connect() as conn:
+        if state is None:
+            rows = conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        else:
+            rows = conn.execute("SELECT * FROM jobs WHERE state=? ORDER BY id DESC LIMIT ?", (state, limit)).fetchall()
+    return [dict(r) for r in rows]
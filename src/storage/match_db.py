@@ -1,9 +1,11 @@
 """
-Match registry + artifacts: SQLite for courts, matches, artifacts.
+Match registry + artifacts: SQLite for courts, matches, artifacts, per-stage run metrics (stage_metrics,
+written by run_match, see utils/instrument.py) and the jobs table (see storage/jobs.py).
 Uses config/settings.DB_PATH. Per-match tracks live in storage/tracks_db.py (tracks.db per match).
 """
 from __future__ import annotations
 
+import json
 import os
 import sqlite3
 from typing import Any, Dict, List, Optional
@@ -28,11 +30,25 @@ def connect() -> sqlite3.Connection:
     conn.execute("PRAGMA foreign_keys=ON;")
     if not _DB_INITIALIZED:
         conn.executescript(_SCHEMA_SQL)
+        _add_missing_columns(conn)
         conn.commit()
         _DB_INITIALIZED = True
     return conn
 
 
+# Columns added after their table first shipped: CREATE TABLE IF NOT EXISTS leaves older tables as they were
+_ADDED_COLUMNS = (
+    ("stage_metrics", "cpu_approx", "INTEGER NOT NULL DEFAULT 0"),
+)
+
+
+def _add_missing_columns(conn: sqlite3.Connection) -> None:
+    for table, column, decl in _ADDED_COLUMNS:
+        existing = {r["name"] for r in conn.execute(f"PRAGMA table_info({table})")}
+        if column not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
 _SCHEMA_SQL = """
 CREATE TABLE IF NOT EXISTS courts (
     court_id TEXT PRIMARY KEY,
@@ -65,9 +81,47 @@ CREATE TABLE IF NOT EXISTS artifacts (
     updated_at TEXT NOT NULL,
     FOREIGN KEY (match_id) REFERENCES matches(match_id)
 );
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    match_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    run_after TEXT NOT NULL,
+    lease_owner TEXT,
+    lease_expires_at TEXT,
+    heartbeat_at TEXT,
+    last_error TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    FOREIGN KEY (match_id) REFERENCES matches(match_id)
+);
+CREATE TABLE IF NOT EXISTS stage_metrics (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    match_id TEXT NOT NULL,
+    court_id TEXT,
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL,
+    cached INTEGER NOT NULL DEFAULT 0,
+    started_at TEXT NOT NULL,
+    wall_s REAL,
+    cpu_s REAL,
+    cpu_approx INTEGER NOT NULL DEFAULT 0,
+    peak_rss_mb REAL,
+    children_peak_rss_mb REAL,
+    items TEXT,
+    created_at TEXT NOT NULL,
+    FOREIGN KEY (match_id) REFERENCES matches(match_id)
+);
 CREATE INDEX IF NOT EXISTS idx_matches_state ON matches(state);
 CREATE INDEX IF NOT EXISTS idx_artifacts_match ON artifacts(match_id);
 CREATE INDEX IF NOT EXISTS idx_artifacts_type ON artifacts(type);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_active_match ON jobs(match_id) WHERE state IN ('QUEUED', 'RUNNING');
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(state, priority, run_after);
+CREATE INDEX IF NOT EXISTS idx_stage_metrics_match ON stage_metrics(match_id, run_id);
+CREATE INDEX IF NOT EXISTS idx_stage_metrics_stage ON stage_metrics(stage, court_id);
 """
 
 
@@ -177,3 +231,57 @@ def list_artifacts(match_id: str) -> List[Dict[str, Any]]:
     with connect() as conn:
         rows = conn.execute("SELECT * FROM artifacts WHERE match_id=? ORDER BY created_at DESC", (match_id,)).fetchall()
     return [dict(r) for r in rows]
+
+
+def add_stage_metrics(run_id: str, match_id: str, court_id: Optional[str], metrics: List[Dict[str, Any]]) -> None:
+    """Store one run_match run's stage measurements (utils/instrument.StageMeasurement.as_dict())."""
+    now = utcnow_iso()
+    with connect() as conn:
+        conn.executemany(
+            """
+            INSERT INTO stage_metrics (run_id, match_id, court_id, stage, status, cached, started_at,
+                wall_s, cpu_s, cpu_approx, peak_rss_mb, children_peak_rss_mb, items, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (
+                    run_id, match_id, court_id, m["stage"], m["status"], int(bool(m.get("cached"))), m["started_at"],
+                    m.get("wall_s"), m.get("cpu_s"), int(bool(m.get("cpu_approx"))), m.get("peak_rss_mb"),
+                    m.get("children_peak_rss_mb"), json.dumps(m.get("items") or {}), now,
+                )
+                for m in metrics
+            ],
+        )
+
+
+def list_stage_metrics(
+    *,
+    match_id: Optional[str] = None,
+    court_id: Optional[str] = None,
+    stage: Optional[str] = None,
+    last_runs: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Stage metric rows (items decoded to a dict), oldest first. last_runs keeps the rows of the most
+    recent last_runs run_match runs among those matching the filters.
+    """
+    where, values = [], []
+    for col, val in (("match_id", match_id), ("court_id", court_id), ("stage", stage)):
+        if val is not None:
+            where.append(f"{col}=?")
+            values.append(val)
+    cond = f"WHERE {' AND '.join(where)}" if where else ""
+    if last_runs is not None:
+        runs = f"SELECT run_id FROM stage_metrics {cond} GROUP BY run_id ORDER BY MAX(id) DESC LIMIT ?"
+        cond = f"{cond} {'AND' if where else 'WHERE'} run_id IN ({runs})"
+        values = values + values + [last_runs]
+    with connect() as conn:
+        rows = conn.execute(f"SELECT * FROM stage_metrics {cond} ORDER BY id ASC", tuple(values)).fetchall()
+    out = []
+    for r in rows:
+        d = dict(r)
+        d["cached"] = bool(d["cached"])
+        d["cpu_approx"] = bool(d["cpu_approx"])
+        d["items"] = json.loads(d["items"]) if d["items"] else {}
+        out.append(d)
+    return out
@@ -0,0 +1,249 @@
+"""
+Streaming track sink for stage 02: records are appended to disk in chunks as they are produced
+(JSON Lines or fixed-width binary) and finalized atomically into tracks/tracks.json, so peak memory
+does not grow with match length.
+Uses: json, numpy (binary format), utils/io.
+"""
+from __future__ import annotations
+
+import bisect
+import itertools
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src.utils.io import ensure_dir
+
+TRACK_SINK_FORMATS = ("jsonl", "binary")
+
+# Binary record layout (little-endian, 64 bytes); floats kept as float64 so values round-trip exactly
+TRACK_RECORD_DTYPE = np.dtype([
+    ("frame", "<i4"),
+    ("player_id", "<i4"),
+    ("timestamp", "<f8"),
+    ("x_pixel", "<f8"),
+    ("y_pixel", "<f8"),
+    ("bbox_xyxy", "<f8", (4,)),
+])
+
+
+def write_json_array_stream(path: Path, records: Iterable[dict]) -> int:
+    """Atomic write of a JSON array from an iterable, one record per line. Returns the record count."""
+    ensure_dir(path.parent)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    n = 0
+    with tmp.open("w", encoding="utf-8") as f:
+        f.write("[")
+        for r in records:
+            f.write(",\n" if n else "\n")
+            f.write(json.dumps(r, ensure_ascii=False))
+            n += 1
+        f.write("\n]\n" if n else "]\n")
+    tmp.replace(path)
+    return n
+
+
+class TrackSink:
+    """
+    Append-only record sink. Records must arrive in frame order.
+    write() buffers up to chunk_size records; flush() appends the buffer (optionally fsync) and
+    returns the durable byte size of the file, usable later with truncate() to resume.
+    Keeps only counters in memory: records, frames (distinct), player IDs. With index_frames set
+    (checkpointing), also the byte offset of each flushed frame's first record (offset_of; pruned with
+    forget_offsets_before) so a resume can seek to its warm-up window instead of re-reading the file.
+    """
+
+    suffix = ""
+
+    def __init__(self, path: Path, *, chunk_size: int = 4096):
+        self.path = path
+        self.chunk_size = max(1, chunk_size)
+        self._buffer: List[dict] = []
+        self.records = 0
+        self.frames = 0
+        self.player_ids: set = set()
+        self._last_frame: Optional[int] = None
+        self.index_frames = False
+        self._marks: List[Tuple[int, int]] = []  # (frame, byte offset of its first record), ascending
+        ensure_dir(path.parent)
+
+    # -- format-specific -------------------------------------------------------
+    def _encode(self, records: List[dict]) -> bytes:
+        raise NotImplementedError
+
+    def _iter_file(self, offset: int = 0) -> Iterator[dict]:
+        raise NotImplementedError
+
+    # -- API -------------------------------------------------------------------
+    def write(self, records: Iterable[dict]) -> None:
+        for r in records:
+            self._count(r)
+            self._buffer.append(r)
+        if len(self._buffer) >= self.chunk_size:
+            self.flush(fsync=False)
+
+    def _count(self, r: dict) -> None:
+        self.records += 1
+        self.player_ids.add(r["player_id"])
+        if r["frame"] != self._last_frame:
+            self.frames += 1
+            self._last_frame = r["frame"]
+
+    def flush(self, *, fsync: bool = True) -> int:
+        if self._buffer:
+            if self.index_frames:
+                pos = self.path.stat().st_size if self.path.exists() else 0
+                parts = []
+                for frame, group in itertools.groupby(self._buffer, key=lambda r: r["frame"]):
+                    if not self._marks or self._marks[-1][0] != frame:
+                        self._marks.append((frame, pos))
+                    parts.append(self._encode(list(group)))
+                    pos += len(parts[-1])
+            else:
+                parts = [self._encode(self._buffer)]
+            with self.path.open("ab") as f:
+                f.write(b"".join(parts))
+                f.flush()
+                if fsync:
+                    os.fsync(f.fileno())
+            self._buffer = []
+        elif not self.path.exists():
+            self.path.touch()
+        return self.path.stat().st_size
+
+    def state(self) -> Dict[str, Any]:
+        """Counters as of the last write (JSON-serializable; see truncate)."""
+        return {
+            "records": self.records,
+            "frames": self.frames,
+            "player_ids": sorted(self.player_ids),
+            "last_frame": self._last_frame,
+        }
+
+    def truncate(
+        self,
+        size: int,
+        *,
+        state: Optional[Dict[str, Any]] = None,
+        mark: Optional[Tuple[int, int]] = None,
+    ) -> None:
+        """
+        Drop everything after byte offset size (e.g. records written after the last checkpoint).
+        state: counters saved with that size (state()); without it the kept part is re-read to rebuild them.
+        mark: a known (frame, byte offset) in the kept part, so offset_of() can seek for later frames.
+        """
+        self._buffer = []
+        if self.path.exists():
+            with self.path.open("r+b") as f:
+                f.truncate(size)
+        self._marks = [tuple(mark)] if mark is not None else []
+        if state is not None:
+            self.records = int(state["records"])
+            self.frames = int(state["frames"])
+            self.player_ids = set(state["player_ids"])
+            self._last_frame = state["last_frame"]
+            return
+        self.records = self.frames = 0
+        self.player_ids = set()
+        self._last_frame = None
+        for r in self._iter_file():
+            self._count(r)
+
+    def offset_of(self, frame: int) -> int:
+        """
+        Byte offset to start reading at for records with frame >= frame: every record before it has a
+        smaller frame. 0 when no flushed frame <= frame is known.
+        """
+        i = bisect.bisect_right(self._marks, (frame, float("inf")))
+        return self._marks[i - 1][1] if i else 0
+
+    def forget_offsets_before(self, frame: int) -> None:
+        """Drop offsets no longer needed: keeps the one offset_of(frame) uses and everything after it."""
+        i = bisect.bisect_right(self._marks, (frame, float("inf")))
+        if i > 1:
+            del self._marks[: i - 1]
+
+    def iter_records(self, offset: int = 0) -> Iterator[dict]:
+        """Records on disk (from byte offset, e.g. offset_of()) followed by buffered ones."""
+        if self.path.exists():
+            yield from self._iter_file(offset)
+        yield from list(self._buffer)
+
+    @property
+    def max_player_id(self) -> int:
+        return max(self.player_ids, default=0)
+
+    def finalize(self, out_path: Path) -> Path:
+        """Stream all records into out_path (JSON array, atomic replace) and remove the working file."""
+        self.flush(fsync=False)
+        write_json_array_stream(out_path, self._iter_file())
+        self.discard()
+        return out_path
+
+    def discard(self) -> None:
+        self._buffer = []
+        self._marks = []
+        if self.path.exists():
+            self.path.unlink()
+
+
+class JsonlTrackSink(TrackSink):
+    """One JSON object per line."""
+
+    suffix = ".jsonl"
+
+    def _encode(self, records: List[dict]) -> bytes:
+        return "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode("utf-8")
+
+    def _iter_file(self, offset: int = 0) -> Iterator[dict]:
+        with self.path.open("rb") as f:
+            f.seek(offset)
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class BinaryTrackSink(TrackSink):
+    """Fixed-width records (TRACK_RECORD_DTYPE); contract fields only."""
+
+    suffix = ".bin"
+
+    def _encode(self, records: List[dict]) -> bytes:
+        arr = np.zeros(len(records), dtype=TRACK_RECORD_DTYPE)
+        for i, r in enumerate(records):
+            arr[i] = (
+                r["frame"], r["player_id"], r["timestamp"], r["x_pixel"], r["y_pixel"],
+                r.get("bbox_xyxy") or (0.0, 0.0, 0.0, 0.0),
+            )
+        return arr.tobytes()
+
+    def _iter_file(self, offset: int = 0, chunk_records: int = 65536) -> Iterator[dict]:
+        size = TRACK_RECORD_DTYPE.itemsize
+        with self.path.open("rb") as f:
+            f.seek(offset)
+            while True:
+                buf = f.read(size * chunk_records)
+                if not buf:
+                    break
+                arr = np.frombuffer(buf[: len(buf) - len(buf) % size], dtype=TRACK_RECORD_DTYPE)
+                for row in arr:
+                    yield {
+                        "frame": int(row["frame"]),
+                        "timestamp": float(row["timestamp"]),
+                        "player_id": int(row["player_id"]),
+                        "x_pixel": float(row["x_pixel"]),
+                        "y_pixel": float(row["y_pixel"]),
+                        "bbox_xyxy": [float(v) for v in row["bbox_xyxy"]],
+                    }
+
+
+def open_track_sink(tracks_dir: Path, fmt: str = "jsonl", *, stem: str = "tracks.partial") -> TrackSink:
+    """Sink appending to tracks_dir/<stem>.jsonl or .bin."""
+    if fmt == "jsonl":
+        return JsonlTrackSink(tracks_dir / f"{stem}{JsonlTrackSink.suffix}")
+    if fmt == "binary":
+        return BinaryTrackSink(tracks_dir / f"{stem}{BinaryTrackSink.suffix}")
+    raise ValueError(f"Unknown tracks format: {fmt} (expected one of {TRACK_SINK_FORMATS})")
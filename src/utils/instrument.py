@@ -0,0 +1,218 @@
+"""
+Stage instrumentation: measure(stage) wraps one pipeline stage and records wall time, CPU time, peak
+RSS and the items the stage reports with count() (frames, track points, clips, bytes uploaded).
+run_match writes the results to meta.json "stage_metrics" and the stage_metrics table.
+CPU: the stage's own thread (thread CPU time, so stages running at the same time on other threads,
+e.g. the run_graph tail or worker --concurrency, are not counted), plus helper threads started with
+stage_thread() (stage 02's decoder and inference threads), plus child processes reaped during the
+stage (ffmpeg, tracking workers, the decoder process). Child CPU is only known per process, so when
+another stage ran on another thread at the same time it may include that stage's children too: the
+measurement is then flagged cpu_approx.
+Memory: peak RSS of this process, sampled while the stage runs; stages that run concurrently see
+each other's memory.
+Uses: resource (Unix), /proc (Linux).
+"""
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from src.utils.time import utcnow_iso
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore
+
+_current = threading.local()
+_LOCK = threading.Lock()
+_RUNNING: List["_Run"] = []  # measurements in progress on any thread
+
+
+@dataclass
+class StageMeasurement:
+    stage: str
+    started_at: str = ""
+    status: str = "ok"  # "ok" | "failed"
+    cached: bool = False  # skipped by the stage cache
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    cpu_approx: bool = False  # child CPU reaped while a stage on another thread was running
+    peak_rss_mb: Optional[float] = None
+    children_peak_rss_mb: Optional[float] = None  # only when a child process set a new high in this stage
+    items: Dict[str, int] = field(default_factory=dict)
+
+    def as_dict(self) -> Dict[str, Any]:
+        out = asdict(self)
+        out["items_per_s"] = {k: round(v / self.wall_s, 2) for k, v in self.items.items()} if self.wall_s > 0 else {}
+        return out
+
+
+class _Run:
+    """A measurement in progress: the thread it runs on and the CPU its helper threads reported."""
+
+    __slots__ = ("m", "thread", "helper_cpu_s", "overlapped")
+
+    def __init__(self, m: StageMeasurement):
+        self.m = m
+        self.thread = threading.get_ident()
+        self.helper_cpu_s = 0.0
+        self.overlapped = False
+
+
+def count(item: str, n: int = 1) -> None:
+    """Add n processed items to the stage measured on this thread (no-op outside measure())."""
+    run = getattr(_current, "run", None)
+    if run is not None:
+        run.m.items[item] = run.m.items.get(item, 0) + int(n)
+
+
+def stage_thread(target: Callable[[], Any]) -> Callable[[], Any]:
+    """
+    Wrap the target of a helper thread started inside measure() so its CPU time counts toward that
+    stage. The thread must finish before the stage does (its CPU is added when the target returns).
+    Returns target unchanged outside measure().
+    """
+    run = getattr(_current, "run", None)
+    if run is None:
+        return target
+
+    def _target() -> Any:
+        cpu0 = time.thread_time()
+        try:
+            return target()
+        finally:
+            with _LOCK:
+                run.helper_cpu_s += time.thread_time() - cpu0
+
+    return _target
+
+
+def _rss_mb() -> Optional[float]:
+    """Current resident set size of this process (Linux /proc), else None."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1 << 20)
+
+
+def _maxrss_mb(who: int) -> float:
+    rss = resource.getrusage(who).ru_maxrss
+    return rss / (1 << 20) if sys.platform == "darwin" else rss / 1024  # bytes on macOS, KiB elsewhere
+
+
+def _children_cpu_s() -> float:
+    if resource is None:
+        return 0.0
+    ru = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return ru.ru_utime + ru.ru_stime
+
+
+@contextmanager
+def measure(
+    stage: str,
+    *,
+    into: Optional[List[Dict[str, Any]]] = None,
+    sample_s: float = 0.05,
+) -> Iterator[StageMeasurement]:
+    """
+    Measure the block as stage; the measurement is appended to into (as_dict) when the block ends,
+    also when it raises (status "failed"). count() inside the block adds to its items.
+    """
+    m = StageMeasurement(stage, started_at=utcnow_iso())
+    run = _Run(m)
+    prev, _current.run = getattr(_current, "run", None), run
+    peak = [_rss_mb()]
+    done = threading.Event()
+
+    def _sample() -> None:
+        while not done.wait(sample_s):
+            rss = _rss_mb()
+            if rss is not None and rss > (peak[0] or 0.0):
+                peak[0] = rss
+
+    sampler = None
+    if peak[0] is not None:
+        sampler = threading.Thread(target=_sample, name=f"rss-{stage}", daemon=True)
+        sampler.start()
+    children_peak0 = _maxrss_mb(resource.RUSAGE_CHILDREN) if resource is not None else None
+    with _LOCK:
+        for other in _RUNNING:
+            if other.thread != run.thread:
+                other.overlapped = run.overlapped = True
+        _RUNNING.append(run)
+    t0, cpu0, child0 = time.perf_counter(), time.thread_time(), _children_cpu_s()
+    try:
+        yield m
+    except BaseException:
+        m.status = "failed"
+        raise
+    finally:
+        m.wall_s = round(time.perf_counter() - t0, 3)
+        children_cpu = _children_cpu_s() - child0
+        with _LOCK:
+            _RUNNING.remove(run)
+            m.cpu_s = round(time.thread_time() - cpu0 + run.helper_cpu_s + children_cpu, 3)
+            m.cpu_approx = run.overlapped and children_cpu > 0
+        done.set()
+        if sampler is not None:
+            sampler.join()
+            rss = _rss_mb()
+            m.peak_rss_mb = round(max(peak[0], rss or 0.0), 1)
+        elif resource is not None:
+            m.peak_rss_mb = round(_maxrss_mb(resource.RUSAGE_SELF), 1)  # process lifetime peak
+        if children_peak0 is not None:
+            children_peak = _maxrss_mb(resource.RUSAGE_CHILDREN)
+            if children_peak > children_peak0:
+                m.children_peak_rss_mb = round(children_peak, 1)
+        _current.run = prev
+        if into is not None:
+            into.append(m.as_dict())
+
+
+def percentile(values: List[float], q: float) -> float:
+    """q-quantile (0..1) of values, linear interpolation between closest ranks."""
+    s = sorted(values)
+    pos = q * (len(s) - 1)
+    lo = int(pos)
+    hi = min(lo + 1, len(s) - 1)
+    return s[lo] + (s[hi] - s[lo]) * (pos - lo)
+
+
+def summarize_stage_metrics(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Per-stage summary of stage_metrics rows (cached runs excluded): runs, failures, wall p50/p95, mean
+    CPU, max peak RSS, and overall throughput per item (total items / total wall time).
+    """
+    by_stage: Dict[str, List[Dict[str, Any]]] = {}
+    for r in rows:
+        if not r.get("cached"):
+            by_stage.setdefault(r["stage"], []).append(r)
+    out = []
+    for stage in sorted(by_stage):
+        rs = by_stage[stage]
+        walls = [float(r.get("wall_s") or 0.0) for r in rs]
+        rss = [float(r["peak_rss_mb"]) for r in rs if r.get("peak_rss_mb") is not None]
+        items: Dict[str, int] = {}
+        for r in rs:
+            for k, v in (r.get("items") or {}).items():
+                items[k] = items.get(k, 0) + int(v)
+        total_wall = sum(walls)
+        out.append({
+            "stage": stage,
+            "runs": len(rs),
+            "failed": sum(1 for r in rs if r.get("status") == "failed"),
+            "wall_p50_s": round(percentile(walls, 0.5), 3),
+            "wall_p95_s": round(percentile(walls, 0.95), 3),
+            "cpu_mean_s": round(sum(float(r.get("cpu_s") or 0.0) for r in rs) / len(rs), 3),
+            "peak_rss_max_mb": max(rss) if rss else None,
+            "items_per_s": {k: round(v / total_wall, 2) for k, v in items.items()} if total_wall > 0 else {},
+        })
+    return out
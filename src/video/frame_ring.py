@@ -0,0 +1,264 @@
+"""
+Frame transport between processes over multiprocessing.shared_memory: a fixed ring of preallocated
+BGR frame slots. A decoder process decodes straight into the slots (OpenCV read into a buffer, or the
+ffmpeg pipe read into it) and hands over only (frame_index, slot) through a queue; the consumer yields
+NumPy views of the slots. No frame is pickled or copied on either side, unless the decoder returns a
+frame that does not fit a slot (then it is copied in once, and counted).
+Slots are handed out in ring order and come back in the order frames were consumed: a semaphore holds
+one permit per free slot, so the decoder never writes a slot the consumer may still read.
+Uses: multiprocessing (spawn), numpy, video/frames_opencv, video/frames_ffmpeg.
+"""
+from __future__ import annotations
+
+import ctypes
+import multiprocessing as mp
+import queue
+from collections import deque
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Slots the decoder may run ahead of the frames the consumer holds
+DEFAULT_RING_LOOKAHEAD = 4
+
+_POLL_S = 0.1
+
+
+class SharedFrameRing:
+    """
+    (slots, height, width, 3) uint8 frames in one shared-memory block. Create in one process, attach by
+    name in others. frames is backed by a ctypes array exported from the block, so the mapping cannot be
+    closed while any view of a frame is alive: try_close() returns False then, and the ring is retried
+    on later calls instead of leaving views pointing at unmapped memory.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, slots: int, height: int, width: int, *, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        shape = (slots, height, width, 3)
+        nbytes = slots * height * width * 3
+        self.frames = np.ctypeslib.as_array((ctypes.c_uint8 * max(1, nbytes)).from_buffer(shm.buf))[:nbytes].reshape(shape)
+
+    @classmethod
+    def create(cls, slots: int, height: int, width: int) -> "SharedFrameRing":
+        _close_lingering()
+        shm = shared_memory.SharedMemory(create=True, size=max(1, slots * height * width * 3))
+        return cls(shm, slots, height, width, owner=True)
+
+    @classmethod
+    def attach(cls, name: str, slots: int, height: int, width: int) -> "SharedFrameRing":
+        return cls(shared_memory.SharedMemory(name=name), slots, height, width, owner=False)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def frame_nbytes(self) -> int:
+        return self.frames[0].nbytes if len(self.frames) else 0
+
+    def slot_of(self, frame: np.ndarray) -> Optional[int]:
+        """Slot index when frame is a whole slot of this ring, else None."""
+        if frame.shape != self.frames.shape[1:] or frame.dtype != np.uint8 or not len(self.frames):
+            return None
+        offset = frame.__array_interface__["data"][0] - self.frames.__array_interface__["data"][0]
+        slot, rest = divmod(offset, self.frame_nbytes)
+        return slot if rest == 0 and 0 <= slot < len(self.frames) else None
+
+    def unlink(self) -> None:
+        """Remove the block's name (creator only); the memory goes away once every mapping is closed."""
+        if self.owner:
+            self.owner = False
+            self.shm.unlink()
+
+    def try_close(self) -> bool:
+        """Unmap this process's view of the block. False (kept for a retry) while frames are still referenced."""
+        self.frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            if self not in _LINGERING:
+                _LINGERING.append(self)
+            return False
+        if self in _LINGERING:
+            _LINGERING.remove(self)
+        return True
+
+
+_LINGERING: List[SharedFrameRing] = []  # rings whose frames were still referenced when they were closed
+
+
+def _close_lingering() -> None:
+    for ring in list(_LINGERING):
+        ring.try_close()
+
+
+def _open_source(spec: Dict[str, Any], ring: SharedFrameRing, counters: Dict[str, int]):
+    """The frames iterator spec describes, decoding into ring's slots; returns (frames, capture or None)."""
+    if spec["decoder"] == "ffmpeg":
+        from src.video.frames_ffmpeg import FfmpegFrameReader, iter_sampled_frames as iter_ffmpeg
+        reader = FfmpegFrameReader(
+            spec["video_path"], width=spec["width"], height=spec["height"], fps=spec["fps"],
+            every_n=spec["every_n"], start_frame=spec["start_frame"], end_frame=spec["end_frame"],
+            size=spec["size"], buffers=ring.frames,
+        )
+        return iter_ffmpeg(reader, counters=counters), None
+    import cv2
+    from src.video.frames_opencv import iter_sampled_frames
+    cap = cv2.VideoCapture(str(spec["video_path"]))
+    frames = iter_sampled_frames(
+        cap, spec["every_n"], skip_decode=spec["skip_decode"],
+        start_frame=spec["start_frame"], end_frame=spec["end_frame"],
+        counters=counters, buffers=ring.frames,
+    )
+    return frames, cap
+
+
+def _pump(spec, ring: SharedFrameRing, free, ready, stop) -> Optional[Dict[str, int]]:
+    """Decode into free slots in ring order and hand (frame_index, slot) over. Counters at the end, None if stopped."""
+    counters: Dict[str, int] = {"frame_transport_bytes_copied": 0}
+    frames, cap = _open_source(spec, ring, counters)
+    slots = len(ring.frames)
+    n = 0
+    try:
+        for idx, frame in _after_permit(frames, free, stop):
+            slot = ring.slot_of(frame)
+            if slot is None:  # not decoded in place (size changed mid-stream): copy into the next slot
+                slot = n % slots
+                ring.frames[slot] = frame
+                counters["frame_transport_bytes_copied"] += frame.nbytes
+            ready.put(("frame", idx, slot))
+            n += 1
+        return None if stop.is_set() else counters
+    finally:
+        close = getattr(frames, "close", None)
+        if close is not None:
+            close()
+        if cap is not None:
+            cap.release()
+
+
+def _after_permit(frames, free, stop) -> Iterator[Tuple[int, np.ndarray]]:
+    """frames, pulling each one only after a free-slot permit (the slot the source writes next is free)."""
+    it = iter(frames)
+    while True:
+        while not free.acquire(timeout=_POLL_S):
+            if stop.is_set():
+                return
+        if stop.is_set():
+            return
+        item = next(it, None)
+        if item is None:
+            return
+        yield item
+
+
+def _produce(spec, name, slots, height, width, free, ready, stop) -> None:
+    """Decoder process entry point."""
+    ring = SharedFrameRing.attach(name, slots, height, width)
+    try:
+        counters = _pump(spec, ring, free, ready, stop)
+        if counters is not None:
+            ready.put(("end", counters))
+    except BaseException as e:  # surfaced in the consumer
+        ready.put(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        ring.try_close()
+
+
+class ProcessFrameSource:
+    """
+    Iterable of (frame_index, frame_bgr) decoded in a separate process, as views into a shared-memory ring.
+    spec: decoder ("opencv" | "ffmpeg"), video_path, width, height (native), fps, size (ffmpeg scaling
+      or None), every_n, skip_decode, start_frame, end_frame.
+    hold: frames the consumer keeps at once. A yielded frame stays valid until hold more frames have
+      been yielded; the ring has hold + lookahead slots.
+    counters: updated in place with the decoder's frames_decoded / frames_skipped and the transport's
+      frame_transport, frame_transport_slots, frame_transport_frame_bytes, frame_transport_bytes_copied
+      and frame_transport_bytes_copied_per_frame.
+    close() stops the decoder and frees the ring; the mapping itself is only closed once no yielded frame
+    is referenced any more (close() again, or the next ring created in this process, retries).
+    """
+
+    def __init__(
+        self,
+        spec: Dict[str, Any],
+        *,
+        hold: int,
+        lookahead: int = DEFAULT_RING_LOOKAHEAD,
+        counters: Optional[Dict[str, Any]] = None,
+    ):
+        self.spec = spec
+        self.hold = max(1, int(hold))
+        self.slots = self.hold + max(1, int(lookahead))
+        self.width, self.height = spec["size"] or (spec["width"], spec["height"])
+        self.counters = counters
+        self.ring: Optional[SharedFrameRing] = SharedFrameRing.create(self.slots, self.height, self.width)
+        self._ctx = mp.get_context("spawn")
+        self._proc = None
+        self._stop_event = None
+        self._ready = None
+        self._yielded = 0
+        self._result: Dict[str, Any] = {}
+
+    def __iter__(self) -> Iterator[Tuple[int, np.ndarray]]:
+        free = self._ctx.Semaphore(self.slots)
+        self._ready = self._ctx.Queue()
+        self._stop_event = self._ctx.Event()
+        self._proc = self._ctx.Process(
+            target=_produce,
+            args=(self.spec, self.ring.name, self.slots, self.height, self.width, free, self._ready, self._stop_event),
+            name="frame-decoder", daemon=True,
+        )
+        self._proc.start()
+        held: deque = deque()
+        try:
+            while True:
+                try:
+                    msg = self._ready.get(timeout=_POLL_S)
+                except queue.Empty:
+                    if not self._proc.is_alive():
+                        raise RuntimeError(f"Frame decoder process exited unexpectedly (exit {self._proc.exitcode})")
+                    continue
+                if msg[0] == "error":
+                    raise RuntimeError(f"Frame decoder process failed: {msg[1]}")
+                if msg[0] == "end":
+                    self._result = msg[1]
+                    break
+                _, idx, slot = msg
+                held.append(slot)
+                if len(held) > self.hold:
+                    held.popleft()
+                    free.release()
+                self._yielded += 1
+                yield idx, self.ring.frames[slot]
+        finally:
+            self._stop()
+
+    def _stop(self) -> None:
+        """Stop and reap the decoder process; merge its counters (once)."""
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        self._stop_event.set()
+        proc.join()
+        self._ready.close()
+        if self.counters is not None:
+            c = self.counters
+            copied = self._result.pop("frame_transport_bytes_copied", 0)
+            for key, value in self._result.items():
+                c[key] = c.get(key, 0) + value
+            c["frame_transport"] = "shared_memory"
+            c["frame_transport_slots"] = self.slots
+            c["frame_transport_frame_bytes"] = self.width * self.height * 3
+            c["frame_transport_bytes_copied"] = c.get("frame_transport_bytes_copied", 0) + copied
+            c["frame_transport_bytes_copied_per_frame"] = round(copied / self._yielded, 1) if self._yielded else 0.0
+
+    def close(self) -> None:
+        self._stop()
+        if self.ring is None:
+            return
+        self.ring.unlink()
+        if self.ring.try_close():
+            self.ring = None
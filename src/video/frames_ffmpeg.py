@@ -0,0 +1,220 @@
+"""
+Frame source that pipes raw BGR frames out of an ffmpeg subprocess instead of cv2.VideoCapture.
+ffmpeg decodes with its own thread pool, drops unsampled frames (select filter) and scales to the
+requested size before anything reaches Python; frames are read with readinto() into a small ring of
+preallocated NumPy buffers, so there is no per-frame allocation.
+Drop-in for frames_opencv: iter_frames() has the same (frame_index, timestamp_sec, frame_bgr) contract
+as frames_opencv.iter_frames (plus every_n sampling), iter_sampled_frames() the same (frame_index,
+frame_bgr) contract and counters as frames_opencv.iter_sampled_frames. Frames are views into the ring
+(see FfmpegFrameReader): consumers that keep frames beyond the ring size must copy them.
+Uses: subprocess ffmpeg / ffprobe, numpy.
+"""
+from __future__ import annotations
+
+import json
+import shutil
+import subprocess
+import tempfile
+from fractions import Fraction
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+
+def _check_tool(name: str) -> None:
+    if not shutil.which(name):
+        raise RuntimeError(f"{name} not found in PATH (install FFmpeg or use the OpenCV decoder).")
+
+
+def probe_video(video_path: Path) -> Dict[str, float]:
+    """fps, width, height and frame_count (0 if unknown) of the first video stream."""
+    _check_tool("ffprobe")
+    cmd = [
+        "ffprobe", "-v", "error", "-select_streams", "v:0", "-print_format", "json",
+        "-show_entries", "stream=width,height,avg_frame_rate,r_frame_rate,nb_frames",
+        str(video_path),
+    ]
+    r = subprocess.run(cmd, capture_output=True, text=True)
+    if r.returncode != 0:
+        raise RuntimeError(f"ffprobe failed on {video_path}: {r.stderr.strip()}")
+    streams = json.loads(r.stdout or "{}").get("streams") or []
+    if not streams:
+        raise RuntimeError(f"No video stream in {video_path}")
+    s = streams[0]
+    fps = 0.0
+    for key in ("avg_frame_rate", "r_frame_rate"):
+        try:
+            fps = float(Fraction(s.get(key) or "0/1"))
+        except (ValueError, ZeroDivisionError):
+            fps = 0.0
+        if fps > 0:
+            break
+    try:
+        frame_count = int(s.get("nb_frames") or 0)
+    except ValueError:
+        frame_count = 0
+    return {"fps": fps or 30.0, "width": int(s["width"]), "height": int(s["height"]), "frame_count": frame_count}
+
+
+class FfmpegFrameReader:
+    """
+    Sampled frames of one video from an ffmpeg rawvideo pipe.
+    every_n / start_frame / end_frame: same sampling grid as frames_opencv.iter_sampled_frames
+      (absolute frame indices, index % every_n == 0, frames in [start_frame, end_frame)).
+    size: (width, height) to scale to inside ffmpeg (None = native); must match the source aspect
+      ratio for boxes to map back with a plain per-axis scale.
+    threads: ffmpeg decoder / filter threads (0 = ffmpeg picks, usually one per core).
+    ring: number of frame buffers. Yielded frames are views into the ring and are overwritten ring
+      frames later, so ring must exceed the number of frames the consumer holds at once.
+    buffers: optional (ring, height, width, 3) uint8 array to use as the ring instead of allocating one
+      (e.g. a shared-memory ring, video/frame_ring.py); ring is then len(buffers).
+    A non-zero ffmpeg exit (decoder crash, corrupt stream) raises RuntimeError at the end of the stream,
+    so a truncated decode is never mistaken for the end of the video.
+    """
+
+    def __init__(
+        self,
+        video_path: Path,
+        *,
+        width: int,
+        height: int,
+        fps: float,
+        every_n: int = 1,
+        start_frame: int = 0,
+        end_frame: Optional[int] = None,
+        size: Optional[Tuple[int, int]] = None,
+        threads: int = 0,
+        ring: int = 4,
+        buffers: Optional[np.ndarray] = None,
+    ):
+        self.video_path = video_path
+        self.fps = max(float(fps), 1e-6)
+        self.every_n = max(1, int(every_n))
+        self.start_frame = max(0, int(start_frame))
+        self.end_frame = end_frame
+        self.width, self.height = (int(size[0]), int(size[1])) if size else (int(width), int(height))
+        self.scaled = size is not None and (self.width, self.height) != (int(width), int(height))
+        self.threads = max(0, int(threads))
+        if buffers is not None:
+            if buffers.shape[1:] != (self.height, self.width, 3) or buffers.dtype != np.uint8:
+                raise ValueError(f"buffers shape {buffers.shape} does not fit {self.width}x{self.height} BGR frames")
+            self._buffers = buffers
+        else:
+            self._buffers = np.empty((max(2, int(ring)), self.height, self.width, 3), dtype=np.uint8)
+        self._proc: Optional[subprocess.Popen] = None
+        self._stderr = None
+
+    def _command(self) -> list:
+        first = -(-self.start_frame // self.every_n) * self.every_n  # first sampled index >= start_frame
+        vf = [f"select='not(mod(n+{self.start_frame}\\,{self.every_n}))'"] if self.every_n > 1 else []
+        if self.scaled:
+            vf.append(f"scale={self.width}:{self.height}:flags=area")
+        cmd = ["ffmpeg", "-v", "error", "-nostdin"]
+        if self.threads:
+            cmd += ["-filter_threads", str(self.threads)]
+        cmd += ["-threads", str(self.threads)]
+        if self.start_frame > 0:
+            # Accurate seek (ffmpeg decodes from the previous keyframe and drops earlier frames);
+            # half a frame early so timestamp rounding cannot drop start_frame itself
+            cmd += ["-ss", f"{(self.start_frame - 0.5) / self.fps:.6f}"]
+        cmd += ["-i", str(self.video_path), "-an", "-sn", "-dn"]
+        if vf:
+            cmd += ["-vf", ",".join(vf)]
+        if self.end_frame is not None:
+            cmd += ["-frames:v", str(max(0, -(-(self.end_frame - first) // self.every_n)))]
+        cmd += ["-vsync", "passthrough", "-f", "rawvideo", "-pix_fmt", "bgr24", "pipe:1"]
+        return cmd
+
+    def _read_into(self, buf: np.ndarray) -> bool:
+        """Fill buf from the pipe. False at end of stream (a trailing partial frame is dropped)."""
+        view = memoryview(buf.reshape(-1))
+        filled = 0
+        while filled < len(view):
+            n = self._proc.stdout.readinto(view[filled:])
+            if not n:
+                return False
+            filled += n
+        return True
+
+    def __iter__(self) -> Iterator[Tuple[int, np.ndarray]]:
+        _check_tool("ffmpeg")
+        # stderr to a file, not a pipe: a stream of decode errors cannot fill a pipe and stall ffmpeg
+        self._stderr = tempfile.TemporaryFile()
+        self._proc = subprocess.Popen(
+            self._command(), stdout=subprocess.PIPE, stderr=self._stderr, stdin=subprocess.DEVNULL, bufsize=0,
+        )
+        idx = -(-self.start_frame // self.every_n) * self.every_n
+        try:
+            while self.end_frame is None or idx < self.end_frame:
+                buf = self._buffers[(idx // self.every_n) % len(self._buffers)]
+                if not self._read_into(buf):
+                    break
+                yield idx, buf
+                idx += self.every_n
+            else:
+                return  # stopped at end_frame; close() ends ffmpeg
+            # End of stream: it only counts as the end of the video if ffmpeg exited cleanly
+            code = self._proc.wait()
+            if code != 0:
+                self._stderr.seek(0)
+                err = self._stderr.read().decode("utf-8", "replace").strip()
+                raise RuntimeError(f"ffmpeg failed on {self.video_path} (exit {code}) at frame {idx}: {err}")
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+        if proc.stdout is not None:
+            proc.stdout.close()
+        if self._stderr is not None:
+            self._stderr.close()
+            self._stderr = None
+
+
+def iter_sampled_frames(
+    reader: FfmpegFrameReader,
+    *,
+    counters: Optional[Dict[str, int]] = None,
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Yield (frame_index, frame_bgr) from reader, updating counters like frames_opencv.iter_sampled_frames:
+    frames_decoded (frames that reached Python) and frames_skipped (dropped inside ffmpeg by select).
+    """
+    if counters is not None:
+        counters.setdefault("frames_decoded", 0)
+        counters.setdefault("frames_skipped", 0)
+    prev = None
+    for idx, frame in reader:
+        if counters is not None:
+            counters["frames_decoded"] += 1
+            counters["frames_skipped"] += idx - (reader.start_frame if prev is None else prev + 1)
+        prev = idx
+        yield idx, frame
+
+
+
+def iter_frames(
+    video_path: Path,
+    *,
+    max_frames: Optional[int] = None,
+    every_n: int = 1,
+    size: Optional[Tuple[int, int]] = None,
+) -> Iterator[Tuple[int, float, np.ndarray]]:
+    """
+    Yield (frame_index, timestamp_sec, frame_bgr) like frames_opencv.iter_frames, decoded by ffmpeg.
+    every_n: only every Nth frame (dropped inside ffmpeg); max_frames: stop before that frame index.
+    size: (w, h) to scale to in ffmpeg. Frames are ring views (reused); copy frames you keep.
+    """
+    info = probe_video(video_path)
+    reader = FfmpegFrameReader(
+        video_path, width=int(info["width"]), height=int(info["height"]), fps=info["fps"],
+        every_n=every_n, end_frame=max_frames, size=size,
+    )
+    for idx, frame in reader:
+        yield idx, idx / reader.fps, frame
@@ -5,7 +5,7 @@ Uses: OpenCV
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Iterator, Tuple, Optional
+from typing import Dict, Iterator, Tuple, Optional
 
 import cv2
 import numpy as np
@@ -33,3 +33,56 @@ def iter_frames(
                 break
     finally:
         cap.release()
+
+
+def iter_sampled_frames(
+    cap: cv2.VideoCapture,
+    every_n: int = 1,
+    *,
+    skip_decode: bool = True,
+    start_frame: int = 0,
+    end_frame: Optional[int] = None,
+    counters: Optional[Dict[str, int]] = None,
+    buffers: Optional[np.ndarray] = None,
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Yield (frame_index, frame_bgr) for every Nth frame of an open capture (frame_index % every_n == 0).
+    skip_decode=True advances over unsampled frames with cap.grab() (no BGR conversion or copy) and
+    only retrieves the sampled ones; skip_decode=False reads every frame (previous behaviour).
+    start_frame / end_frame: only frames in [start_frame, end_frame) (seeks to start_frame); indices
+      stay absolute, so the sampling grid is the same as for a full pass.
+    counters: optional dict updated in place with frames_decoded (read + converted) and
+      frames_skipped (grabbed only).
+    buffers: optional (ring, h, w, 3) uint8 array; sampled frames are decoded straight into
+      buffers[n % ring] (n = sampled-frame count) and yielded as views of it, e.g. a shared-memory
+      ring (video/frame_ring.py). Frames of another size fall back to a fresh array.
+    The caller owns the capture (open + release).
+    """
+    every_n = max(1, int(every_n))
+    if counters is not None:
+        counters.setdefault("frames_decoded", 0)
+        counters.setdefault("frames_skipped", 0)
+    idx = max(0, int(start_frame))
+    n = 0
+    if idx > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+    while end_frame is None or idx < end_frame:
+        if idx % every_n != 0:
+            if skip_decode:
+                ok = cap.grab()
+            else:
+                ok, _ = cap.read()
+            if not ok:
+                break
+            if counters is not None:
+                counters["frames_skipped" if skip_decode else "frames_decoded"] += 1
+            idx += 1
+            continue
+        ret, frame = cap.read() if buffers is None else cap.read(buffers[n % len(buffers)])
+        if not ret or frame is None:
+            break
+        if counters is not None:
+            counters["frames_decoded"] += 1
+        yield idx, frame
+        idx += 1
+        n += 1
@@ -0,0 +1,278 @@
+"""
+Stage 02 throughput benchmark: per-frame model.track vs batched predict + decoupled tracker.
+Frames are decoded up front so only detection + tracking is timed.
+Uses: vision/detection/yolo, vision/tracking/mot, video/frames_opencv, video/frames_ffmpeg, vision/roi_filter.
+
+  python3 -m src.vision.benchmark --video data/matches/<match_id>/raw/match.mp4 --batch-sizes 1 4 8
+
+Runs on CPU by default (hides CUDA devices); pass --device cuda to keep the GPU visible.
+--mode tracker times only the tracker update on shared detections (--trackers botsort.yaml courtflow ...).
+--mode roi times ROI filtering instead (per-point pointPolygonTest vs vectorized polygon vs raster mask):
+
+  python3 -m src.vision.benchmark --mode roi --roi data/courts/<court_id>/calibration --video <video>
+
+--mode decode times frame reading only (OpenCV grab/read vs ffmpeg pipe at native and --imgsz size).
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+def _load_frames(video_path: Path, sample_every_n_frames: int, max_frames: int) -> List[np.ndarray]:
+    import cv2
+    from src.video.frames_opencv import iter_sampled_frames
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        raise RuntimeError(f"Failed to open video: {video_path}")
+    frames = []
+    try:
+        for _, frame in iter_sampled_frames(cap, sample_every_n_frames):
+            frames.append(frame)
+            if len(frames) >= max_frames:
+                break
+    finally:
+        cap.release()
+    return frames
+
+
+def _run_once(
+    frames: List[np.ndarray],
+    batch_size: int,
+    *,
+    detection_model: Optional[str],
+    backend: str,
+    conf: float,
+    iou: float,
+    tracker: Optional[str],
+) -> Tuple[float, List[List[int]]]:
+    """Returns (elapsed seconds, track IDs per frame). A fresh model per run so tracker state starts clean."""
+    from src.vision.detection.yolo import _get_model, detect_persons_arrays, track_persons_arrays
+    from src.vision.tracking.mot import is_courtflow_tracker, make_tracker
+
+    model = _get_model(detection_model, backend=backend)
+    model.predict(frames[0], verbose=False)  # warm-up (not timed)
+    ids: List[List[int]] = []
+    t0 = time.perf_counter()
+    if batch_size <= 1 and not is_courtflow_tracker(tracker):
+        for frame in frames:
+            dets = track_persons_arrays(frame, model=model, conf=conf, iou=iou, tracker=tracker)
+            ids.append(dets.track_ids.tolist())
+    else:
+        mot = make_tracker(tracker, frame_rate=30)
+        for start in range(0, len(frames), max(1, batch_size)):
+            chunk = frames[start:start + batch_size]
+            for frame, dets in zip(chunk, detect_persons_arrays(chunk, model=model, conf=conf, iou=iou)):
+                ids.append(mot.update(dets, frame).track_ids.tolist())
+    return time.perf_counter() - t0, ids
+
+
+def _tracker_benchmark(
+    frames: List[np.ndarray],
+    trackers: List[str],
+    *,
+    detection_model: Optional[str],
+    backend: str,
+    conf: float,
+    iou: float,
+) -> None:
+    """Detect once, then time only the tracker update step of each tracker on the same detections."""
+    from src.vision.detection.yolo import _get_model, detect_persons_arrays
+    from src.vision.tracking.mot import make_tracker
+
+    model = _get_model(detection_model, backend=backend)
+    dets = [detect_persons_arrays([f], model=model, conf=conf, iou=iou)[0] for f in frames]
+    n_dets = sum(len(d) for d in dets)
+    print(f"Tracker update cost over {len(frames)} frames ({n_dets} detections)")
+    for name in trackers:
+        mot = make_tracker(name, frame_rate=30)
+        t0 = time.perf_counter()
+        ids = set()
+        for frame, d in zip(frames, dets):
+            ids.update(mot.update(d, frame).track_ids.tolist())
+        elapsed = time.perf_counter() - t0
+        print(f"  {name:<16s} {1e3 * elapsed / len(frames):8.3f} ms/frame  {len(ids)} track IDs")
+
+
+def _roi_microbenchmark(
+    polygon: List[Tuple[float, float]],
+    width: int,
+    height: int,
+    *,
+    n_frames: int,
+    points_per_frame: int = 10,
+    seed: int = 0,
+) -> None:
+    """Time ROI point filtering of n_frames x points_per_frame random ground points, three ways."""
+    from src.vision.roi_filter.filter import RoiMask, point_in_polygon, points_in_polygon
+
+    rng = np.random.default_rng(seed)
+    points = rng.uniform((0, 0), (width, height), size=(n_frames, points_per_frame, 2))
+    n = n_frames * points_per_frame
+
+    t0 = time.perf_counter()
+    ref = np.array([[point_in_polygon(x, y, polygon) for x, y in frame] for frame in points.tolist()])
+    t_loop = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    vec = np.stack([points_in_polygon(frame, polygon) for frame in points])
+    t_vec = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    roi = RoiMask.from_polygon(polygon, width, height)
+    t_raster = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    masked = np.stack([roi.contains(frame) for frame in points])
+    t_mask = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    whole = roi.contains(points.reshape(-1, 2)).reshape(n_frames, points_per_frame)
+    t_whole = time.perf_counter() - t0
+
+    print(f"ROI filter: {n_frames} frames x {points_per_frame} points ({width}x{height}, {len(polygon)}-gon)")
+    rows = [
+        ("pointPolygonTest per point", t_loop, ref),
+        ("vectorized polygon per frame", t_vec, vec),
+        ("raster mask per frame", t_mask, masked),
+        ("raster mask whole batch", t_whole, whole),
+    ]
+    for name, elapsed, result in rows:
+        agree = 100.0 * np.count_nonzero(result == ref) / n
+        print(
+            f"  {name:<30s} {1e6 * elapsed / n:8.3f} us/point  x{t_loop / max(elapsed, 1e-12):7.1f}  "
+            f"agreement {agree:.3f}%"
+        )
+    print(f"  (rasterizing the mask once: {1e3 * t_raster:.2f} ms)")
+
+
+def _decode_benchmark(video_path: Path, sample_every: int, max_frames: int, imgsz: int) -> None:
+    """Frames/s of the stage 02 frame sources over the first max_frames sampled frames."""
+    import cv2
+    from src.video import frames_ffmpeg
+    from src.video.frames_opencv import iter_sampled_frames
+    from src.vision.pipeline import _decode_size
+
+    cap = cv2.VideoCapture(str(video_path))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    width, height = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 0), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
+    cap.release()
+    end = max_frames * max(1, sample_every)
+    scaled = _decode_size(width, height, width, height, imgsz)
+
+    def _opencv():
+        cap = cv2.VideoCapture(str(video_path))
+        try:
+            return sum(1 for _ in iter_sampled_frames(cap, sample_every, end_frame=end))
+        finally:
+            cap.release()
+
+    def _ffmpeg(size):
+        reader = frames_ffmpeg.FfmpegFrameReader(
+            video_path, width=width, height=height, fps=fps, every_n=sample_every, end_frame=end, size=size,
+        )
+        return sum(1 for _ in reader)
+
+    rows = [("opencv", _opencv), ("ffmpeg native", lambda: _ffmpeg(None))]
+    if scaled is not None:
+        rows.append((f"ffmpeg {scaled[0]}x{scaled[1]}", lambda: _ffmpeg(scaled)))
+    print(f"Decode benchmark: {width}x{height}, every {sample_every} frames, up to {max_frames} sampled frames")
+    base = None
+    for name, fn in rows:
+        t0 = time.perf_counter()
+        n = fn()
+        elapsed = time.perf_counter() - t0
+        rate = n / elapsed if elapsed > 0 else 0.0
+        base = base or rate
+        print(f"  {name:<20s} {elapsed:7.2f}s  {rate:8.2f} frames/s  x{rate / max(base, 1e-12):.2f}")
+
+
+def _video_size(video_path: Path) -> Tuple[int, int]:
+    import cv2
+    cap = cv2.VideoCapture(str(video_path))
+    try:
+        return int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 0), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
+    finally:
+        cap.release()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(prog="courtflow-benchmark", description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--mode", default="detect", choices=["detect", "tracker", "roi", "decode"], help="detect (default), tracker update, roi filtering or frame decoding")
+    ap.add_argument("--video", required=True, help="Video to benchmark on (roi mode: only its frame size)")
+    ap.add_argument("--frames", type=int, default=240, help="Number of sampled frames to run")
+    ap.add_argument("--sample_every", type=int, default=5, help="Sample every N frames when loading")
+    ap.add_argument("--batch-sizes", dest="batch_sizes", type=int, nargs="+", default=[1, 4, 8])
+    ap.add_argument("--conf", type=float, default=0.4)
+    ap.add_argument("--iou", type=float, default=0.5)
+    ap.add_argument("--tracker", default=None, help="Tracker config e.g. bytetrack.yaml or courtflow (default: BoT-SORT)")
+    ap.add_argument("--trackers", nargs="+", default=["botsort.yaml", "bytetrack.yaml", "courtflow"], help="tracker mode: trackers to compare")
+    ap.add_argument("--detection-model", dest="detection_model", default=None)
+    ap.add_argument("--backend", default="torch", choices=["torch", "onnx", "openvino"])
+    ap.add_argument("--imgsz", type=int, default=640, help="decode mode: size ffmpeg scales the longest side to")
+    ap.add_argument("--device", default="cpu", help="cpu (default) or cuda")
+    ap.add_argument("--roi", default=None, help="roi mode: calibration dir or roi_polygon.json")
+    args = ap.parse_args()
+
+    if args.mode == "roi":
+        from src.court.calibration.roi import load_roi_polygon
+        roi_path = Path(args.roi or "")
+        polygon = load_roi_polygon(roi_path.parent if roi_path.suffix == ".json" else roi_path)
+        if not polygon:
+            raise SystemExit(f"No ROI polygon found at {args.roi}")
+        width, height = _video_size(Path(args.video))
+        if not width or not height:
+            raise SystemExit(f"Cannot read frame size of {args.video}")
+        _roi_microbenchmark(polygon, width, height, n_frames=max(1, args.frames) * 100)
+        return
+
+    if args.mode == "decode":
+        _decode_benchmark(Path(args.video), args.sample_every, args.frames, args.imgsz)
+        return
+
+    if args.device == "cpu":
+        os.environ["CUDA_VISIBLE_DEVICES"] = ""
+
+    frames = _load_frames(Path(args.video), args.sample_every, args.frames)
+    if not frames:
+        raise SystemExit(f"No frames read from {args.video}")
+    print(
+        f"Benchmark: {len(frames)} frames ({frames[0].shape[1]}x{frames[0].shape[0]}), "
+        f"device={args.device}, backend={args.backend}"
+    )
+    if args.mode == "tracker":
+        _tracker_benchmark(
+            frames, args.trackers,
+            detection_model=args.detection_model,
+            backend=args.backend,
+            conf=args.conf,
+            iou=args.iou,
+        )
+        return
+
+    baseline_fps = None
+    baseline_ids = None
+    for bs in args.batch_sizes:
+        elapsed, ids = _run_once(
+            frames, bs,
+            detection_model=args.detection_model,
+            backend=args.backend,
+            conf=args.conf,
+            iou=args.iou,
+            tracker=args.tracker,
+        )
+        fps = len(frames) / elapsed if elapsed > 0 else 0.0
+        if baseline_fps is None:
+            baseline_fps, baseline_ids = fps, ids
+        same = "yes" if ids == baseline_ids else "NO"
+        print(
+            f"  batch={bs:<3d} {elapsed:7.2f}s  {fps:7.2f} frames/s  "
+            f"x{fps / baseline_fps:.2f} vs batch={args.batch_sizes[0]}  same IDs: {same}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Detection backends: PyTorch weights (default) or ONNX Runtime / OpenVINO exports of the same .pt.
+Exports are cached on disk under MODEL_CACHE_DIR/<stem>_<sha256[:16]>_<imgsz>/ and reused on later runs.
+The exported model is loaded back through ultralytics YOLO, so predict/track keep the same output.
+Uses: ultralytics (export), onnxruntime or openvino (optional, only for the matching backend).
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+from pathlib import Path
+from typing import Optional
+
+from src.config.settings import MODEL_CACHE_DIR
+
+DETECTION_BACKENDS = ("torch", "onnx", "openvino")
+DEFAULT_IMGSZ = 640
+
+
+def file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 hex digest of a file (weights are small enough to hash fully)."""
+    h = hashlib.sha256()
+    with Path(path).open("rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def exported_model_path(
+    weights_path: Path,
+    backend: str,
+    imgsz: int = DEFAULT_IMGSZ,
+    cache_dir: Optional[Path] = None,
+) -> Path:
+    """Cache location of the export of weights_path for backend at imgsz (may not exist yet)."""
+    weights_path = Path(weights_path)
+    key = f"{weights_path.stem}_{file_sha256(weights_path)[:16]}_{int(imgsz)}"
+    root = Path(cache_dir or MODEL_CACHE_DIR) / key
+    if backend == "onnx":
+        return root / f"{weights_path.stem}.onnx"
+    if backend == "openvino":
+        return root / f"{weights_path.stem}_openvino_model"
+    raise ValueError(f"Unknown export backend: {backend} (expected one of {DETECTION_BACKENDS[1:]})")
+
+
+def export_to_backend(
+    weights_path: Path,
+    backend: str,
+    imgsz: int = DEFAULT_IMGSZ,
+    *,
+    model=None,
+    cache_dir: Optional[Path] = None,
+) -> Path:
+    """
+    Export .pt weights to backend ("onnx" / "openvino") unless a cached export exists; returns the cached path.
+    model: the already-loaded PyTorch YOLO for weights_path (loaded here if None and an export is needed).
+    Dynamic input shapes so batched and ROI-cropped inference work.
+    """
+    target = exported_model_path(weights_path, backend, imgsz, cache_dir)
+    if target.exists():
+        return target
+    if model is None:
+        from ultralytics import YOLO
+        model = YOLO(str(weights_path))
+    print(f"   Exporting {Path(weights_path).name} to {backend} (imgsz={imgsz}); cached at {target.parent}")
+    exported = Path(model.export(format=backend, imgsz=int(imgsz), dynamic=True, verbose=False))
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(target.name + ".tmp")
+    if tmp.exists():
+        shutil.rmtree(tmp) if tmp.is_dir() else tmp.unlink()
+    shutil.move(str(exported), str(tmp))
+    os.replace(tmp, target)
+    return target
+
+
+def load_exported_model(
+    weights_path: Path,
+    backend: str,
+    imgsz: int = DEFAULT_IMGSZ,
+    *,
+    model=None,
+    cache_dir: Optional[Path] = None,
+):
+    """YOLO model running the backend's cached export of weights_path (exported first if missing)."""
+    from ultralytics import YOLO
+    path = export_to_backend(weights_path, backend, imgsz, model=model, cache_dir=cache_dir)
+    return YOLO(str(path), task="detect")
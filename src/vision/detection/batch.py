@@ -0,0 +1,113 @@
+"""
+DetectionBatch: one frame's detections as contiguous NumPy arrays (boxes, scores, classes, track IDs).
+Filled with a single device-to-host copy of the YOLO result; ROI filtering and ground points run
+vectorized on it, and dicts (detect_persons / track_persons format) are only built at the edges.
+Uses: numpy.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+
+def _as_float(a) -> np.ndarray:
+    """Contiguous float array; float32/float64 input is kept as is so values round-trip exactly."""
+    a = np.ascontiguousarray(a)
+    return a if a.dtype in (np.float32, np.float64) else a.astype(np.float32)
+
+
+@dataclass
+class DetectionBatch:
+    boxes: np.ndarray  # (n, 4) xyxy pixels (float32 from the detector; float64 once offset / tracked)
+    scores: np.ndarray  # (n,)
+    classes: np.ndarray  # (n,) int32
+    track_ids: np.ndarray  # (n,) int64, -1 = not tracked
+
+    @classmethod
+    def empty(cls) -> "DetectionBatch":
+        return cls(
+            np.zeros((0, 4), dtype=np.float32),
+            np.zeros(0, dtype=np.float32),
+            np.zeros(0, dtype=np.int32),
+            np.zeros(0, dtype=np.int64),
+        )
+
+    @classmethod
+    def from_arrays(
+        cls,
+        boxes: np.ndarray,
+        scores: np.ndarray,
+        classes: np.ndarray,
+        track_ids: Optional[np.ndarray] = None,
+    ) -> "DetectionBatch":
+        n = len(scores)
+        return cls(
+            _as_float(boxes).reshape(n, 4),
+            _as_float(scores),
+            np.ascontiguousarray(classes).astype(np.int32),
+            np.full(n, -1, dtype=np.int64) if track_ids is None else np.asarray(track_ids).astype(np.int64),
+        )
+
+    @classmethod
+    def from_boxes(cls, boxes) -> "DetectionBatch":
+        """
+        From an ultralytics Boxes object with one copy of boxes.data:
+        (n, 6) [x1, y1, x2, y2, conf, cls] or, when tracked, (n, 7) [x1, y1, x2, y2, id, conf, cls].
+        """
+        if boxes is None or not len(boxes):
+            return cls.empty()
+        data = boxes.data
+        data = np.asarray(data.cpu().numpy() if hasattr(data, "cpu") else data)
+        track_ids = data[:, 4] if data.shape[1] == 7 else None
+        return cls.from_arrays(data[:, :4], data[:, -2], data[:, -1], track_ids)
+
+    @classmethod
+    def from_dicts(cls, detections: List[dict]) -> "DetectionBatch":
+        if not detections:
+            return cls.empty()
+        return cls.from_arrays(
+            np.array([d["bbox_xyxy"] for d in detections], dtype=np.float64),
+            np.array([d.get("confidence", 1.0) for d in detections], dtype=np.float64),
+            np.array([d.get("class_id", 0) for d in detections], dtype=np.int32),
+            np.array([d.get("track_id", -1) for d in detections], dtype=np.int64),
+        )
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def __getitem__(self, idx) -> "DetectionBatch":
+        """Boolean mask or index array -> sub-batch."""
+        return DetectionBatch(self.boxes[idx], self.scores[idx], self.classes[idx], self.track_ids[idx])
+
+    def offset(self, dx: float, dy: float) -> "DetectionBatch":
+        """Shift boxes by (dx, dy), e.g. from crop to full-frame coordinates."""
+        if not dx and not dy:
+            return self
+        boxes = self.boxes.astype(np.float64) + np.array([dx, dy, dx, dy], dtype=np.float64)
+        return DetectionBatch(boxes, self.scores, self.classes, self.track_ids)
+
+    def scale(self, sx: float, sy: float) -> "DetectionBatch":
+        """Scale boxes per axis, e.g. from a downscaled decode back to full-frame coordinates."""
+        if sx == 1 and sy == 1:
+            return self
+        boxes = self.boxes.astype(np.float64) * np.array([sx, sy, sx, sy], dtype=np.float64)
+        return DetectionBatch(boxes, self.scores, self.classes, self.track_ids)
+
+    def ground_points(self) -> np.ndarray:
+        """(n, 2) bbox bottom-centre (center_x, y2) per detection, as bbox_to_ground_point."""
+        b = self.boxes.astype(np.float64)
+        return np.stack([(b[:, 0] + b[:, 2]) * 0.5, b[:, 3]], axis=1).reshape(-1, 2)
+
+    def to_dicts(self, *, track_ids: bool = False) -> List[dict]:
+        """detect_persons format; track_ids=True adds "track_id" (-1 if untracked) as in track_persons."""
+        out = []
+        for box, score, cls_id, tid in zip(
+            self.boxes.tolist(), self.scores.tolist(), self.classes.tolist(), self.track_ids.tolist()
+        ):
+            d = {"bbox_xyxy": box, "confidence": score, "class_id": cls_id}
+            if track_ids:
+                d["track_id"] = tid
+            out.append(d)
+        return out
@@ -0,0 +1,152 @@
+"""
+Per-match cache of raw YOLO detections (boxes, confidences, classes per sampled frame), so reruns that
+only change tracker or ROI-filter settings replay detections instead of running inference again.
+Keyed by video content hash, model weights hash and everything that changes the detector output
+(conf, iou, sample_every_n_frames, backend, imgsz, ROI crop window, decoder scaling).
+Layout: <match_dir>/cache/detections/<key>/<first>-<last>.npz, one chunk per run (segments and
+resumed runs add chunks; all chunks are merged on load).
+Uses: numpy, utils/io.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.utils.io import ensure_dir, read_json, write_json_atomic
+from src.vision.detection.batch import DetectionBatch
+
+DETECTION_CACHE_VERSION = 1
+
+_Entry = Tuple[np.ndarray, np.ndarray, np.ndarray]  # boxes (n, 4) f4, scores (n,) f4, classes (n,) i2
+
+
+def detection_cache_dir(match_dir: Path) -> Path:
+    return match_dir / "cache" / "detections"
+
+
+def video_content_hash(video_path: Path, memo_dir: Path) -> str:
+    """
+    SHA-256 of the video file. Memoized in memo_dir/video_sha256.json by (path, size, mtime) so
+    long videos are hashed once per match, not on every run.
+    """
+    from src.vision.detection.backends import file_sha256
+    st = video_path.stat()
+    ident = {"path": str(video_path.resolve()), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    memo_path = memo_dir / "video_sha256.json"
+    if memo_path.exists():
+        try:
+            memo = read_json(memo_path)
+        except (OSError, ValueError):
+            memo = {}
+        if {k: memo.get(k) for k in ident} == ident and memo.get("sha256"):
+            return memo["sha256"]
+    digest = file_sha256(video_path)
+    ensure_dir(memo_dir)
+    write_json_atomic(memo_path, {**ident, "sha256": digest})
+    return digest
+
+
+def detection_cache_key(
+    video_hash: str,
+    model_id: str,
+    *,
+    conf: float,
+    iou: float,
+    sample_every_n_frames: int,
+    backend: str,
+    imgsz: int,
+    crop: Optional[Sequence[int]] = None,
+    decode_size: Optional[Sequence[int]] = None,
+) -> str:
+    payload = {
+        "version": DETECTION_CACHE_VERSION,
+        "video": video_hash,
+        "model": model_id,
+        "conf": float(conf),
+        "iou": float(iou),
+        "sample_every_n_frames": int(sample_every_n_frames),
+        "backend": backend,
+        "imgsz": int(imgsz),
+        "crop": list(crop) if crop is not None else None,
+    }
+    if decode_size is not None:  # only when frames are downscaled in the decoder, so existing keys stay valid
+        payload["decode_size"] = list(decode_size)
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()[:24]
+
+
+class DetectionCache:
+    """
+    Raw detections for one cache key. get() returns a frame's DetectionBatch (None on miss); put()
+    records a frame's detections; save() writes frames added since load as a new chunk.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._entries: Dict[int, _Entry] = {}
+        self._new: List[int] = []
+        self.hits = 0
+        self.misses = 0
+        if path.is_dir():
+            for chunk in sorted(path.glob("*.npz")):
+                self._load_chunk(chunk)
+
+    @classmethod
+    def for_match(cls, match_dir: Path, key: str) -> "DetectionCache":
+        return cls(detection_cache_dir(match_dir) / key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _load_chunk(self, chunk: Path) -> None:
+        try:
+            with np.load(chunk) as z:
+                frames, counts = z["frames"], z["counts"]
+                boxes, scores, classes = z["boxes"], z["scores"], z["classes"]
+        except (OSError, ValueError, KeyError):
+            return  # partial/corrupt chunk: those frames are simply inferred again
+        ends = np.cumsum(counts)
+        starts = ends - counts
+        for frame_idx, s, e in zip(frames.tolist(), starts.tolist(), ends.tolist()):
+            self._entries[frame_idx] = (boxes[s:e], scores[s:e], classes[s:e])
+
+    def get(self, frame_idx: int) -> Optional[DetectionBatch]:
+        entry = self._entries.get(frame_idx)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return DetectionBatch.from_arrays(*entry)
+
+    def put(self, frame_idx: int, dets: DetectionBatch) -> None:
+        self._entries[frame_idx] = (
+            dets.boxes.astype(np.float32).reshape(-1, 4),
+            dets.scores.astype(np.float32),
+            dets.classes.astype(np.int16),
+        )
+        self._new.append(frame_idx)
+
+    def save(self) -> Optional[Path]:
+        """Write frames added since load/last save as one chunk (atomic). Returns the chunk path."""
+        if not self._new:
+            return None
+        frames = sorted(set(self._new))
+        entries = [self._entries[f] for f in frames]
+        arrays: Dict[str, Any] = {
+            "frames": np.asarray(frames, dtype=np.int64),
+            "counts": np.asarray([len(e[1]) for e in entries], dtype=np.int32),
+            "boxes": np.concatenate([e[0] for e in entries]).astype(np.float32).reshape(-1, 4),
+            "scores": np.concatenate([e[1] for e in entries]).astype(np.float32),
+            "classes": np.concatenate([e[2] for e in entries]).astype(np.int16),
+        }
+        ensure_dir(self.path)
+        out = self.path / f"{frames[0]:08d}-{frames[-1]:08d}-{os.getpid()}.npz"
+        tmp = out.with_suffix(".tmp.npz")
+        np.savez_compressed(tmp, **arrays)
+        os.replace(tmp, out)
+        self._new = []
+        return out
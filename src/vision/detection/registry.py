@@ -0,0 +1,105 @@
+"""
+Process-level YOLO model pool: each (weights, backend, imgsz, mode) is loaded and warmed up once and
+handed out to every later run in the same process (daily-check, API-triggered runs), so per-match
+startup is near zero after the first match. Tracker state is reset on every hand-out. When the weights
+file behind a model name/path changes (new SHA-256), the stale model is dropped from the pool.
+Models are shared, not copied: one run at a time per process per model, except through
+get_detection_service(), which puts a DetectionService (detection/service.py) in front of a pooled
+model so concurrent runs can share it (each with its own tracker).
+Uses: vision/detection/yolo, vision/detection/service.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+_PoolKey = Tuple[str, str, int, Optional[str]]
+
+_POOL: Dict[_PoolKey, Any] = {}
+_SOURCES: Dict[Tuple[Optional[str], str, int, Optional[str]], _PoolKey] = {}  # requested model -> current key
+_SERVICES: Dict[_PoolKey, Any] = {}
+_LOCK = threading.Lock()
+
+
+def reset_tracker_state(model: Any) -> None:
+    """Clear model.track(persist=True) state (tracks, frame counter, camera motion) left by a previous run."""
+    predictor = getattr(model, "predictor", None)
+    for tracker in getattr(predictor, "trackers", None) or []:
+        tracker.reset()
+    if predictor is not None and hasattr(predictor, "vid_path"):
+        predictor.vid_path = [None] * len(predictor.vid_path)
+
+
+def _warm_up(model: Any, imgsz: int) -> None:
+    """One dummy inference so lazy setup (predictor, backend session, kernels) happens before the first frame."""
+    model.predict(np.zeros((imgsz, imgsz, 3), dtype=np.uint8), verbose=False)
+
+
+def get_pooled_model(
+    detection_model: Optional[str] = None,
+    *,
+    backend: str = "torch",
+    imgsz: int = 640,
+    tracker: Optional[str] = None,
+    stats: Optional[Dict[str, Any]] = None,
+):
+    """
+    Model for run_tracking from the process pool (loaded + warmed up on first use).
+    tracker: set when the caller runs model.track (per-frame path). Such models get their own pool
+    entry per tracker config, because model.track attaches a tracker to the model, and their
+    tracker state is reset before they are handed out.
+    stats: optional dict; model_pooled (bool) and model_load_s are set in place.
+    """
+    from src.vision.detection.yolo import _get_model, model_identity
+
+    t0 = time.perf_counter()
+    key: _PoolKey = (model_identity(detection_model), backend, int(imgsz), tracker)
+    source = (detection_model, backend, int(imgsz), tracker)
+    with _LOCK:
+        stale = _SOURCES.get(source)
+        if stale is not None and stale != key and stale not in [k for s, k in _SOURCES.items() if s != source]:
+            _POOL.pop(stale, None)  # weights file replaced since it was loaded
+            service = _SERVICES.pop(stale, None)
+            if service is not None:
+                service.close()
+        _SOURCES[source] = key
+        model = _POOL.get(key)
+        pooled = model is not None
+        if model is None:
+            model = _get_model(detection_model, backend=backend, imgsz=imgsz)
+            _warm_up(model, imgsz)
+            _POOL[key] = model
+    reset_tracker_state(model)
+    if stats is not None:
+        stats["model_pooled"] = pooled
+        stats["model_load_s"] = round(time.perf_counter() - t0, 3)
+    return model
+
+
+def get_detection_service(
+    detection_model: Optional[str] = None,
+    *,
+    backend: str = "torch",
+    imgsz: int = 640,
+    stats: Optional[Dict[str, Any]] = None,
+):
+    """
+    Process-wide DetectionService over the pooled (detect-only) model: use it in place of the model in
+    detect_persons_arrays from any number of concurrent runs. Frames of runs that are inferring at the
+    same time are batched into one predict call; the caller keeps tracker state (decoupled tracker).
+    """
+    from src.vision.detection.service import DetectionService
+
+    model = get_pooled_model(detection_model, backend=backend, imgsz=imgsz, stats=stats)
+    with _LOCK:
+        key = _SOURCES[(detection_model, backend, int(imgsz), None)]
+        service = _SERVICES.get(key)
+        if service is None or service.model is not model:
+            if service is not None:
+                service.close()
+            service = DetectionService(model)
+            _SERVICES[key] = service
+    return service
@@ -0,0 +1,122 @@
+"""
+Detection service: one set of weights per process serving several concurrent streams (matches).
+Streams call predict() from their own threads; a single inference thread gathers the frames of all
+pending requests (same predict settings) into one batched model.predict call and hands each stream its
+own results. Tracker state never lives in the model: every stream runs its own decoupled tracker
+(vision/tracking/mot.py), so streams cannot see each other's tracks.
+Uses: threading, queue, concurrent.futures.
+"""
+from __future__ import annotations
+
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, List, Tuple
+
+# Frames per batched predict, and how long the inference thread waits for other streams' frames
+# once it holds a request
+DEFAULT_SERVICE_MAX_BATCH = 16
+DEFAULT_SERVICE_MAX_WAIT_S = 0.005
+
+_STOP = object()
+
+
+class DetectionService:
+    """
+    Thread-safe stand-in for a YOLO model in detect_persons_arrays: predict(frames, **kwargs) blocks
+    until the frames went through the shared model, possibly batched with other streams' frames.
+    Requests with different predict kwargs (conf, iou, ...) are never mixed in one call.
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        *,
+        max_batch: int = DEFAULT_SERVICE_MAX_BATCH,
+        max_wait_s: float = DEFAULT_SERVICE_MAX_WAIT_S,
+    ):
+        self.model = model
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait_s = max(0.0, float(max_wait_s))
+        self._requests: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._counters = {"calls": 0, "frames": 0, "requests": 0, "multi_stream_calls": 0}
+        self._thread = threading.Thread(target=self._run, name="detection-service", daemon=True)
+        self._thread.start()
+
+    def predict(self, frames: List[Any], **kwargs: Any) -> List[Any]:
+        frames = list(frames) if isinstance(frames, (list, tuple)) else [frames]
+        if not frames:
+            return []
+        if not self._thread.is_alive():
+            raise RuntimeError("Detection service is closed")
+        fut: Future = Future()
+        self._requests.put((frames, kwargs, threading.get_ident(), fut))
+        return fut.result()
+
+    def _gather(self, first: Tuple) -> Tuple[List[Tuple], bool]:
+        """first plus the requests arriving within max_wait_s, up to max_batch frames. (requests, stop seen)"""
+        pending = [first]
+        n = len(first[0])
+        while n < self.max_batch:
+            try:
+                item = self._requests.get(timeout=self.max_wait_s) if self.max_wait_s else self._requests.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return pending, True
+            pending.append(item)
+            n += len(item[0])
+        return pending, False
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            item = self._requests.get()
+            if item is _STOP:
+                break
+            pending, stop = self._gather(item)
+            groups: Dict[Tuple, List[Tuple]] = {}
+            for req in pending:
+                groups.setdefault(tuple(sorted((k, repr(v)) for k, v in req[1].items())), []).append(req)
+            for reqs in groups.values():
+                self._predict_group(reqs)
+        # Fail whatever is still queued instead of leaving callers blocked
+        while True:
+            try:
+                item = self._requests.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                item[3].set_exception(RuntimeError("Detection service is closed"))
+
+    def _predict_group(self, reqs: List[Tuple]) -> None:
+        frames = [f for req in reqs for f in req[0]]
+        try:
+            results = list(self.model.predict(frames, **reqs[0][1]))
+        except BaseException as e:  # surfaced in the calling streams
+            for req in reqs:
+                req[3].set_exception(e)
+            return
+        with self._lock:
+            self._counters["calls"] += 1
+            self._counters["frames"] += len(frames)
+            self._counters["requests"] += len(reqs)
+            self._counters["multi_stream_calls"] += len({req[2] for req in reqs}) > 1
+        start = 0
+        for req in reqs:
+            req[3].set_result(results[start:start + len(req[0])])
+            start += len(req[0])
+
+    def stats(self) -> Dict[str, Any]:
+        """Cumulative counters since the service started (all streams)."""
+        with self._lock:
+            out: Dict[str, Any] = dict(self._counters)
+        out["mean_batch_frames"] = round(out["frames"] / out["calls"], 2) if out["calls"] else 0.0
+        return out
+
+    def close(self) -> None:
+        """Stop the inference thread after the requests already queued."""
+        if self._thread.is_alive():
+            self._requests.put(_STOP)
+            self._thread.join()
@@ -4,21 +4,31 @@ Uses: ultralytics, numpy. COCO class 0 = person.
 Default: pretrained YOLO (yolo26n.pt / yolov8n.pt). For better detection use a custom-trained
 model: set COURTFLOW_DETECTION_MODEL to path to your best.pt or pass detection_model to run_tracking.
 Default tracker: BoT-SORT (Ultralytics). Use tracker="bytetrack.yaml" for ByteTrack.
+CPU backends: _get_model(backend="onnx" | "openvino") runs a cached export of the same weights (backends.py).
+The *_arrays variants return DetectionBatch (batch.py); the dict variants are built from them.
+DetectorCascade runs a fast (nano) model on every frame and a heavy (custom) model only on frames
+where the fast result looks unreliable.
 """
 from __future__ import annotations
 
+import json
 import os
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
 
+from src.vision.detection.batch import DetectionBatch
+
 # COCO person class id
 COCO_PERSON_CLASS_ID = 0
 
 # Pretrained model name (downloaded on first use) when no custom weights are given
 DEFAULT_PRETRAINED = "yolo26n.pt"
 
+# (resolved path, st_size, st_mtime_ns) -> SHA-256, so repeated lookups skip rehashing unchanged weights
+_IDENTITY_CACHE: Dict[Tuple[str, int, int], str] = {}
+
 
 def _resolve_model_path(value: str) -> Optional[Path]:
     """If value is a path to an existing .pt file, return it (absolute); else None."""
@@ -37,63 +47,197 @@ def _resolve_model_path(value: str) -> Optional[Path]:
     return None
 
 
-def _get_model(model_name_or_path: Optional[str] = None):
+def model_identity(model_name_or_path: Optional[str] = None) -> str:
+    """
+    Stable identity of the weights _get_model would load: SHA-256 of the resolved .pt file, or the
+    pretrained model name when it is not on disk yet. The hash is memoized per file size and mtime,
+    so a replaced weights file is hashed again.
+    """
+    value = model_name_or_path or os.getenv("COURTFLOW_DETECTION_MODEL") or DEFAULT_PRETRAINED
+    path = _resolve_model_path(value)
+    if path is None:
+        return value
+    st = path.stat()
+    key = (str(path.resolve()), st.st_size, st.st_mtime_ns)
+    digest = _IDENTITY_CACHE.get(key)
+    if digest is None:
+        from src.vision.detection.backends import file_sha256
+        digest = _IDENTITY_CACHE[key] = file_sha256(path)
+    return digest
+
+
+def _get_model(
+    model_name_or_path: Optional[str] = None,
+    *,
+    backend: str = "torch",
+    imgsz: int = 640,
+):
     """
     Load YOLO model for person detection.
     - If model_name_or_path is a path to an existing .pt file (or set via env COURTFLOW_DETECTION_MODEL),
       loads that custom-trained weights file (no pretrained download).
     - Otherwise uses pretrained: yolo26n.pt (falls back to yolov8n.pt if unavailable).
+    - backend "onnx" / "openvino": export those weights once (cached by weights hash + imgsz, see
+      detection/backends.py) and run the exported model; detect/track output is unchanged.
     """
     from ultralytics import YOLO
     value = model_name_or_path or os.getenv("COURTFLOW_DETECTION_MODEL") or DEFAULT_PRETRAINED
     path = _resolve_model_path(value)
+    if backend != "torch" and path is not None:
+        from src.vision.detection.backends import load_exported_model
+        return load_exported_model(path, backend, imgsz)
     if path is not None:
-        return YOLO(str(path))
-    try:
-        return YOLO(value)
-    except Exception:
-        if value.startswith("yolo26"):
-            return YOLO("yolov8n.pt")
-        raise
+        model = YOLO(str(path))
+    else:
+        try:
+            model = YOLO(value)
+        except Exception:
+            if value.startswith("yolo26"):
+                model = YOLO("yolov8n.pt")
+            else:
+                raise
+    if backend == "torch":
+        return model
+    # Pretrained name just downloaded: export from the weights file it was loaded from
+    from src.vision.detection.backends import load_exported_model
+    weights = Path(getattr(model, "ckpt_path", None) or "")
+    if not weights.is_file():
+        raise FileNotFoundError(f"Cannot export for backend {backend}: weights file not found ({weights})")
+    return load_exported_model(weights, backend, imgsz, model=model)
 
 
-def detect_persons(
-    frame_bgr: np.ndarray,
+def detect_persons_arrays(
+    frames_bgr: List[np.ndarray],
     model=None,
     *,
     conf: float = 0.4,
     iou: float = 0.5,
-) -> List[dict]:
+) -> List[DetectionBatch]:
     """
-    Run person detection on one frame. Returns list of detections.
-    Each detection: {"bbox_xyxy": [x1,y1,x2,y2], "confidence": float, "class_id": int}.
+    Person detection on one or more frames with a single (batched) predict call.
+    Returns one DetectionBatch per input frame (same order), each filled with one host copy.
     """
+    if not frames_bgr:
+        return []
     if model is None:
         model = _get_model()
     results = model.predict(
-        frame_bgr,
+        list(frames_bgr),
         classes=[COCO_PERSON_CLASS_ID],
         conf=conf,
         iou=iou,
         verbose=False,
     )
-    out = []
-    for r in results:
-        if r.boxes is None:
-            continue
-        for i in range(len(r.boxes)):
-            xyxy = r.boxes.xyxy[i].cpu().numpy().tolist()
-            conf_val = float(r.boxes.conf[i].cpu().numpy())
-            cls_id = int(r.boxes.cls[i].cpu().numpy())
-            out.append({
-                "bbox_xyxy": [float(x) for x in xyxy],
-                "confidence": conf_val,
-                "class_id": cls_id,
-            })
-    return out
+    return [DetectionBatch.from_boxes(r.boxes) for r in results]
 
 
-def track_persons(
+def _mean_best_iou(prev: np.ndarray, cur: np.ndarray) -> float:
+    """Mean over prev boxes of the best IoU with any cur box (1.0 when prev is empty)."""
+    if not len(prev):
+        return 1.0
+    if not len(cur):
+        return 0.0
+    from src.vision.tracking.mot import iou_matrix
+    return float(iou_matrix(prev, cur).max(axis=1).mean())
+
+
+class DetectorCascade:
+    """
+    Two-tier person detection: fast_model on every frame (one batched predict), heavy_model re-detects
+    the frames whose fast result is unreliable, again batched. A fast result is unreliable when
+    - it does not have expected_players detections inside the ROI ("players"),
+    - one of those has confidence below min_confidence ("confidence"), or
+    - the previous frame's in-ROI boxes find no good match in it: mean best IoU below min_iou ("iou_drop").
+    Frames must be passed in order (the IoU check compares with the previous frame's fast result).
+    in_roi(dets) -> boolean mask of detections inside the court ROI (None = all count).
+    Counters: frames, heavy_frames and heavy_reasons (first failing check per heavy frame).
+    """
+
+    def __init__(
+        self,
+        fast_model,
+        heavy_model,
+        *,
+        conf: float = 0.4,
+        iou: float = 0.5,
+        expected_players: int = 4,
+        min_confidence: float = 0.5,
+        min_iou: float = 0.3,
+        in_roi: Optional[Callable[[DetectionBatch], np.ndarray]] = None,
+    ):
+        self.fast_model = fast_model
+        self.heavy_model = heavy_model
+        self.conf = conf
+        self.iou = iou
+        self.expected_players = expected_players
+        self.min_confidence = min_confidence
+        self.min_iou = min_iou
+        self.in_roi = in_roi
+        self.frames = 0
+        self.heavy_frames = 0
+        self.heavy_reasons: Dict[str, int] = {"players": 0, "confidence": 0, "iou_drop": 0}
+        self._prev_boxes: Optional[np.ndarray] = None
+
+    def _unreliable(self, dets: DetectionBatch) -> Optional[str]:
+        """Name of the first failing check, or None when the fast result can be used."""
+        players = dets if self.in_roi is None else dets[self.in_roi(dets)]
+        prev, self._prev_boxes = self._prev_boxes, players.boxes
+        if len(players) != self.expected_players:
+            return "players"
+        if len(players) and float(players.scores.min()) < self.min_confidence:
+            return "confidence"
+        if prev is not None and _mean_best_iou(prev, players.boxes) < self.min_iou:
+            return "iou_drop"
+        return None
+
+    def detect(self, frames_bgr: List[np.ndarray]) -> List[DetectionBatch]:
+        out = detect_persons_arrays(frames_bgr, self.fast_model, conf=self.conf, iou=self.iou)
+        heavy = []
+        for i, dets in enumerate(out):
+            reason = self._unreliable(dets)
+            if reason is not None:
+                heavy.append(i)
+                self.heavy_reasons[reason] += 1
+        if heavy:
+            fresh = detect_persons_arrays(
+                [frames_bgr[i] for i in heavy], self.heavy_model, conf=self.conf, iou=self.iou,
+            )
+            for i, dets in zip(heavy, fresh):
+                out[i] = dets
+        self.frames += len(out)
+        self.heavy_frames += len(heavy)
+        return out
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "cascade_frames": self.frames,
+            "cascade_heavy_frames": self.heavy_frames,
+            "cascade_heavy_fraction": round(self.heavy_frames / self.frames, 3) if self.frames else 0.0,
+            "cascade_heavy_reasons": dict(self.heavy_reasons),
+        }
+
+
+def cascade_identity(
+    fast_model: Optional[str],
+    heavy_model: Optional[str],
+    *,
+    expected_players: int,
+    min_confidence: float,
+    min_iou: float,
+    roi_polygon: Optional[Sequence[Tuple[float, float]]] = None,
+) -> str:
+    """Detection-cache model identity of a cascade: both weights and everything that picks the heavy frames."""
+    return "cascade:" + json.dumps({
+        "fast": model_identity(fast_model or DEFAULT_PRETRAINED),
+        "heavy": model_identity(heavy_model),
+        "expected_players": int(expected_players),
+        "min_confidence": float(min_confidence),
+        "min_iou": float(min_iou),
+        "roi": [list(map(float, p)) for p in roi_polygon] if roi_polygon else None,
+    }, sort_keys=True)
+
+
+def track_persons_arrays(
     frame_bgr: np.ndarray,
     model=None,
     *,
@@ -101,13 +245,8 @@ def track_persons(
     iou: float = 0.5,
     persist: bool = True,
     tracker: Optional[str] = None,
-) -> List[dict]:
-    """
-    Run detection + tracking on one frame.
-    Default tracker is BoT-SORT (Ultralytics default). Pass tracker="bytetrack.yaml" for ByteTrack.
-    Returns list of detections with track_id.
-    Each item: {"bbox_xyxy": [x1,y1,x2,y2], "confidence": float, "class_id": int, "track_id": int}.
-    """
+) -> DetectionBatch:
+    """Detection + tracking on one frame (model.track); track_ids are -1 when the tracker gave none."""
     if model is None:
         model = _get_model()
     kwargs = dict(
@@ -120,20 +259,53 @@ def track_persons(
     if tracker is not None:
         kwargs["tracker"] = tracker
     results = model.track(frame_bgr, **kwargs)
-    out = []
-    for r in results:
-        if r.boxes is None:
-            continue
-        track_ids = r.boxes.id
-        for i in range(len(r.boxes)):
-            xyxy = r.boxes.xyxy[i].cpu().numpy().tolist()
-            conf_val = float(r.boxes.conf[i].cpu().numpy())
-            cls_id = int(r.boxes.cls[i].cpu().numpy())
-            tid = int(track_ids[i].cpu().numpy()) if track_ids is not None else -1
-            out.append({
-                "bbox_xyxy": [float(x) for x in xyxy],
-                "confidence": conf_val,
-                "class_id": cls_id,
-                "track_id": tid,
-            })
-    return out
+    if not results:
+        return DetectionBatch.empty()
+    return DetectionBatch.from_boxes(results[0].boxes)
+
+
+def detect_persons(
+    frame_bgr: np.ndarray,
+    model=None,
+    *,
+    conf: float = 0.4,
+    iou: float = 0.5,
+) -> List[dict]:
+    """
+    Run person detection on one frame. Returns list of detections.
+    Each detection: {"bbox_xyxy": [x1,y1,x2,y2], "confidence": float, "class_id": int}.
+    """
+    return detect_persons_arrays([frame_bgr], model, conf=conf, iou=iou)[0].to_dicts()
+
+
+def detect_persons_batch(
+    frames_bgr: List[np.ndarray],
+    model=None,
+    *,
+    conf: float = 0.4,
+    iou: float = 0.5,
+) -> List[List[dict]]:
+    """
+    Run person detection on several frames with a single batched predict call.
+    Returns one list per input frame (same order), each in the detect_persons format.
+    """
+    return [b.to_dicts() for b in detect_persons_arrays(frames_bgr, model, conf=conf, iou=iou)]
+
+
+def track_persons(
+    frame_bgr: np.ndarray,
+    model=None,
+    *,
+    conf: float = 0.4,
+    iou: float = 0.5,
+    persist: bool = True,
+    tracker: Optional[str] = None,
+) -> List[dict]:
+    """
+    Run detection + tracking on one frame.
+    Default tracker is BoT-SORT (Ultralytics default). Pass tracker="bytetrack.yaml" for ByteTrack.
+    Returns list of detections with track_id.
+    Each item: {"bbox_xyxy": [x1,y1,x2,y2], "confidence": float, "class_id": int, "track_id": int}.
+    """
+    batch = track_persons_arrays(frame_bgr, model, conf=conf, iou=iou, persist=persist, tracker=tracker)
+    return batch.to_dicts(track_ids=True)
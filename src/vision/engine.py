@@ -0,0 +1,140 @@
+"""
+Stage 02 execution engine: decode -> inference -> post-process over batches of sampled frames.
+run_serial runs the three steps in one loop; run_threaded overlaps them with a decoder thread and an
+inference thread connected by bounded queues (backpressure keeps memory flat on long videos), while
+post-processing stays on the calling thread in frame order. The worker threads' CPU time counts toward
+the stage measured on the calling thread (utils/instrument.stage_thread).
+Uses: threading, queue, utils/instrument.
+"""
+from __future__ import annotations
+
+import queue
+import threading
+from typing import Any, Callable, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from src.utils.instrument import stage_thread
+
+Frame = Tuple[int, np.ndarray]
+Batch = List[Frame]
+InferFn = Callable[[Batch], List[Any]]
+PostFn = Callable[[Batch, List[Any]], None]
+
+_DONE = object()  # end-of-stream marker passed through the queues
+
+
+def iter_batches(frames: Iterable[Frame], batch_size: int) -> Iterator[Batch]:
+    """Group (frame_index, frame) pairs into lists of up to batch_size, preserving order."""
+    batch: Batch = []
+    for item in frames:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _close_frames(frames: Iterable[Frame]) -> None:
+    """Close a frame generator early (ends e.g. the ffmpeg subprocess behind it instead of waiting for GC)."""
+    close = getattr(frames, "close", None)
+    if close is not None:
+        close()
+
+
+def run_serial(frames: Iterable[Frame], infer: InferFn, post: PostFn, *, batch_size: int = 1) -> None:
+    """Decode, infer and post-process one batch at a time on the calling thread."""
+    try:
+        for batch in iter_batches(frames, batch_size):
+            post(batch, infer(batch))
+    finally:
+        _close_frames(frames)
+
+
+class _Failure:
+    """Wraps an exception raised in a worker thread so the consumer can re-raise it."""
+
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+def _put(q: "queue.Queue", item: Any, stop: threading.Event) -> bool:
+    """Blocking put that gives up when stop is set. Returns False if the pipeline was stopped."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def run_threaded(
+    frames: Iterable[Frame],
+    infer: InferFn,
+    post: PostFn,
+    *,
+    batch_size: int = 1,
+    queue_size: int = 4,
+) -> None:
+    """
+    Producer-consumer pipeline: decoder thread -> bounded queue -> inference thread -> bounded queue
+    -> post (calling thread). queue_size is in batches per queue, so at most about
+    (2 * queue_size + 3) * batch_size frames are held at once. Batches are post-processed in decode
+    order. An exception in any step stops the other threads and is re-raised here, after both
+    threads have finished (so the caller can release the capture behind frames safely).
+    """
+    decoded: "queue.Queue" = queue.Queue(maxsize=max(1, queue_size))
+    inferred: "queue.Queue" = queue.Queue(maxsize=max(1, queue_size))
+    stop = threading.Event()
+
+    def _decode() -> None:
+        try:
+            for batch in iter_batches(frames, batch_size):
+                if not _put(decoded, batch, stop):
+                    return
+            _put(decoded, _DONE, stop)
+        except BaseException as e:  # surfaced to the consumer
+            _put(decoded, _Failure(e), stop)
+        finally:
+            _close_frames(frames)
+
+    def _infer() -> None:
+        while not stop.is_set():
+            try:
+                item = decoded.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _DONE or isinstance(item, _Failure):
+                _put(inferred, item, stop)
+                return
+            try:
+                results = infer(item)
+            except BaseException as e:
+                _put(inferred, _Failure(e), stop)
+                return
+            if not _put(inferred, (item, results), stop):
+                return
+
+    workers = [
+        threading.Thread(target=stage_thread(_decode), name="stage02-decode", daemon=True),
+        threading.Thread(target=stage_thread(_infer), name="stage02-infer", daemon=True),
+    ]
+    for t in workers:
+        t.start()
+    try:
+        while True:
+            item = inferred.get()
+            if item is _DONE:
+                break
+            if isinstance(item, _Failure):
+                raise item.exc
+            batch, results = item
+            post(batch, results)
+    finally:
+        stop.set()
+        # No timeout: both threads notice stop within one read / one batch, and returning earlier
+        # would let the caller release the capture while the decoder is still inside read()
+        for t in workers:
+            t.join()
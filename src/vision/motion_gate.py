@@ -0,0 +1,67 @@
+"""
+Motion gate for stage 02: a cheap downscaled frame difference inside the ROI decides whether a sampled
+frame needs YOLO or can reuse the previous detections (court static between points / during breaks).
+Uses: cv2, numpy, config/constants.
+"""
+from __future__ import annotations
+
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from src.config.constants import DEFAULT_MOTION_MAX_CARRY, DEFAULT_MOTION_THRESHOLD, MOTION_GATE_PIXEL_DELTA
+
+
+class MotionGate:
+    """
+    check(frame) -> True when the frame should go through inference.
+    Frames are compared with the last frame that was let through (not the previous one), so slow
+    drift still accumulates into a detectable change. At most max_carry frames in a row are skipped.
+    """
+
+    def __init__(
+        self,
+        *,
+        threshold: float = DEFAULT_MOTION_THRESHOLD,
+        max_carry: int = DEFAULT_MOTION_MAX_CARRY,
+        roi_polygon: Optional[List[Tuple[float, float]]] = None,
+        width: int = 160,
+        pixel_delta: int = MOTION_GATE_PIXEL_DELTA,
+    ):
+        self.threshold = float(threshold)
+        self.max_carry = max(0, int(max_carry))
+        self.roi_polygon = roi_polygon
+        self.width = width
+        self.pixel_delta = pixel_delta
+        self._ref: Optional[np.ndarray] = None
+        self._mask: Optional[np.ndarray] = None
+        self._carried = 0
+        self.last_score: Optional[float] = None
+
+    def _small(self, frame_bgr: np.ndarray) -> np.ndarray:
+        h, w = frame_bgr.shape[:2]
+        size = (self.width, max(1, round(h * self.width / w)))
+        gray = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2GRAY) if frame_bgr.ndim == 3 else frame_bgr
+        small = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+        if self._mask is None:
+            self._mask = np.ones(small.shape, dtype=bool)
+            if self.roi_polygon:
+                mask = np.zeros(small.shape, dtype=np.uint8)
+                pts = np.asarray(self.roi_polygon, dtype=np.float64) * (size[0] / w, size[1] / h)
+                cv2.fillPoly(mask, [np.round(pts).astype(np.int32)], 1)
+                if mask.any():
+                    self._mask = mask.astype(bool)
+        return small
+
+    def check(self, frame_bgr: np.ndarray) -> bool:
+        small = self._small(frame_bgr)
+        if self._ref is not None and self._carried < self.max_carry:
+            diff = cv2.absdiff(small, self._ref)[self._mask]
+            self.last_score = float(np.count_nonzero(diff > self.pixel_delta)) / max(1, diff.size)
+            if self.last_score < self.threshold:
+                self._carried += 1
+                return False
+        self._ref = small
+        self._carried = 0
+        return True
@@ -0,0 +1,202 @@
+"""
+Segment-parallel stage 02: split the video into time segments, track each segment in its own process,
+then stitch track IDs across segment boundaries.
+Each segment after the first starts segment_overlap_s early; that warm-up window overlaps the previous
+segment and is used to match IDs (tracking/stitch.py), then dropped.
+Workers stream their records to a per-segment binary sink file instead of returning them, and the
+parent replays the segments in order, so neither side holds a whole segment's records in memory;
+only the overlap window of already-stitched records is carried from one segment to the next.
+Uses: concurrent.futures (spawn), vision/pipeline.run_tracking, vision/tracking/stitch, storage/track_sink.
+"""
+from __future__ import annotations
+
+import math
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from src.vision.profile import Stage02Profile
+
+
+def plan_segments(
+    total_frames: int,
+    workers: int,
+    sample_every_n_frames: int,
+    overlap_frames: int,
+) -> List[Tuple[int, int, int]]:
+    """
+    Split [0, total_frames) into up to `workers` segments on the sampling grid.
+    Returns (run_start, own_start, end): a segment runs from run_start (own_start minus the overlap)
+    and owns the records in [own_start, end).
+    """
+    n = max(1, sample_every_n_frames)
+    step = max(n, math.ceil(total_frames / max(1, workers) / n) * n)
+    overlap = math.ceil(max(0, overlap_frames) / n) * n
+    segments = []
+    for own_start in range(0, total_frames, step):
+        end = min(total_frames, own_start + step)
+        segments.append((max(0, own_start - overlap), own_start, end))
+    return segments
+
+
+def _init_worker(threads: int) -> None:
+    """Split CPU threads between worker processes (set before torch/OpenCV spin up their pools)."""
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    try:
+        import cv2
+        cv2.setNumThreads(threads)
+    except ImportError:
+        pass
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def _segment_sink(segments_dir: Path, index: int):
+    from src.storage.track_sink import BinaryTrackSink
+    return BinaryTrackSink(segments_dir / f"segment_{index:03d}{BinaryTrackSink.suffix}")
+
+
+def _track_segment(job: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional["Stage02Profile"]]:
+    """Track one segment into its sink file; returns the run's stats and its profile (or None)."""
+    from src.vision.pipeline import run_tracking
+    stats: Dict[str, Any] = {}
+    profile = None
+    if job["profile_stacks"] is not None:
+        from src.vision.profile import Stage02Profile
+        profile = Stage02Profile(sample_stacks=job["profile_stacks"])
+    sink = _segment_sink(job["segments_dir"], job["index"])
+    sink.discard()
+    run_tracking(
+        job["video_path"], job["court_id"], job["match_dir"],
+        start_frame=job["start_frame"],
+        end_frame=job["end_frame"],
+        on_frame=lambda _idx, records: sink.write(records),
+        stats=stats,
+        profile=profile,
+        **job["kwargs"],
+    )
+    sink.flush(fsync=False)
+    return stats, profile
+
+
+def _iter_frame_groups(records: Iterator[dict]) -> Iterator[Tuple[int, List[dict]]]:
+    """(frame, records) groups from a frame-ordered record stream."""
+    frame, group = None, []
+    for r in records:
+        if r["frame"] != frame and group:
+            yield frame, group
+            group = []
+        frame = r["frame"]
+        group.append(r)
+    if group:
+        yield frame, group
+
+
+def run_tracking_parallel(
+    video_path: Path,
+    court_id: str,
+    match_dir: Path,
+    *,
+    total_frames: int,
+    fps: float,
+    workers: int,
+    segment_overlap_s: float = 2.0,
+    on_frame: Optional[Callable[[int, List[dict]], None]] = None,
+    stats: Optional[Dict[str, Any]] = None,
+    profile: Optional["Stage02Profile"] = None,
+    **kwargs: Any,
+) -> List[dict]:
+    """
+    Track segments in a process pool and stitch them into one record stream (same contract as
+    run_tracking: records go to on_frame in frame order, or are returned as a list without it).
+    kwargs are passed to run_tracking for every segment. Segment files live in
+    <match_dir>/tracks/segments/ and are removed once replayed. profile (vision/profile.Stage02Profile)
+    gets the segments' profiles merged in.
+    """
+    from src.vision.tracking.stitch import StreamStitcher
+
+    sample_every = int(kwargs.get("sample_every_n_frames", 5))
+    overlap_frames = int(round(segment_overlap_s * fps))
+    segments = plan_segments(total_frames, workers, sample_every, overlap_frames)
+    segments_dir = match_dir / "tracks" / "segments"
+    jobs = [
+        {
+            "video_path": video_path,
+            "court_id": court_id,
+            "match_dir": match_dir,
+            "start_frame": run_start,
+            "end_frame": end,
+            "segments_dir": segments_dir,
+            "index": k,
+            "profile_stacks": None if profile is None else profile.sample_stacks,
+            "kwargs": kwargs,
+        }
+        for k, (run_start, _, end) in enumerate(segments)
+    ]
+    n_workers = min(workers, len(jobs))
+    threads = max(1, (os.cpu_count() or 1) // max(1, n_workers))
+    print(f"   Tracking {len(jobs)} segments in {n_workers} processes ({threads} threads each)")
+    tracks: List[dict] = []
+    emit = on_frame if on_frame is not None else (lambda _idx, records: tracks.extend(records))
+    counters: Dict[str, Any] = stats if stats is not None else {}
+    window: List[dict] = []  # stitched records the next segment's warm-up overlaps
+    next_free_id = 1
+    try:
+        with ProcessPoolExecutor(
+            max_workers=n_workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(threads,),
+        ) as pool:
+            # map yields in segment order as segments finish; each one is replayed from disk and dropped
+            for k, (seg_stats, seg_profile) in enumerate(pool.map(_track_segment, jobs)):
+                if seg_profile is not None:
+                    profile.merge(seg_profile)
+                for key, value in seg_stats.items():
+                    if key in ("frame_transport_slots", "frame_transport_frame_bytes"):  # same in every segment
+                        counters.setdefault(key, value)
+                    elif isinstance(value, int) and not isinstance(value, bool):
+                        counters[key] = counters.get(key, 0) + value
+                    elif isinstance(value, dict):  # per-reason counts
+                        merged = counters.setdefault(key, {})
+                        for name, n in value.items():
+                            merged[name] = merged.get(name, 0) + n
+                    else:
+                        counters.setdefault(key, value)
+                _, own_start, _ = segments[k]
+                next_run_start = segments[k + 1][0] if k + 1 < len(segments) else None
+                stitcher = StreamStitcher(window, own_start, next_free_id=next_free_id) if k else None
+                window = [r for r in window if next_run_start is not None and r["frame"] >= next_run_start]
+                sink = _segment_sink(segments_dir, k)
+                for frame_idx, records in _iter_frame_groups(sink.iter_records()):
+                    if stitcher is not None:
+                        records = stitcher.feed(frame_idx, records)  # holds warm-up frames back
+                    if frame_idx < own_start:
+                        continue
+                    if stitcher is None:
+                        next_free_id = max([next_free_id] + [r["player_id"] + 1 for r in records])
+                    emit(frame_idx, records)
+                    if next_run_start is not None and frame_idx >= next_run_start:
+                        window.extend(records)
+                sink.discard()
+                if stitcher is not None:
+                    next_free_id = stitcher.next_free_id
+    finally:
+        for k in range(len(jobs)):
+            _segment_sink(segments_dir, k).discard()
+        if segments_dir.is_dir() and not any(segments_dir.iterdir()):
+            segments_dir.rmdir()
+    if counters.get("cascade_frames"):
+        counters["cascade_heavy_fraction"] = round(counters["cascade_heavy_frames"] / counters["cascade_frames"], 3)
+    if "frame_transport" in counters and counters.get("frames_decoded"):
+        counters["frame_transport_bytes_copied_per_frame"] = round(
+            counters["frame_transport_bytes_copied"] / counters["frames_decoded"], 1
+        )
+    counters["segments"] = len(segments)
+    return tracks
@@ -8,9 +8,36 @@ Used by: pipeline/stages.py stage_02_track.
 from __future__ import annotations
 
 from pathlib import Path
-from typing import List, Optional
+from time import perf_counter_ns
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
 
 import cv2
+import numpy as np
+
+if TYPE_CHECKING:
+    from src.vision.profile import Stage02Profile
+
+
+def _metric_homography(match_calib_dir: Path, court_calib_dir: Path) -> Optional[np.ndarray]:
+    """3x3 image->court homography when the calibration is in metres (court size recorded), else None."""
+    from src.court.calibration.artifacts import load_calibration_artifacts
+    calib = load_calibration_artifacts(match_calib_dir) or load_calibration_artifacts(court_calib_dir)
+    if calib is None or not calib.court_width_m or not calib.court_height_m or len(calib.homography) != 9:
+        return None
+    return np.asarray(calib.homography, dtype=np.float64).reshape(3, 3)
+
+
+def _decode_size(
+    frame_w: int, frame_h: int, window_w: int, window_h: int, imgsz: int,
+) -> Optional[Tuple[int, int]]:
+    """
+    Frame size for in-decoder scaling: the inference window's longest side becomes imgsz (the size
+    YOLO letterboxes to anyway). None when that would not shrink the frame. Even sizes for ffmpeg.
+    """
+    f = imgsz / float(max(window_w, window_h, 1))
+    if f >= 1.0:
+        return None
+    return max(2, int(round(frame_w * f / 2)) * 2), max(2, int(round(frame_h * f / 2)) * 2)
 
 
 def run_tracking(
@@ -23,20 +50,117 @@ def run_tracking(
     iou: float = 0.5,
     tracker: Optional[str] = None,
     detection_model: Optional[str] = None,
+    backend: str = "torch",
+    imgsz: int = 640,
+    skip_decode: bool = True,
+    batch_size: int = 1,
+    threaded: bool = False,
+    queue_size: int = 4,
+    roi_crop: bool = False,
+    roi_crop_margin: Optional[int] = None,
+    detection_cache: bool = False,
+    motion_gate: bool = False,
+    motion_threshold: Optional[float] = None,
+    motion_max_carry: Optional[int] = None,
+    decoder: str = "opencv",
+    decode_scale: bool = True,
+    flow: bool = False,
+    cascade: bool = False,
+    cascade_fast_model: Optional[str] = None,
+    shared_detector: bool = False,
+    decode_process: bool = False,
+    workers: int = 1,
+    segment_overlap_s: float = 2.0,
+    start_frame: int = 0,
+    end_frame: Optional[int] = None,
+    on_frame: Optional[Callable[[int, List[dict]], None]] = None,
+    stats: Optional[Dict[str, Any]] = None,
+    profile: Optional["Stage02Profile"] = None,
 ) -> List[dict]:
     """
     Run detection + tracking on video, optional ROI filter, output track records.
     Returns list of dicts: frame, timestamp, player_id, x_pixel, y_pixel, bbox_xyxy.
-    tracker: e.g. None (BoT-SORT default), "bytetrack.yaml" for ByteTrack.
+    tracker: e.g. None (BoT-SORT default), "bytetrack.yaml" for ByteTrack, "courtflow" for the in-house
+      NumPy Kalman/IoU tracker (vision/tracking/mot.py; court-metre gating when the calibration is metric).
     detection_model: path to custom YOLO .pt weights (overrides env COURTFLOW_DETECTION_MODEL);
       if not set, uses pretrained yolo26n.pt / yolov8n.pt.
+    backend: "torch" (default), "onnx" or "openvino"; the weights are exported once at imgsz and the
+      export is cached on disk (see vision/detection/backends.py).
+    skip_decode: advance over unsampled frames with grab() so only sampled frames are decoded
+      (frame/timestamp values are unchanged); False reads every frame.
+    batch_size: >1 collects that many sampled frames, runs one batched predict, then feeds the
+      detections to the tracker in frame order (same track IDs as the per-frame model.track path).
+    threaded: overlap decode, inference and post-processing (decoder thread + inference thread,
+      bounded queues of queue_size batches for backpressure); output is identical to the serial run.
+    roi_crop: run YOLO on the ROI bounding rectangle plus roi_crop_margin pixels (default
+      DEFAULT_ROI_CROP_MARGIN_PX) instead of the full frame; boxes are mapped back to full-frame
+      coordinates before tracking output. No effect when the court has no ROI polygon.
+    detection_cache: opt-in, for tuning reruns. Replay raw detections from <match_dir>/cache/detections
+      when video, weights, conf, iou, sampling, backend, imgsz and crop window match a previous run, and
+      store new ones (vision/detection/cache.py); only frames missing from the cache go through YOLO.
+      Costs a full-video SHA-256 on the first run of a match, and the tracker runs decoupled from
+      detection as in the batched path instead of per-frame model.track.
+    motion_gate: skip YOLO on sampled frames whose downscaled difference inside the ROI (vs the last
+      inferred frame) is below motion_threshold (fraction of ROI pixels changed; default
+      DEFAULT_MOTION_THRESHOLD) and feed the tracker the previous detections instead, for at most
+      motion_max_carry frames in a row (default DEFAULT_MOTION_MAX_CARRY) (vision/motion_gate.py).
+    decoder: "opencv" (cv2.VideoCapture) or "ffmpeg" (video/frames_ffmpeg.py: multithreaded ffmpeg
+      decode, unsampled frames dropped inside ffmpeg, raw frames piped into reused buffers).
+      With decode_scale, ffmpeg also downscales so the inference window's longest side is imgsz;
+      detection and tracking run on the scaled frames and boxes are scaled back to full-frame pixels
+      before ROI filtering and output (records keep full-resolution coordinates).
+    flow: decode every frame and emit tracked positions for all of them: YOLO still runs on the sampled
+      frames only, and boxes are carried over the frames in between with sparse optical flow
+      (vision/tracking/flow.py), which also stands in for frames the motion gate skips. A frame whose
+      flow lost a box goes through YOLO instead. The tracker runs decoupled and is updated every frame.
+    cascade: detect with cascade_fast_model (default the pretrained nano model) first and re-detect with
+      detection_model (the heavy / custom weights) only the frames where the fast result looks
+      unreliable: not CASCADE_EXPECTED_PLAYERS players inside the ROI, a low confidence, or a large IoU
+      drop against the previous frame (vision/detection/yolo.py DetectorCascade). Tracker runs decoupled.
+    shared_detector: detect through the process-wide DetectionService (vision/detection/service.py)
+      instead of using the pooled model directly, so several run_tracking calls can run at once in one
+      process on one copy of the weights, their frames batched together. Tracker runs decoupled (its
+      state stays in this run).
+    decode_process: decode (OpenCV or ffmpeg, same sampling and scaling) in a separate process that writes
+      frames into a shared-memory ring (video/frame_ring.py); only slot indices cross the process
+      boundary, so a second core decodes without frames being pickled. Works with workers > 1 (one
+      decoder process per segment) and shared_detector.
+    workers: >1 splits the video into that many time segments tracked in separate processes; each
+      segment starts segment_overlap_s early and track IDs are stitched in that overlap (vision/parallel.py).
+    start_frame / end_frame: only track frames in [start_frame, end_frame) (frame indices stay absolute).
+    on_frame: called after every processed frame with (frame_index, that frame's records), in frame order
+      (used by stage 02 to checkpoint). Records are then handed to on_frame only and the function
+      returns []. With workers > 1 the stitched segments are streamed to on_frame as they complete
+      (frames without records are not reported).
+    stats: optional dict filled in place with per-run counters
+      (decoder, decode_size, frames_decoded, frames_skipped, frames_inferred, frames_from_cache,
+      frames_motion_skipped, frames_flow_propagated, frames_flow_redetected, cascade_frames,
+      cascade_heavy_frames, cascade_heavy_fraction, cascade_heavy_reasons, detector_service,
+      frame_transport, frame_transport_bytes_copied_per_frame (and other frame_transport_* counters),
+      model_pooled, model_load_s).
+    profile: optional vision/profile.Stage02Profile that gets per-frame latencies of decode, inference,
+      tracker update, ROI filter, record building and output (on_frame), and stack samples when enabled.
+      Off (None) the hot loop only pays a few no-op calls per frame.
+    The YOLO model comes from the process-level pool (vision/detection/registry.py): loaded and warmed
+    up once per process, tracker state reset for every run.
     Raise or return [] on missing deps; stage_02 will write empty tracks on failure.
     """
     try:
-        from src.vision.detection.yolo import _get_model, track_persons
-        from src.vision.roi_filter.filter import load_roi_for_match, filter_detections_by_roi
-        from src.vision.tracking.ground_point import bbox_to_ground_point
+        from src.vision.detection.batch import DetectionBatch
+        from src.vision.detection.registry import get_pooled_model
+        from src.vision.detection.yolo import (
+            DEFAULT_PRETRAINED, DetectorCascade, detect_persons_arrays, track_persons_arrays,
+        )
+        from src.vision.tracking.mot import DEFAULT_TRACKER_CFG, is_courtflow_tracker, make_tracker
+        from src.vision.roi_filter.filter import (
+            RoiMask, load_roi_for_match, points_in_polygon, roi_crop_rect, roi_source_dir,
+        )
         from src.pipeline.paths import court_calibration_dir
+        from src.config.constants import (
+            CASCADE_EXPECTED_PLAYERS, CASCADE_MIN_CONFIDENCE, CASCADE_MIN_IOU, DEFAULT_ROI_CROP_MARGIN_PX,
+        )
+        from src.video.frames_opencv import iter_sampled_frames
+        from src.vision.engine import run_serial, run_threaded
     except ImportError:
         return []
 
@@ -47,39 +171,372 @@ def run_tracking(
     cap = cv2.VideoCapture(str(video_path))
     fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
-    model = _get_model(detection_model)
+    video_hash = None
+    if detection_cache:
+        from src.vision.detection.cache import video_content_hash
+        video_hash = video_content_hash(video_path, match_dir / "cache")  # memoized; done before any fork
+    if workers > 1 and total_frames > 0:
+        cap.release()
+        from src.vision.parallel import run_tracking_parallel
+        return run_tracking_parallel(
+            video_path, court_id, match_dir,
+            total_frames=total_frames,
+            fps=fps,
+            workers=workers,
+            segment_overlap_s=segment_overlap_s,
+            on_frame=on_frame,
+            stats=stats,
+            sample_every_n_frames=sample_every_n_frames,
+            conf=conf,
+            iou=iou,
+            tracker=tracker,
+            detection_model=detection_model,
+            backend=backend,
+            imgsz=imgsz,
+            skip_decode=skip_decode,
+            batch_size=batch_size,
+            threaded=threaded,
+            queue_size=queue_size,
+            roi_crop=roi_crop,
+            roi_crop_margin=roi_crop_margin,
+            detection_cache=detection_cache,
+            motion_gate=motion_gate,
+            motion_threshold=motion_threshold,
+            motion_max_carry=motion_max_carry,
+            decoder=decoder,
+            decode_scale=decode_scale,
+            flow=flow,
+            cascade=cascade,
+            cascade_fast_model=cascade_fast_model,
+            shared_detector=shared_detector,
+            decode_process=decode_process,
+            profile=profile,
+        )
+    frame_w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 0)
+    frame_h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
+    batch_size = max(1, int(batch_size))
     tracks: List[dict] = []
-    frame_idx = 0
-    processed = 0  # frames we actually run detection on
-    progress_every = max(1, (total_frames // max(1, sample_every_n_frames)) // 20)  # ~20 progress lines
-
-    while True:
-        ret, frame = cap.read()
-        if not ret or frame is None:
-            break
-        if frame_idx % sample_every_n_frames != 0:
-            frame_idx += 1
-            continue
-        dets = track_persons(frame, model=model, conf=conf, iou=iou, tracker=tracker)
-        if roi_polygon:
-            dets = filter_detections_by_roi(dets, roi_polygon)
-        for d in dets:
-            track_id = d.get("track_id", -1)
-            if track_id < 0:
-                continue
-            x, y = bbox_to_ground_point(d["bbox_xyxy"])
-            tracks.append({
-                "frame": frame_idx,
-                "timestamp": round(frame_idx / fps, 3),
-                "player_id": track_id,
-                "x_pixel": round(x, 2),
-                "y_pixel": round(y, 2),
-                "bbox_xyxy": d["bbox_xyxy"],
-            })
-        processed += 1
-        if progress_every and processed % progress_every == 0 and total_frames > 0:
-            pct = min(100, round(100 * (frame_idx + 1) / total_frames, 1))
-            print(f"   ... tracking frame {frame_idx + 1}/{total_frames} ({pct}%)")
-        frame_idx += 1
-    cap.release()
+    counters: Dict[str, Any] = stats if stats is not None else {}
+    roi_mask = None  # rasterized ROI, built once: one index lookup per frame instead of a polygon test per box
+    if roi_polygon and frame_w > 0 and frame_h > 0:
+        roi_mask = RoiMask.load_or_rasterize(
+            roi_source_dir(match_calib_dir, court_calib_dir), roi_polygon, frame_w, frame_h
+        )
+    crop = None  # (x0, y0, x1, y1) inference window in full-frame pixels
+    if roi_crop and roi_polygon and frame_w > 0 and frame_h > 0:
+        margin = DEFAULT_ROI_CROP_MARGIN_PX if roi_crop_margin is None else int(roi_crop_margin)
+        crop = roi_crop_rect(roi_polygon, frame_w, frame_h, margin_px=margin)
+        counters["roi_crop_xyxy"] = list(crop)
+        counters["roi_crop_pixel_fraction"] = round(
+            (crop[2] - crop[0]) * (crop[3] - crop[1]) / float(frame_w * frame_h), 3
+        )
+    decode_size = None  # (w, h) ffmpeg scales frames to; None = native resolution
+    infer_crop = crop  # crop window in decoded-frame pixels
+    sx = sy = 1.0  # decoded -> full-frame pixel scale
+    if decoder == "ffmpeg":
+        cap.release()
+        if decode_scale and frame_w > 0 and frame_h > 0:
+            window = (crop[2] - crop[0], crop[3] - crop[1]) if crop is not None else (frame_w, frame_h)
+            decode_size = _decode_size(frame_w, frame_h, window[0], window[1], imgsz)
+        if decode_size is not None:
+            sx, sy = frame_w / decode_size[0], frame_h / decode_size[1]
+            counters["decode_size"] = list(decode_size)
+            if crop is not None:
+                infer_crop = (
+                    int(crop[0] // sx), int(crop[1] // sy),
+                    min(decode_size[0], int(-(-crop[2] // sx))), min(decode_size[1], int(-(-crop[3] // sy))),
+                )
+    elif decoder != "opencv":
+        raise ValueError(f"Unknown decoder: {decoder!r} (expected 'opencv' or 'ffmpeg')")
+    counters["decoder"] = decoder
+    cache = None
+    if video_hash is not None:
+        from src.vision.detection.cache import DetectionCache, detection_cache_key
+        from src.vision.detection.yolo import cascade_identity, model_identity
+        if cascade:
+            model_id = cascade_identity(
+                cascade_fast_model, detection_model,
+                expected_players=CASCADE_EXPECTED_PLAYERS, min_confidence=CASCADE_MIN_CONFIDENCE,
+                min_iou=CASCADE_MIN_IOU, roi_polygon=roi_polygon,
+            )
+        else:
+            model_id = model_identity(detection_model)
+        cache = DetectionCache.for_match(match_dir, detection_cache_key(
+            video_hash, model_id,
+            conf=conf, iou=iou, sample_every_n_frames=sample_every_n_frames,
+            backend=backend, imgsz=imgsz, crop=crop, decode_size=decode_size,
+        ))
+    gate = None
+    if motion_gate:
+        from src.config.constants import DEFAULT_MOTION_MAX_CARRY, DEFAULT_MOTION_THRESHOLD
+        from src.vision.motion_gate import MotionGate
+        gate = MotionGate(
+            threshold=DEFAULT_MOTION_THRESHOLD if motion_threshold is None else motion_threshold,
+            max_carry=DEFAULT_MOTION_MAX_CARRY if motion_max_carry is None else motion_max_carry,
+            roi_polygon=[(x / sx, y / sy) for x, y in roi_polygon] if roi_polygon else roi_polygon,
+        )
+    # Batched / cached / gated path: detections per frame, tracker updated separately
+    # (frame_rate=30 as in model.track)
+    courtflow = is_courtflow_tracker(tracker)
+    decoupled = (
+        batch_size > 1 or cache is not None or gate is not None or courtflow or flow or cascade or shared_detector
+    )
+    mot = None
+    if decoupled:
+        homography = _metric_homography(match_calib_dir, court_calib_dir) if courtflow else None
+        if homography is not None and decode_size is not None:
+            homography = homography @ np.diag([sx, sy, 1.0])  # the tracker sees decoded-frame boxes
+        mot = make_tracker(tracker, frame_rate=30, homography=homography)
+    model = None  # from the process model pool, on the first frame that is not in the detection cache
+    processed = 0  # frames through tracking + post-processing
+    inferred = 0  # frames we actually run detection on
+    carried = 0  # frames the motion gate skipped (previous detections reused)
+    last_dets = DetectionBatch.empty()
+    box_flow = None
+    propagated = redetected = 0  # flow: frames carried by optical flow / sent to YOLO because flow lost a box
+    if flow:
+        from src.vision.tracking.flow import BoxFlow
+        box_flow = BoxFlow()
+    decode_every = 1 if flow else sample_every_n_frames
+    span = (min(end_frame, total_frames) if end_frame is not None else total_frames) - start_frame
+    progress_every = max(1, (span // max(1, decode_every)) // 20)  # ~20 progress lines
+
+    def _image(frame):
+        """Detector input: the decoded frame, or its crop window."""
+        if infer_crop is None:
+            return frame
+        x0, y0, x1, y1 = infer_crop
+        return frame[y0:y1, x0:x1]
+
+    def _infer(batch):
+        nonlocal carried, last_dets, propagated, redetected
+        # Gate before the cache lookup so a rerun gates exactly the same frames
+        key = [idx % sample_every_n_frames == 0 for idx, _ in batch] if flow else [True] * len(batch)
+        run = [k and (gate is None or gate.check(frame)) for (_, frame), k in zip(batch, key)]
+        per_frame = _detect(batch, run)
+        if box_flow is not None:
+            # Frame order: seed flow on detector output, carry boxes over the frames in between
+            for i, (idx, frame) in enumerate(batch):
+                gray = cv2.cvtColor(_image(frame), cv2.COLOR_BGR2GRAY)
+                if not run[i]:
+                    per_frame[i] = box_flow.propagate(gray)
+                    if per_frame[i] is None:
+                        per_frame[i] = _detect([batch[i]], [True])[0]
+                        redetected += 1
+                    else:
+                        propagated += 1
+                        if key[i]:
+                            carried += 1  # sampled frame the motion gate skipped, covered by flow
+                        continue
+                box_flow.reset(gray, per_frame[i])
+        else:
+            for i, needed in enumerate(run):
+                if needed:
+                    last_dets = per_frame[i]
+                else:
+                    per_frame[i] = last_dets
+                    carried += 1
+        if infer_crop is not None:
+            per_frame = [dets.offset(infer_crop[0], infer_crop[1]) for dets in per_frame]
+        return per_frame
+
+    def _detect(batch, run):
+        """Crop-local detections for the frames where run is set (cache, else YOLO); None elsewhere."""
+        nonlocal model, inferred
+        per_frame = [
+            cache.get(idx) if cache is not None and needed else None
+            for (idx, _), needed in zip(batch, run)
+        ]
+        todo = [i for i, dets in enumerate(per_frame) if dets is None and run[i]]
+        if todo:
+            images = [_image(batch[i][1]) for i in todo]
+            if model is None:
+                model = _load_model()
+            if cascade:
+                fresh = model.detect(images)
+            elif mot is None:
+                fresh = [
+                    track_persons_arrays(im, model=model, conf=conf, iou=iou, tracker=tracker) for im in images
+                ]
+            else:
+                fresh = detect_persons_arrays(images, model=model, conf=conf, iou=iou)
+            for i, dets in zip(todo, fresh):
+                per_frame[i] = dets
+                if cache is not None:
+                    cache.put(batch[i][0], dets)  # crop-local coordinates, as the detector returned them
+            inferred += len(todo)
+        return per_frame
+
+    def _load_model():
+        """Pooled detector (or the shared detection service), or the cascade over two of them."""
+        if shared_detector:
+            from src.vision.detection.registry import get_detection_service
+            load = get_detection_service
+        else:
+            load = get_pooled_model
+        if not cascade:
+            if shared_detector:
+                return load(detection_model, backend=backend, imgsz=imgsz, stats=counters)
+            return get_pooled_model(
+                detection_model, backend=backend, imgsz=imgsz,
+                tracker=(tracker or DEFAULT_TRACKER_CFG) if mot is None else None,
+                stats=counters,
+            )
+        fast_stats: Dict[str, Any] = {}
+        fast = load(cascade_fast_model or DEFAULT_PRETRAINED, backend=backend, imgsz=imgsz, stats=fast_stats)
+        heavy = load(detection_model, backend=backend, imgsz=imgsz, stats=counters)
+        counters["model_pooled"] = counters["model_pooled"] and fast_stats["model_pooled"]
+        counters["model_load_s"] = round(counters["model_load_s"] + fast_stats["model_load_s"], 3)
+
+        def _players(dets):
+            """Crop-local, decoded-frame detections -> mask of those inside the ROI."""
+            if infer_crop is not None:
+                dets = dets.offset(infer_crop[0], infer_crop[1])
+            inside = _in_roi([dets.scale(sx, sy).ground_points()])
+            return np.ones(len(dets), dtype=bool) if inside is None else inside[0]
+
+        return DetectorCascade(
+            fast, heavy, conf=conf, iou=iou,
+            expected_players=CASCADE_EXPECTED_PLAYERS,
+            min_confidence=CASCADE_MIN_CONFIDENCE,
+            min_iou=CASCADE_MIN_IOU,
+            in_roi=_players,
+        )
+
+    def _in_roi(ground):
+        """Per-frame ROI masks for a batch's full-frame ground points (None when there is no ROI)."""
+        if roi_mask is not None:
+            # One mask lookup for the ground points of the whole batch
+            inside = roi_mask.contains(np.concatenate(ground))
+            return np.split(inside, np.cumsum([len(g) for g in ground])[:-1])
+        if roi_polygon:  # frame size unknown: exact polygon test
+            return [points_in_polygon(g, roi_polygon) for g in ground]
+        return None
+
+    if profile is not None:
+        from src.vision.profile import StepClock
+        clock = StepClock(profile)
+        if mot is None:
+            profile.note("tracker: runs inside inference (model.track); a decoupled path times it on its own")
+        if box_flow is not None:
+            profile.note("inference: includes optical flow between sampled frames")
+    else:
+        from src.vision.profile import NULL_CLOCK as clock
+
+    def _timed_infer(batch):
+        t = perf_counter_ns()
+        per_frame = _infer(batch)
+        profile.add("inference", perf_counter_ns() - t, len(batch))
+        return per_frame
+
+    def _post(batch, per_frame):
+        nonlocal processed
+        clock.start()
+        if courtflow:
+            # Court players only: people outside the ROI must not take the tracker's max_tracks slots.
+            # The tracker returns detection boxes, so the ROI filter below keeps the same set.
+            inside = _in_roi([dets.scale(sx, sy).ground_points() for dets in per_frame])
+            if inside is not None:
+                per_frame = [dets[k] for dets, k in zip(per_frame, inside)]
+            clock.lap("roi_filter")
+        if mot is not None:
+            per_frame = [mot.update(dets, frame) for (_, frame), dets in zip(batch, per_frame)]
+            clock.lap("tracker")
+        per_frame = [dets[dets.track_ids >= 0].scale(sx, sy) for dets in per_frame]
+        ground = [dets.ground_points() for dets in per_frame]
+        clock.lap("records")
+        keep = _in_roi(ground)
+        clock.lap("roi_filter")
+        clock.split(len(batch))
+        for i, ((frame_idx, _), dets, points) in enumerate(zip(batch, per_frame, ground)):
+            if keep is not None:
+                dets, points = dets[keep[i]], points[keep[i]]
+            # Serialization boundary: the only place per-detection dicts are built
+            timestamp = round(frame_idx / fps, 3)
+            frame_records = [
+                {
+                    "frame": frame_idx,
+                    "timestamp": timestamp,
+                    "player_id": track_id,
+                    "x_pixel": round(x, 2),
+                    "y_pixel": round(y, 2),
+                    "bbox_xyxy": bbox,
+                }
+                for track_id, (x, y), bbox in zip(dets.track_ids.tolist(), points.tolist(), dets.boxes.tolist())
+            ]
+            clock.lap("records")
+            if on_frame is not None:
+                on_frame(frame_idx, frame_records)
+            else:
+                tracks.extend(frame_records)
+            processed += 1
+            if progress_every and processed % progress_every == 0 and total_frames > 0:
+                pct = min(100, round(100 * (frame_idx + 1) / total_frames, 1))
+                print(f"   ... tracking frame {frame_idx + 1}/{total_frames} ({pct}%)")
+            clock.lap("output")
+            clock.frame_done()
+
+    # Frames held at once: the batch being built, queued batches (threaded) and the ones in flight
+    hold = batch_size * ((2 * queue_size + 3) if threaded else 1) + 2
+    if decode_process:
+        from src.video.frame_ring import ProcessFrameSource
+        cap.release()
+        frames = ProcessFrameSource(
+            {
+                "decoder": decoder, "video_path": video_path, "width": frame_w, "height": frame_h, "fps": fps,
+                "size": decode_size, "every_n": decode_every, "skip_decode": skip_decode,
+                "start_frame": start_frame, "end_frame": end_frame,
+            },
+            hold=hold,
+            counters=counters,
+        )
+    elif decoder == "ffmpeg":
+        from src.video import frames_ffmpeg
+        reader = frames_ffmpeg.FfmpegFrameReader(
+            video_path, width=frame_w, height=frame_h, fps=fps,
+            every_n=decode_every,
+            start_frame=start_frame,
+            end_frame=end_frame,
+            size=decode_size,
+            ring=hold,
+        )
+        frames = frames_ffmpeg.iter_sampled_frames(reader, counters=counters)
+    else:
+        frames = iter_sampled_frames(
+            cap, decode_every,
+            skip_decode=skip_decode,
+            start_frame=start_frame,
+            end_frame=end_frame,
+            counters=counters,
+        )
+    source, infer = frames, _infer
+    if profile is not None:
+        source, infer = profile.timed_frames(frames), _timed_infer
+        profile.start_sampling()
+    try:
+        if threaded:
+            run_threaded(source, infer, _post, batch_size=batch_size, queue_size=queue_size)
+        else:
+            run_serial(source, infer, _post, batch_size=batch_size)
+    finally:
+        if profile is not None:
+            profile.stop_sampling()
+        cap.release()
+        if decode_process:
+            frames.close()  # unmaps the ring now that no frame is referenced
+        if cache is not None:
+            cache.save()
+    counters["frames_inferred"] = inferred
+    if cache is not None:
+        counters["frames_from_cache"] = cache.hits
+    if gate is not None:
+        counters["frames_motion_skipped"] = carried
+    if cascade and model is not None:
+        counters.update(model.stats())
+    if shared_detector and model is not None:
+        service = model.heavy_model if cascade else model
+        counters["detector_service"] = service.stats()  # process-wide, all streams so far
+    if box_flow is not None:
+        counters["frames_flow_propagated"] = propagated
+        counters["frames_flow_redetected"] = redetected
     return tracks
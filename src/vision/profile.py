@@ -0,0 +1,279 @@
+"""
+Stage 02 per-frame latency profile (opt-in, run_tracking(profile=...)): how each frame's time splits
+between decode, inference, tracker update, ROI filter, record building and output (on_frame: track
+sink and checkpoint writes). Latencies go into log-bucketed histograms (HDR-style: relative error
+under 1/2**(SUB_BITS - 1), memory independent of video length), so p50/p95/p99 come without keeping
+every sample. Batched steps record the batch time split evenly over its frames.
+Optional stack sampling of the stage 02 threads counts folded stacks for a flamegraph
+(flamegraph.pl / speedscope input) and the functions the hot loop spends its time in.
+Uses: time.perf_counter_ns, sys._current_frames.
+"""
+from __future__ import annotations
+
+import math
+import os
+import sys
+import threading
+from time import perf_counter_ns
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+STEPS = ("decode", "inference", "tracker", "roi_filter", "records", "output")
+_WAIT_FILES = ("threading.py", "queue.py")  # a stack ending here is a thread blocked on the others
+SUB_BITS = 7  # 128 buckets per power of two: <= 1.6% relative error
+_SUB_MASK = (1 << SUB_BITS) - 1
+DEFAULT_STACK_INTERVAL_S = 0.01
+
+
+class LatencyHistogram:
+    """Nanosecond latencies in log-linear buckets (bucket key = exponent, top SUB_BITS bits)."""
+
+    __slots__ = ("counts", "count", "total_ns", "min_ns", "max_ns")
+
+    def __init__(self) -> None:
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns: Optional[int] = None
+        self.max_ns = 0
+
+    def record(self, ns: int, n: int = 1) -> None:
+        ns = max(0, int(ns))
+        shift = max(0, ns.bit_length() - SUB_BITS)
+        key = (shift << SUB_BITS) | (ns >> shift)
+        self.counts[key] = self.counts.get(key, 0) + n
+        self.count += n
+        self.total_ns += ns * n
+        self.min_ns = ns if self.min_ns is None else min(self.min_ns, ns)
+        self.max_ns = max(self.max_ns, ns)
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for key, n in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + n
+        self.count += other.count
+        self.total_ns += other.total_ns
+        if other.min_ns is not None:
+            self.min_ns = other.min_ns if self.min_ns is None else min(self.min_ns, other.min_ns)
+        self.max_ns = max(self.max_ns, other.max_ns)
+
+    def percentile(self, q: float) -> int:
+        """Value at quantile q (0..1): the highest value of the bucket holding it, capped at the max."""
+        if not self.count:
+            return 0
+        rank = max(1, math.ceil(q * self.count - 1e-9))
+        seen = 0
+        for key in sorted(self.counts):
+            seen += self.counts[key]
+            if seen >= rank:
+                shift = key >> SUB_BITS
+                return min(self.max_ns, (((key & _SUB_MASK) + 1) << shift) - 1)
+        return self.max_ns
+
+    def summary(self) -> Dict[str, Any]:
+        ms = 1e-6
+        return {
+            "frames": self.count,
+            "total_s": round(self.total_ns * 1e-9, 3),
+            "mean_ms": round(self.total_ns / self.count * ms, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.50) * ms, 3),
+            "p95_ms": round(self.percentile(0.95) * ms, 3),
+            "p99_ms": round(self.percentile(0.99) * ms, 3),
+            "max_ms": round(self.max_ns * ms, 3),
+        }
+
+
+class StepClock:
+    """
+    Charges the time between laps on one thread to steps. Time lapped for a whole batch is split over
+    its frames; frame_done() then records one sample per step for the frame (its own laps plus its
+    share of the batch's).
+    """
+
+    __slots__ = ("profile", "t", "pending", "shared")
+
+    def __init__(self, profile: "Stage02Profile"):
+        self.profile = profile
+        self.t = perf_counter_ns()
+        self.pending: Dict[str, int] = {}
+        self.shared: Dict[str, int] = {}
+
+    def start(self) -> None:
+        self.t = perf_counter_ns()
+        self.pending = {}
+        self.shared = {}
+
+    def lap(self, step: str) -> None:
+        now = perf_counter_ns()
+        self.pending[step] = self.pending.get(step, 0) + now - self.t
+        self.t = now
+
+    def split(self, frames: int) -> None:
+        self.shared = {step: ns // max(1, frames) for step, ns in self.pending.items()}
+        self.pending = {}
+
+    def frame_done(self) -> None:
+        hists = self.profile.hists
+        for step in self.shared.keys() | self.pending.keys():
+            hists[step].record(self.shared.get(step, 0) + self.pending.get(step, 0))
+        self.pending = {}
+
+
+class _NullClock:
+    """StepClock stand-in when profiling is off."""
+
+    def start(self) -> None:
+        pass
+
+    def lap(self, step: str) -> None:
+        pass
+
+    def split(self, frames: int) -> None:
+        pass
+
+    def frame_done(self) -> None:
+        pass
+
+
+NULL_CLOCK = _NullClock()
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Stage02Profile:
+    """
+    Per-step histograms for one stage 02 run (segments of a workers > 1 run are merged in), plus
+    folded stack counts when sample_stacks is set. Each step is recorded from a single thread
+    (decode, inference and post-processing threads in the threaded engine), so no locking.
+    """
+
+    def __init__(self, *, sample_stacks: bool = False, stack_interval_s: float = DEFAULT_STACK_INTERVAL_S):
+        self.hists: Dict[str, LatencyHistogram] = {step: LatencyHistogram() for step in STEPS}
+        self.sample_stacks = sample_stacks
+        self.stack_interval_s = stack_interval_s
+        self.stacks: Dict[str, int] = {}  # "thread;outer;...;inner" -> samples
+        self.notes: List[str] = []
+        self._sampler: Optional[threading.Thread] = None
+        self._stop: Optional[threading.Event] = None
+
+    def add(self, step: str, ns: int, frames: int = 1) -> None:
+        """Record ns spent in step on a batch of frames (each frame gets an equal share)."""
+        if frames > 0:
+            self.hists[step].record(ns // frames, frames)
+
+    def timed_frames(self, frames: Iterable[Any]) -> Iterator[Any]:
+        """Yield from frames, recording the time each item took to produce as "decode"."""
+        it = iter(frames)
+        hist = self.hists["decode"]
+        try:
+            while True:
+                t = perf_counter_ns()
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+                hist.record(perf_counter_ns() - t)
+                yield item
+        finally:
+            close = getattr(frames, "close", None)  # the engine closes this wrapper early on errors
+            if close is not None:
+                close()
+
+    def note(self, text: str) -> None:
+        if text not in self.notes:
+            self.notes.append(text)
+
+    def merge(self, other: "Stage02Profile") -> None:
+        for step, hist in other.hists.items():
+            self.hists[step].merge(hist)
+        for stack, n in other.stacks.items():
+            self.stacks[stack] = self.stacks.get(stack, 0) + n
+        for text in other.notes:
+            self.note(text)
+
+    def __getstate__(self):
+        # Sent back from segment worker processes; the sampler thread stays behind
+        state = dict(self.__dict__)
+        state["_sampler"] = state["_stop"] = None
+        return state
+
+    # Stack sampling: the calling thread and the engine's "stage02-*" threads, every stack_interval_s
+    def start_sampling(self) -> None:
+        if not self.sample_stacks or self._sampler is not None:
+            return
+        main_ident = threading.get_ident()
+        stop = threading.Event()
+
+        def _sample() -> None:
+            own_ident = threading.get_ident()
+            while not stop.wait(self.stack_interval_s):
+                names = {t.ident: t.name for t in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    name = names.get(ident, "")
+                    if ident == own_ident or (ident != main_ident and not name.startswith("stage02-")):
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(_frame_label(frame.f_code))
+                        frame = frame.f_back
+                    key = ";".join([name or "main"] + stack[::-1])
+                    self.stacks[key] = self.stacks.get(key, 0) + 1
+
+        self._stop = stop
+        self._sampler = threading.Thread(target=_sample, name="profile-sampler", daemon=True)
+        self._sampler.start()
+
+    def stop_sampling(self) -> None:
+        if self._sampler is None:
+            return
+        self._stop.set()
+        self._sampler.join()
+        self._sampler = self._stop = None
+
+    def _is_waiting(self, stack: str) -> bool:
+        leaf = stack.rsplit(";", 1)[-1]
+        return any(f"({name}:" in leaf for name in _WAIT_FILES)
+
+    def hot_functions(self, top: int = 20) -> List[Dict[str, Any]]:
+        """
+        Functions by share of the busy samples (threads not blocked in a queue or lock wait) with the
+        function on top of the stack (self) and anywhere in it (total).
+        """
+        busy = {stack: n for stack, n in self.stacks.items() if not self._is_waiting(stack)}
+        total = sum(busy.values())
+        self_n: Dict[str, int] = {}
+        incl_n: Dict[str, int] = {}
+        for stack, n in busy.items():
+            frames = stack.split(";")[1:]
+            if not frames:
+                continue
+            self_n[frames[-1]] = self_n.get(frames[-1], 0) + n
+            for fn in set(frames):
+                incl_n[fn] = incl_n.get(fn, 0) + n
+        ranked = sorted(self_n, key=lambda fn: -self_n[fn])[:top]
+        return [
+            {"function": fn, "self": round(self_n[fn] / total, 3), "total": round(incl_n[fn] / total, 3)}
+            for fn in ranked
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "steps": {step: hist.summary() for step, hist in self.hists.items() if hist.count},
+        }
+        if self.notes:
+            out["notes"] = list(self.notes)
+        if self.sample_stacks:
+            samples = sum(self.stacks.values())
+            out["stack_samples"] = samples
+            out["stack_samples_waiting"] = round(
+                sum(n for stack, n in self.stacks.items() if self._is_waiting(stack)) / samples, 3
+            ) if samples else 0.0
+            out["stack_interval_s"] = self.stack_interval_s
+            out["hot_functions"] = self.hot_functions()
+        return out
+
+    def write_folded(self, path) -> None:
+        """Folded stacks ("a;b;c count" per line) for flamegraph.pl or speedscope."""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack in sorted(self.stacks):
+                f.write(f"{stack} {self.stacks[stack]}\n")
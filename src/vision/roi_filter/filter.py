@@ -1,6 +1,8 @@
 """
 B4: remove detections outside ROI polygon/mask.
-Uses: OpenCV pointPolygonTest, court calibration artifacts.
+Uses: OpenCV pointPolygonTest, court calibration artifacts (roi_polygon.json, roi_mask.png).
+RoiMask: the polygon rasterized once per run (or roi_mask.png read back), so a frame's or a whole
+batch's ground points are tested with one vectorized index lookup.
 """
 from __future__ import annotations
 
@@ -29,6 +31,31 @@ def point_in_polygon(
     return result >= 0
 
 
+def points_in_polygon(points_xy: np.ndarray, points_px: List[Tuple[float, float]]) -> np.ndarray:
+    """
+    Vectorized point_in_polygon: (n, 2) points -> (n,) bool, True inside or on the boundary.
+    Even-odd crossing test over all edges at once, plus an on-edge test for boundary points.
+    """
+    pts = np.asarray(points_xy, dtype=np.float64).reshape(-1, 2)
+    if len(points_px) < 3 or not len(pts):
+        return np.zeros(len(pts), dtype=bool)
+    poly = np.asarray(points_px, dtype=np.float32).astype(np.float64).reshape(-1, 2)
+    ax, ay = poly[:, 0][None, :], poly[:, 1][None, :]
+    bx, by = np.roll(poly[:, 0], -1)[None, :], np.roll(poly[:, 1], -1)[None, :]
+    x, y = pts[:, 0][:, None], pts[:, 1][:, None]
+    straddles = (ay > y) != (by > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_cross = ax + (y - ay) * (bx - ax) / (by - ay)
+    inside = (np.count_nonzero(straddles & (x < x_cross), axis=1) % 2) == 1
+    cross = (bx - ax) * (y - ay) - (by - ay) * (x - ax)
+    on_edge = (
+        (np.abs(cross) <= 1e-9 * np.maximum(1.0, np.abs(bx - ax) + np.abs(by - ay)))
+        & (x >= np.minimum(ax, bx)) & (x <= np.maximum(ax, bx))
+        & (y >= np.minimum(ay, by)) & (y <= np.maximum(ay, by))
+    )
+    return inside | on_edge.any(axis=1)
+
+
 def filter_detections_by_roi(
     detections: List[dict],
     roi_polygon_px: List[Tuple[float, float]],
@@ -41,15 +68,97 @@ def filter_detections_by_roi(
     """
     if not roi_polygon_px or len(roi_polygon_px) < 3:
         return detections
-    out = []
-    for d in detections:
-        bbox = d.get("bbox_xyxy")
-        if not bbox or len(bbox) != 4:
-            continue
-        x, y = _bbox_bottom_center(bbox)
-        if point_in_polygon(x, y, roi_polygon_px):
-            out.append(d)
-    return out
+    valid = [d for d in detections if d.get("bbox_xyxy") and len(d["bbox_xyxy"]) == 4]
+    if not valid:
+        return []
+    ground = np.array([_bbox_bottom_center(d["bbox_xyxy"]) for d in valid], dtype=np.float64)
+    keep = points_in_polygon(ground, roi_polygon_px)
+    return [d for d, k in zip(valid, keep) if k]
+
+
+def roi_crop_rect(
+    roi_polygon_px: List[Tuple[float, float]],
+    frame_width: int,
+    frame_height: int,
+    *,
+    margin_px: int = 0,
+) -> Tuple[int, int, int, int]:
+    """
+    Bounding rectangle (x0, y0, x1, y1) of the ROI polygon grown by margin_px on every side,
+    clamped to the frame. x1/y1 are exclusive (usable as frame[y0:y1, x0:x1]).
+    """
+    pts = np.asarray(roi_polygon_px, dtype=np.float64).reshape(-1, 2)
+    x0 = int(np.floor(pts[:, 0].min())) - margin_px
+    y0 = int(np.floor(pts[:, 1].min())) - margin_px
+    x1 = int(np.ceil(pts[:, 0].max())) + margin_px + 1
+    y1 = int(np.ceil(pts[:, 1].max())) + margin_px + 1
+    x0, y0 = max(0, x0), max(0, y0)
+    x1, y1 = min(frame_width, x1), min(frame_height, y1)
+    if x1 <= x0 or y1 <= y0:
+        return (0, 0, frame_width, frame_height)
+    return (x0, y0, x1, y1)
+
+
+class RoiMask:
+    """Boolean (height, width) lookup mask; a point is inside if its pixel is set."""
+
+    def __init__(self, mask: np.ndarray):
+        self.mask = np.ascontiguousarray(mask > 0)
+        self.height, self.width = self.mask.shape[:2]
+
+    @classmethod
+    def from_polygon(cls, points_px: List[Tuple[float, float]], width: int, height: int) -> "RoiMask":
+        from src.court.calibration.roi import polygon_to_mask
+        return cls(polygon_to_mask(points_px, width, height))
+
+    @classmethod
+    def load_or_rasterize(
+        cls,
+        calib_dir: Optional[Path],
+        points_px: List[Tuple[float, float]],
+        width: int,
+        height: int,
+    ) -> "RoiMask":
+        """
+        Read calib_dir/roi_mask.png when it matches the frame size and is not older than
+        roi_polygon.json; otherwise rasterize the polygon and save it there for the next run.
+        """
+        from src.court.calibration.roi import ROI_MASK_FILENAME, ROI_POLYGON_FILENAME, save_roi_mask
+        if calib_dir is not None:
+            mask_path = calib_dir / ROI_MASK_FILENAME
+            poly_path = calib_dir / ROI_POLYGON_FILENAME
+            if mask_path.exists() and (
+                not poly_path.exists() or mask_path.stat().st_mtime >= poly_path.stat().st_mtime
+            ):
+                mask = cv2.imread(str(mask_path), cv2.IMREAD_GRAYSCALE)
+                if mask is not None and mask.shape == (height, width):
+                    return cls(mask)
+        roi = cls.from_polygon(points_px, width, height)
+        if calib_dir is not None and (calib_dir / ROI_POLYGON_FILENAME).exists():
+            try:
+                save_roi_mask(calib_dir, points_px, width, height)
+            except OSError:
+                pass  # read-only calibration dir: keep the in-memory mask
+        return roi
+
+    def contains(self, points_xy: np.ndarray) -> np.ndarray:
+        """(n, 2) pixel points -> (n,) bool. Points outside the frame are outside the ROI."""
+        pts = np.asarray(points_xy, dtype=np.float64).reshape(-1, 2)
+        x, y = pts[:, 0], pts[:, 1]
+        valid = (x >= 0) & (y >= 0) & (x <= self.width) & (y <= self.height)
+        # Non-negative after clipping, so truncation is floor; x == width / y == height map to the last pixel
+        xi = np.clip(x, 0, self.width - 1).astype(np.intp)
+        yi = np.clip(y, 0, self.height - 1).astype(np.intp)
+        return valid & self.mask[yi, xi]
+
+
+def roi_source_dir(match_calib_dir: Path, court_calib_dir: Optional[Path] = None) -> Optional[Path]:
+    """Calibration dir load_roi_for_match takes the polygon from (match first, then court)."""
+    from src.court.calibration.roi import ROI_POLYGON_FILENAME
+    for d in (match_calib_dir, court_calib_dir):
+        if d is not None and (d / ROI_POLYGON_FILENAME).exists():
+            return d
+    return None
 
 
 def load_roi_for_match(
@@ -0,0 +1,126 @@
+"""
+Optical-flow box propagation for the frames between detector calls: a few feature points inside each
+box are followed with pyramidal Lucas-Kanade (one call for all boxes), checked forward-backward, and
+each box is moved by the median point motion (and scaled by the median spread change).
+When a box loses too many points the caller runs the detector on that frame instead.
+Uses: cv2, numpy, vision/detection/batch.
+"""
+from __future__ import annotations
+
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from src.vision.detection.batch import DetectionBatch
+
+
+class BoxFlow:
+    """
+    reset(gray, dets) seeds points in dets' boxes (detector output); propagate(gray) returns the boxes
+    moved to the next frame, or None when flow confidence dropped (a box kept fewer than min_points
+    points, or less than min_good_fraction of them) and the frame needs the detector.
+    Frames must be consecutive and the same size (greyscale, same crop as the boxes' coordinates).
+    """
+
+    def __init__(
+        self,
+        *,
+        max_points: int = 12,
+        min_points: int = 3,
+        min_good_fraction: float = 0.5,
+        fb_max_error: float = 1.0,
+        win_size: int = 15,
+        max_level: int = 2,
+        max_scale_step: float = 0.1,
+    ):
+        self.max_points = max_points
+        self.min_points = min_points
+        self.min_good_fraction = min_good_fraction
+        self.fb_max_error = fb_max_error
+        self.lk_params = dict(
+            winSize=(win_size, win_size),
+            maxLevel=max_level,
+            criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03),
+        )
+        self.max_scale_step = max_scale_step
+        self.seeded = False
+        self._prev: Optional[np.ndarray] = None
+        self._dets = DetectionBatch.empty()
+        self._boxes = np.zeros((0, 4), dtype=np.float64)
+        self._points = np.zeros((0, 1, 2), dtype=np.float32)
+        self._owner = np.zeros(0, dtype=np.int64)  # box index per point
+        self._seeded_counts = np.zeros(0, dtype=np.int64)
+
+    def _box_points(self, gray: np.ndarray, box: np.ndarray) -> np.ndarray:
+        """(k, 2) points on the player: corners inside the box core, else a 3x3 grid over it."""
+        h, w = gray.shape[:2]
+        x1, y1, x2, y2 = box
+        # Core of the box (less background at the edges, where flow follows the court instead)
+        mx, my = 0.2 * (x2 - x1), 0.1 * (y2 - y1)
+        cx1, cy1 = int(max(0, x1 + mx)), int(max(0, y1 + my))
+        cx2, cy2 = int(min(w, x2 - mx)), int(min(h, y2 - my))
+        if cx2 - cx1 < 2 or cy2 - cy1 < 2:
+            return np.zeros((0, 2), dtype=np.float32)
+        corners = cv2.goodFeaturesToTrack(
+            gray[cy1:cy2, cx1:cx2], maxCorners=self.max_points, qualityLevel=0.01, minDistance=3,
+        )
+        if corners is not None and len(corners) >= self.min_points:
+            return corners.reshape(-1, 2) + np.array([cx1, cy1], dtype=np.float32)
+        gx, gy = np.meshgrid(np.linspace(cx1, cx2 - 1, 3), np.linspace(cy1, cy2 - 1, 3))
+        return np.stack([gx.ravel(), gy.ravel()], axis=1).astype(np.float32)
+
+    def reset(self, gray: np.ndarray, dets: DetectionBatch) -> None:
+        self._prev = gray
+        self._dets = dets
+        self._boxes = dets.boxes.astype(np.float64)
+        points = [self._box_points(gray, box) for box in self._boxes]
+        counts = np.array([len(p) for p in points], dtype=np.int64)
+        self._points = (np.concatenate(points) if points else np.zeros((0, 2), np.float32)).reshape(-1, 1, 2)
+        self._owner = np.repeat(np.arange(len(points)), counts)
+        self._seeded_counts = counts
+        self.seeded = True
+
+    def propagate(self, gray: np.ndarray) -> Optional[DetectionBatch]:
+        if not self.seeded:
+            return None
+        n = len(self._boxes)
+        if n == 0:
+            self._prev = gray
+            return self._dets
+        if (self._seeded_counts < self.min_points).any():
+            return None
+        p0 = self._points
+        p1, st, _ = cv2.calcOpticalFlowPyrLK(self._prev, gray, p0, None, **self.lk_params)
+        back, st_back, _ = cv2.calcOpticalFlowPyrLK(gray, self._prev, p1, None, **self.lk_params)
+        fb = np.linalg.norm((p0 - back).reshape(-1, 2), axis=1)
+        good = (st.ravel() == 1) & (st_back.ravel() == 1) & (fb < self.fb_max_error)
+        n_good = np.bincount(self._owner[good], minlength=n)
+        if ((n_good < self.min_points) | (n_good < self.min_good_fraction * self._seeded_counts)).any():
+            return None
+
+        a, b, owner = p0.reshape(-1, 2)[good], p1.reshape(-1, 2)[good], self._owner[good]
+        boxes = self._boxes.copy()
+        h, w = gray.shape[:2]
+        for k in range(n):
+            pa, pb = a[owner == k], b[owner == k]
+            ca, cb = np.median(pa, axis=0), np.median(pb, axis=0)
+            da = np.linalg.norm(pa - ca, axis=1)
+            db = np.linalg.norm(pb - cb, axis=1)
+            spread = da > 1.0
+            s = float(np.median(db[spread] / da[spread])) if spread.sum() >= 2 else 1.0
+            s = min(max(s, 1.0 - self.max_scale_step), 1.0 + self.max_scale_step)
+            x1, y1, x2, y2 = boxes[k]
+            # Scale about the points' median so the box follows the player, not the box centre
+            boxes[k] = [cb[0] + (x1 - ca[0]) * s, cb[1] + (y1 - ca[1]) * s,
+                        cb[0] + (x2 - ca[0]) * s, cb[1] + (y2 - ca[1]) * s]
+        boxes[:, [0, 2]] = np.clip(boxes[:, [0, 2]], 0, w)
+        boxes[:, [1, 3]] = np.clip(boxes[:, [1, 3]], 0, h)
+
+        self._prev = gray
+        self._boxes = boxes
+        self._points = b.reshape(-1, 1, 2)
+        self._owner = owner
+        self._dets = DetectionBatch(boxes, self._dets.scores, self._dets.classes,
+                                    np.full(n, -1, dtype=np.int64))
+        return self._dets
@@ -0,0 +1,111 @@
+"""
+Fill the frames between sampled detections of each player: stage 02 only tracks every Nth frame, so
+tracks.json has holes that make overlays flicker and speeds coarse. Gaps of up to max_gap_frames are
+filled per player_id (linear or cubic), all in NumPy; filled records carry "interpolated": True.
+Uses: numpy.
+"""
+from __future__ import annotations
+
+from typing import List
+
+import numpy as np
+
+INTERPOLATION_METHODS = ("linear", "spline")
+
+
+def _hermite_tangents(frames: np.ndarray, values: np.ndarray, chain_start: np.ndarray, chain_end: np.ndarray) -> np.ndarray:
+    """
+    Catmull-Rom style tangents (value per frame) at each observation: central difference inside a chain,
+    one-sided at chain ends so a cut gap (too long, or another player) never bends the curve.
+    """
+    n = len(frames)
+    prev_i = np.where(chain_start, np.arange(n), np.arange(n) - 1)
+    next_i = np.where(chain_end, np.arange(n), np.arange(n) + 1)
+    prev_i, next_i = np.clip(prev_i, 0, n - 1), np.clip(next_i, 0, n - 1)
+    span = (frames[next_i] - frames[prev_i]).astype(np.float64)
+    out = np.zeros_like(values)
+    ok = span > 0
+    out[ok] = (values[next_i[ok]] - values[prev_i[ok]]) / span[ok, None]
+    return out
+
+
+def interpolate_tracks(
+    records: List[dict],
+    *,
+    max_gap_frames: int,
+    method: str = "linear",
+) -> List[dict]:
+    """
+    Return records plus one interpolated record per missing frame of each player_id, sorted by frame
+    (observed records keep their relative order). Only gaps of at most max_gap_frames frames between two
+    observations of the same player are filled; longer gaps (player occluded or off court) stay empty.
+    method: "linear", or "spline" (cubic Hermite through neighbouring observations: smoother speeds).
+    Filled records have frame, timestamp, player_id, x_pixel / y_pixel (bbox bottom-centre), bbox_xyxy
+    and "interpolated": True. Records already marked interpolated are dropped and recomputed, so running
+    this twice gives the same result.
+    """
+    if method not in INTERPOLATION_METHODS:
+        raise ValueError(f"Unknown interpolation method {method!r}; expected one of {INTERPOLATION_METHODS}")
+    observed = [r for r in records if not r.get("interpolated") and r.get("bbox_xyxy")]
+    if max_gap_frames < 2 or len(observed) < 2:
+        return observed
+
+    frames = np.array([r["frame"] for r in observed], dtype=np.int64)
+    pids = np.array([r["player_id"] for r in observed], dtype=np.int64)
+    stamps = np.array([r.get("timestamp") or 0.0 for r in observed], dtype=np.float64)
+    boxes = np.array([r["bbox_xyxy"] for r in observed], dtype=np.float64).reshape(-1, 4)
+
+    order = np.lexsort((frames, pids))
+    f, p, ts, b = frames[order], pids[order], stamps[order], boxes[order]
+    gap = np.diff(f)
+    fill = (p[1:] == p[:-1]) & (gap > 1) & (gap <= max_gap_frames)
+    if not fill.any():
+        return observed
+
+    # One row per filled frame: left observation index, position t in (0, 1) inside the gap
+    counts = np.where(fill, gap - 1, 0)
+    left = np.repeat(np.arange(len(gap)), counts)
+    step = np.arange(len(left)) - np.repeat(np.cumsum(counts) - counts, counts) + 1
+    h = gap[left].astype(np.float64)
+    t = (step / h)[:, None]
+    new_frames = f[left] + step
+
+    b0, b1 = b[left], b[left + 1]
+    if method == "linear":
+        new_boxes = b0 + t * (b1 - b0)
+    else:
+        linked = np.zeros(len(f), dtype=bool)
+        linked[1:] = (p[1:] == p[:-1]) & (gap <= max_gap_frames)
+        chain_start = ~linked
+        chain_end = np.append(~linked[1:], True)
+        m = _hermite_tangents(f, b, chain_start, chain_end)
+        t2, t3 = t * t, t * t * t
+        new_boxes = (
+            (2 * t3 - 3 * t2 + 1) * b0
+            + (t3 - 2 * t2 + t) * h[:, None] * m[left]
+            + (-2 * t3 + 3 * t2) * b1
+            + (t3 - t2) * h[:, None] * m[left + 1]
+        )
+    new_ts = ts[left] + (step / h) * (ts[left + 1] - ts[left])
+    gx = (new_boxes[:, 0] + new_boxes[:, 2]) * 0.5
+    gy = new_boxes[:, 3]
+
+    filled = [
+        {
+            "frame": frame,
+            "timestamp": round(stamp, 3),
+            "player_id": pid,
+            "x_pixel": round(x, 2),
+            "y_pixel": round(y, 2),
+            "bbox_xyxy": [round(v, 2) for v in box],
+            "interpolated": True,
+        }
+        for frame, stamp, pid, x, y, box in zip(
+            new_frames.tolist(), new_ts.tolist(), p[left].tolist(), gx.tolist(), gy.tolist(), new_boxes.tolist()
+        )
+    ]
+    # Observed records first within a frame, then filled ones by player; stable by original position
+    out = observed + filled
+    key_frame = np.concatenate([frames, new_frames])
+    key_pos = np.arange(len(out))
+    return [out[i] for i in np.lexsort((key_pos, key_frame)).tolist()]
@@ -1,7 +1,316 @@
 """
 B5: tracker wrapper (ByteTrack/DeepSORT).
 Uses: ultralytics tracker OR external tracker
+
+UltralyticsTracker runs the Ultralytics BoT-SORT / ByteTrack update step on detections produced
+elsewhere (e.g. a batched predict), so inference and tracking are decoupled. Fed the same detections
+in frame order, it yields the same track IDs as model.track(persist=True).
+
+CourtflowTracker (tracker="courtflow") is an in-house NumPy tracker for a handful of players:
+vectorized constant-velocity Kalman prediction for all tracks at once, then greedy assignment on
+IoU + ground-point distance (court metres when a metric homography is given). No Ultralytics needed.
 """
 from __future__ import annotations
 
-# TODO: multi-object tracking
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+from src.vision.detection.batch import DetectionBatch
+
+# Ultralytics default tracker config (BoT-SORT)
+DEFAULT_TRACKER_CFG = "botsort.yaml"
+
+# --tracker value selecting CourtflowTracker
+COURTFLOW_TRACKER = "courtflow"
+
+
+class _BoxesView:
+    """Minimal NumPy stand-in for ultralytics Boxes (xyxy, xywh, conf, cls + boolean indexing)."""
+
+    def __init__(self, xyxy: np.ndarray, conf: np.ndarray, cls: np.ndarray):
+        self.xyxy = xyxy
+        self.conf = conf
+        self.cls = cls
+
+    @classmethod
+    def from_batch(cls, batch: DetectionBatch) -> "_BoxesView":
+        return cls(
+            batch.boxes.astype(np.float32),
+            batch.scores.astype(np.float32),
+            batch.classes.astype(np.float32),
+        )
+
+    @property
+    def xywh(self) -> np.ndarray:
+        out = np.empty_like(self.xyxy)
+        out[:, 0] = (self.xyxy[:, 0] + self.xyxy[:, 2]) * 0.5
+        out[:, 1] = (self.xyxy[:, 1] + self.xyxy[:, 3]) * 0.5
+        out[:, 2] = self.xyxy[:, 2] - self.xyxy[:, 0]
+        out[:, 3] = self.xyxy[:, 3] - self.xyxy[:, 1]
+        return out
+
+    def __len__(self) -> int:
+        return len(self.conf)
+
+    def __getitem__(self, idx) -> "_BoxesView":
+        return _BoxesView(self.xyxy[idx], self.conf[idx], self.cls[idx])
+
+
+def _load_tracker_cfg(tracker_cfg: str):
+    from ultralytics.utils import IterableSimpleNamespace
+    from ultralytics.utils.checks import check_yaml
+    try:
+        from ultralytics.utils import YAML
+        data = YAML.load(check_yaml(tracker_cfg))
+    except ImportError:  # older ultralytics
+        from ultralytics.utils import yaml_load
+        data = yaml_load(check_yaml(tracker_cfg))
+    return IterableSimpleNamespace(**data)
+
+
+class UltralyticsTracker:
+    """
+    Ultralytics BoT-SORT / ByteTrack, updated one frame at a time from a list of detections.
+    tracker_cfg: None (BoT-SORT default) or a tracker yaml such as "bytetrack.yaml".
+    """
+
+    def __init__(self, tracker_cfg: Optional[str] = None, frame_rate: int = 30):
+        from ultralytics.trackers.track import TRACKER_MAP
+        cfg = _load_tracker_cfg(tracker_cfg or DEFAULT_TRACKER_CFG)
+        if cfg.tracker_type not in TRACKER_MAP:
+            raise ValueError(f"Unsupported tracker_type for decoupled tracking: {cfg.tracker_type}")
+        tracker_cls = TRACKER_MAP[cfg.tracker_type]
+        try:
+            self._tracker = tracker_cls(args=cfg, frame_rate=frame_rate)
+        except TypeError:  # newer ultralytics: frame rate is not a constructor argument
+            self._tracker = tracker_cls(args=cfg)
+
+    def reset(self) -> None:
+        self._tracker.reset()
+
+    def update(
+        self,
+        detections: Union[DetectionBatch, List[dict]],
+        frame_bgr: Optional[np.ndarray] = None,
+    ) -> DetectionBatch:
+        """
+        Feed one frame's detections (DetectionBatch, or dicts in the detect_persons format).
+        Frames must arrive in order. Returns the tracked detections with track_ids set.
+        """
+        if not isinstance(detections, DetectionBatch):
+            detections = DetectionBatch.from_dicts(detections)
+        tracks = np.asarray(self._tracker.update(_BoxesView.from_batch(detections), frame_bgr)).reshape(-1, 8)
+        return DetectionBatch.from_arrays(tracks[:, :4], tracks[:, 5], tracks[:, 6], tracks[:, 4])
+
+
+def is_courtflow_tracker(tracker_cfg: Optional[str]) -> bool:
+    return bool(tracker_cfg) and tracker_cfg.lower().split(".")[0] == COURTFLOW_TRACKER
+
+
+def make_tracker(
+    tracker_cfg: Optional[str] = None,
+    frame_rate: int = 30,
+    *,
+    homography: Optional[np.ndarray] = None,
+):
+    """Decoupled tracker for a --tracker value: CourtflowTracker for "courtflow", else UltralyticsTracker."""
+    if is_courtflow_tracker(tracker_cfg):
+        return CourtflowTracker(homography=homography)
+    return UltralyticsTracker(tracker_cfg, frame_rate=frame_rate)
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """(T, 4) x (D, 4) xyxy boxes -> (T, D) IoU."""
+    a = np.asarray(a, dtype=np.float64).reshape(-1, 1, 4)
+    b = np.asarray(b, dtype=np.float64).reshape(1, -1, 4)
+    iw = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    ih = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = iw * ih
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-9)
+
+
+def _to_cxcywh(xyxy: np.ndarray) -> np.ndarray:
+    x1, y1, x2, y2 = (xyxy[:, i] for i in range(4))
+    return np.stack([(x1 + x2) * 0.5, (y1 + y2) * 0.5, x2 - x1, y2 - y1], axis=1)
+
+
+def _to_xyxy(cxcywh: np.ndarray) -> np.ndarray:
+    cx, cy, w, h = (cxcywh[:, i] for i in range(4))
+    return np.stack([cx - w * 0.5, cy - h * 0.5, cx + w * 0.5, cy + h * 0.5], axis=1)
+
+
+class CourtflowTracker:
+    """
+    Kalman + IoU / ground-distance tracker over DetectionBatch arrays (same update() contract as
+    UltralyticsTracker). State per track: (cx, cy, w, h) and their velocities, per sampled frame.
+    - Association: greedy on cost = (1 - IoU) + 0.5 * normalized ground-point distance; a pair is
+      allowed when IoU >= iou_min or the distance is within max_dist (box heights) /
+      court_max_dist_m (metres, with homography).
+    - New tracks start from unmatched detections with score >= new_track_score and get an ID once
+      matched min_hits times (immediately during the first min_hits frames); lost tracks are kept
+      max_age updates for re-association.
+    - At most max_tracks tracks (default 4, a padel court; 0 = no limit) are kept: confirmed tracks
+      first, then the longest-lived (most hits), most recently matched and highest-scoring ones, so
+      extra people (crowd, stands, coaches) cannot spawn tracks without bound.
+    Output: matched, confirmed tracks with the detection's box, score and class.
+    """
+
+    _STD_POS = 1.0 / 20
+    _STD_VEL = 1.0 / 160
+
+    def __init__(
+        self,
+        *,
+        max_age: int = 30,
+        min_hits: int = 2,
+        iou_min: float = 0.1,
+        max_dist: float = 1.0,
+        court_max_dist_m: float = 1.5,
+        new_track_score: float = 0.5,
+        max_tracks: int = 4,
+        homography: Optional[np.ndarray] = None,
+    ):
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.iou_min = iou_min
+        self.max_dist = max_dist
+        self.court_max_dist_m = court_max_dist_m
+        self.new_track_score = new_track_score
+        self.max_tracks = max(0, int(max_tracks))
+        self.homography = None if homography is None else np.asarray(homography, dtype=np.float64).reshape(3, 3)
+        self._F = np.eye(8)
+        self._F[:4, 4:] = np.eye(4)
+        self.reset()
+
+    def reset(self) -> None:
+        self._mean = np.zeros((0, 8))
+        self._cov = np.zeros((0, 8, 8))
+        self._ids = np.zeros(0, dtype=np.int64)  # -1 until confirmed
+        self._hits = np.zeros(0, dtype=np.int64)
+        self._misses = np.zeros(0, dtype=np.int64)
+        self._scores = np.zeros(0)  # score of the last matched detection
+        self._next_id = 1
+        self._frame = 0
+
+    def _predict(self) -> None:
+        if not len(self._mean):
+            return
+        h = np.maximum(self._mean[:, 3], 1.0)[:, None]
+        std = np.concatenate([np.repeat(self._STD_POS * h, 4, 1), np.repeat(self._STD_VEL * h, 4, 1)], 1)
+        self._mean = self._mean @ self._F.T
+        self._cov = self._F @ self._cov @ self._F.T
+        self._cov[:, np.arange(8), np.arange(8)] += std ** 2
+
+    def _correct(self, idx: np.ndarray, z: np.ndarray) -> None:
+        """Kalman update of tracks idx with measurements z (cx, cy, w, h)."""
+        mean, cov = self._mean[idx], self._cov[idx]
+        r = (self._STD_POS * np.maximum(mean[:, 3], 1.0)) ** 2
+        S = cov[:, :4, :4] + r[:, None, None] * np.eye(4)
+        K = np.linalg.solve(S, cov[:, :4, :]).transpose(0, 2, 1)  # P H^T S^-1 (P, S symmetric)
+        self._mean[idx] = mean + np.einsum("tij,tj->ti", K, z - mean[:, :4])
+        self._cov[idx] = cov - K @ S @ K.transpose(0, 2, 1)
+
+    def _keep(self, mask: np.ndarray) -> None:
+        self._mean, self._cov = self._mean[mask], self._cov[mask]
+        self._ids, self._hits, self._misses = self._ids[mask], self._hits[mask], self._misses[mask]
+        self._scores = self._scores[mask]
+
+    def _spawn(self, z: np.ndarray, scores: np.ndarray) -> None:
+        n = len(z)
+        h = np.maximum(z[:, 3], 1.0)[:, None]
+        std = np.concatenate([np.repeat(2 * self._STD_POS * h, 4, 1), np.repeat(10 * self._STD_VEL * h, 4, 1)], 1)
+        cov = np.zeros((n, 8, 8))
+        cov[:, np.arange(8), np.arange(8)] = std ** 2
+        self._mean = np.concatenate([self._mean, np.concatenate([z, np.zeros((n, 4))], 1)])
+        self._cov = np.concatenate([self._cov, cov])
+        self._ids = np.concatenate([self._ids, np.full(n, -1, dtype=np.int64)])
+        self._hits = np.concatenate([self._hits, np.ones(n, dtype=np.int64)])
+        self._misses = np.concatenate([self._misses, np.zeros(n, dtype=np.int64)])
+        self._scores = np.concatenate([self._scores, np.asarray(scores, dtype=np.float64)])
+
+    def _ground(self, xyxy: np.ndarray) -> np.ndarray:
+        """Ground points (bbox bottom-centre), mapped to court space when a homography is set."""
+        pts = np.stack([(xyxy[:, 0] + xyxy[:, 2]) * 0.5, xyxy[:, 3]], axis=1)
+        if self.homography is None:
+            return pts
+        p = np.concatenate([pts, np.ones((len(pts), 1))], 1) @ self.homography.T
+        return p[:, :2] / np.where(np.abs(p[:, 2:]) < 1e-9, 1e-9, p[:, 2:])
+
+    def _associate(self, det_xyxy: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Greedy lowest-cost (track, detection) pairs among the allowed ones."""
+        if not len(self._mean) or not len(det_xyxy):
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+        pred_xyxy = _to_xyxy(self._mean[:, :4])
+        iou = iou_matrix(pred_xyxy, det_xyxy)
+        dist = np.linalg.norm(self._ground(pred_xyxy)[:, None, :] - self._ground(det_xyxy)[None, :, :], axis=2)
+        if self.homography is None:
+            dist = dist / np.maximum(self._mean[:, 3:4], 1.0) / self.max_dist
+        else:
+            dist = dist / self.court_max_dist_m
+        allowed = (iou >= self.iou_min) | (dist <= 1.0)
+        cost = (1.0 - iou) + 0.5 * np.minimum(dist, 1.0)
+        ti, di = np.nonzero(allowed)
+        rows, cols, used_t, used_d = [], [], set(), set()
+        for k in np.argsort(cost[ti, di], kind="stable"):
+            t, d = int(ti[k]), int(di[k])
+            if t in used_t or d in used_d:
+                continue
+            used_t.add(t)
+            used_d.add(d)
+            rows.append(t)
+            cols.append(d)
+        return np.asarray(rows, dtype=np.intp), np.asarray(cols, dtype=np.intp)
+
+    def update(
+        self,
+        detections: Union[DetectionBatch, List[dict]],
+        frame_bgr: Optional[np.ndarray] = None,
+    ) -> DetectionBatch:
+        """Feed one frame's detections (frame_bgr unused). Returns confirmed tracks matched in this frame."""
+        if not isinstance(detections, DetectionBatch):
+            detections = DetectionBatch.from_dicts(detections)
+        self._frame += 1
+        self._predict()
+        det_xyxy = detections.boxes.astype(np.float64).reshape(-1, 4)
+        rows, cols = self._associate(det_xyxy)
+        z = _to_cxcywh(det_xyxy)
+        if len(rows):
+            self._correct(rows, z[cols])
+        matched = np.zeros(len(self._mean), dtype=bool)
+        matched[rows] = True
+        self._hits[matched] += 1
+        self._misses[matched] = 0
+        self._misses[~matched] += 1
+        self._scores[rows] = detections.scores[cols]
+        n_old = len(self._mean)
+        fresh = np.ones(len(detections), dtype=bool)
+        fresh[cols] = False
+        fresh &= detections.scores >= self.new_track_score
+        if fresh.any():
+            self._spawn(z[fresh], detections.scores[fresh])
+        out_tracks = np.concatenate([rows, n_old + np.arange(int(fresh.sum()))]).astype(np.intp)
+        out_dets = np.concatenate([cols, np.flatnonzero(fresh)]).astype(np.intp)
+        if self.max_tracks and len(self._mean) > self.max_tracks:
+            # lexsort: last key is primary -> confirmed, most hits, fewest misses, highest score
+            order = np.lexsort((-self._scores, self._misses, -self._hits, self._ids < 0))
+            keep = np.zeros(len(self._mean), dtype=bool)
+            keep[order[: self.max_tracks]] = True
+            kept_pairs = keep[out_tracks]
+            out_tracks = (np.cumsum(keep) - 1)[out_tracks[kept_pairs]]
+            out_dets = out_dets[kept_pairs]
+            self._keep(keep)
+        # Confirm (assign IDs in track order) and drop dead tracks
+        confirm = (self._ids < 0) & ((self._hits >= self.min_hits) | (self._frame <= self.min_hits))
+        for t in np.flatnonzero(confirm):
+            self._ids[t] = self._next_id
+            self._next_id += 1
+        emit = self._ids[out_tracks] >= 0
+        result = detections[out_dets[emit]]
+        result.track_ids = self._ids[out_tracks[emit]].copy()
+        alive = (self._misses <= self.max_age) & ((self._ids >= 0) | (self._misses == 0))
+        if not alive.all():
+            self._keep(alive)
+        return result
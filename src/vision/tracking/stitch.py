@@ -0,0 +1,141 @@
+"""
+Stitch track IDs across two runs that overlap in time (video segments, or a resumed run after a checkpoint).
+Tracks are matched by mean bbox IoU over the frames both runs cover; unmatched tracks get fresh IDs.
+Uses: numpy.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+def _iou(a: List[float], b: List[float]) -> float:
+    ix = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _by_id_and_frame(records: Iterable[dict], frames: set) -> Dict[int, Dict[int, List[float]]]:
+    out: Dict[int, Dict[int, List[float]]] = defaultdict(dict)
+    for r in records:
+        if r["frame"] in frames and r.get("bbox_xyxy"):
+            out[r["player_id"]][r["frame"]] = r["bbox_xyxy"]
+    return out
+
+
+def match_track_ids(
+    prev_records: List[dict],
+    next_records: List[dict],
+    overlap_frames: Iterable[int],
+    *,
+    min_iou: float = 0.3,
+    min_common_frames: int = 2,
+) -> Dict[int, int]:
+    """
+    Map player_id in next_records -> player_id in prev_records for tracks that cover the same person
+    in overlap_frames (mean IoU >= min_iou over at least min_common_frames shared frames).
+    Greedy one-to-one assignment, best mean IoU first.
+    """
+    frames = set(overlap_frames)
+    prev = _by_id_and_frame(prev_records, frames)
+    nxt = _by_id_and_frame(next_records, frames)
+    candidates: List[Tuple[float, int, int]] = []
+    for nid, n_boxes in nxt.items():
+        for pid, p_boxes in prev.items():
+            common = n_boxes.keys() & p_boxes.keys()
+            if len(common) < min_common_frames:
+                continue
+            score = float(np.mean([_iou(n_boxes[f], p_boxes[f]) for f in common]))
+            if score >= min_iou:
+                candidates.append((score, nid, pid))
+    mapping: Dict[int, int] = {}
+    used_prev = set()
+    for score, nid, pid in sorted(candidates, reverse=True):
+        if nid in mapping or pid in used_prev:
+            continue
+        mapping[nid] = pid
+        used_prev.add(pid)
+    return mapping
+
+
+def stitch_records(
+    prev_records: List[dict],
+    next_records: List[dict],
+    boundary_frame: int,
+    *,
+    overlap_frames: Optional[Iterable[int]] = None,
+    next_free_id: Optional[int] = None,
+    min_iou: float = 0.3,
+) -> Tuple[List[dict], int]:
+    """
+    Relabel next_records (a run that started before boundary_frame, its warm-up) onto prev_records' IDs.
+    Records of next_records before boundary_frame are dropped (prev_records owns them).
+    overlap_frames defaults to the frames both runs cover before boundary_frame.
+    Unmatched tracks get IDs from next_free_id upward (default: above every ID in prev_records).
+    Returns (relabelled next_records from boundary_frame on, next free ID).
+    """
+    if overlap_frames is None:
+        prev_frames = {r["frame"] for r in prev_records if r["frame"] < boundary_frame}
+        overlap_frames = {r["frame"] for r in next_records if r["frame"] < boundary_frame} & prev_frames
+    mapping = match_track_ids(prev_records, next_records, overlap_frames, min_iou=min_iou)
+    if next_free_id is None:
+        next_free_id = max((r["player_id"] for r in prev_records), default=0) + 1
+    out: List[dict] = []
+    for r in next_records:
+        if r["frame"] < boundary_frame:
+            continue
+        pid = r["player_id"]
+        if pid not in mapping:
+            mapping[pid] = next_free_id
+            next_free_id += 1
+        out.append({**r, "player_id": mapping[pid]})
+    return out, next_free_id
+
+
+class StreamStitcher:
+    """
+    Streaming form of stitch_records for a run resumed at boundary_frame after a warm-up window:
+    feed records frame by frame; warm-up records (frame < boundary_frame) are held back and matched
+    against prev_window once the boundary is reached, later records are relabelled on the fly.
+    """
+
+    def __init__(
+        self,
+        prev_window: List[dict],
+        boundary_frame: int,
+        *,
+        next_free_id: int,
+        min_iou: float = 0.3,
+    ):
+        self.prev_window = prev_window
+        self.boundary_frame = boundary_frame
+        self.next_free_id = next_free_id
+        self.min_iou = min_iou
+        self._warmup: List[dict] = []
+        self._mapping: Optional[Dict[int, int]] = None
+
+    def _resolve(self) -> None:
+        prev_frames = {r["frame"] for r in self.prev_window}
+        overlap = {r["frame"] for r in self._warmup} & prev_frames
+        self._mapping = match_track_ids(self.prev_window, self._warmup, overlap, min_iou=self.min_iou)
+        self._warmup = []
+
+    def feed(self, frame_idx: int, records: List[dict]) -> List[dict]:
+        """Records of one frame -> relabelled records to keep ([] during warm-up)."""
+        if frame_idx < self.boundary_frame:
+            self._warmup.extend(records)
+            return []
+        if self._mapping is None:
+            self._resolve()
+        out = []
+        for r in records:
+            pid = r["player_id"]
+            if pid not in self._mapping:
+                self._mapping[pid] = self.next_free_id
+                self.next_free_id += 1
+            out.append({**r, "player_id": self._mapping[pid]})
+        return out
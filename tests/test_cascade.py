@@ -0,0 +1,59 @@
+"""Fast/heavy detector cascade: which frames go to the heavy model."""
+from types import SimpleNamespace
+
+import numpy as np
+
+from src.vision.detection.yolo import DetectorCascade
+
+
+class _Model:
+    """predict() returns the scripted (n, 6) [x1, y1, x2, y2, conf, cls] rows for each frame value."""
+
+    def __init__(self, script):
+        self.script = script
+        self.seen = []
+
+    def predict(self, frames, **kwargs):
+        self.seen.extend(int(f[0, 0, 0]) for f in frames)
+        return [SimpleNamespace(boxes=_Boxes(self.script[int(f[0, 0, 0])])) for f in frames]
+
+
+class _Boxes:
+    def __init__(self, rows):
+        self.data = np.array(rows, dtype=np.float32).reshape(-1, 6)
+
+    def __len__(self):
+        return len(self.data)
+
+
+def _players(dx=0.0, conf=0.9, n=4):
+    return [[100 * k + dx, 50, 100 * k + 40 + dx, 150, conf, 0] for k in range(n)]
+
+
+def _frames(*ids):
+    return [np.full((4, 4, 3), i, dtype=np.uint8) for i in ids]
+
+
+def test_heavy_model_only_on_unreliable_frames():
+    fast = _Model({0: _players(), 1: _players(n=3), 2: _players(conf=0.45), 3: _players(dx=60), 4: _players(dx=62)})
+    heavy = _Model({1: _players(), 2: _players(), 3: _players(dx=60)})
+    cascade = DetectorCascade(fast, heavy, min_confidence=0.5, min_iou=0.3)
+    out = cascade.detect(_frames(0, 1, 2, 3, 4))
+    assert fast.seen == [0, 1, 2, 3, 4]
+    assert heavy.seen == [1, 2, 3]
+    assert [len(d) for d in out] == [4, 4, 4, 4, 4]
+    assert cascade.stats() == {
+        "cascade_frames": 5,
+        "cascade_heavy_frames": 3,
+        "cascade_heavy_fraction": 0.6,
+        "cascade_heavy_reasons": {"players": 1, "confidence": 1, "iou_drop": 1},
+    }
+
+
+def test_roi_mask_decides_player_count():
+    # Two extra people outside the court (x >= 1000) do not make the frame unreliable
+    rows = _players() + [[1000, 50, 1040, 150, 0.3, 0], [1100, 50, 1140, 150, 0.3, 0]]
+    fast, heavy = _Model({0: rows}), _Model({})
+    cascade = DetectorCascade(fast, heavy, in_roi=lambda dets: dets.boxes[:, 0] < 1000)
+    assert len(cascade.detect(_frames(0))[0]) == 6
+    assert heavy.seen == []
@@ -0,0 +1,65 @@
+"""CourtflowTracker: ID stability through crossings / occlusions and the max_tracks cap."""
+import numpy as np
+
+from src.vision.detection.batch import DetectionBatch
+from src.vision.tracking.mot import CourtflowTracker, iou_matrix
+
+
+def _batch(boxes, scores=None):
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    scores = np.full(len(boxes), 0.9) if scores is None else np.asarray(scores, dtype=np.float64)
+    return DetectionBatch.from_arrays(boxes, scores, np.zeros(len(boxes)))
+
+
+def _ids_by_x(out):
+    return {round(float(b[0])): int(t) for b, t in zip(out.boxes, out.track_ids)}
+
+
+def test_iou_matrix():
+    a = np.array([[0, 0, 10, 10], [20, 20, 30, 30]], dtype=float)
+    b = np.array([[0, 0, 10, 10], [5, 0, 15, 10]], dtype=float)
+    np.testing.assert_allclose(iou_matrix(a, b), [[1.0, 1 / 3], [0.0, 0.0]])
+
+
+def test_ids_stable_through_crossing_and_missed_frames():
+    tracker = CourtflowTracker()
+    first = last = None
+    for f in range(40):
+        boxes = []
+        for k in range(4):
+            x = 100 + k * 150 + (f * 6 if k == 0 else 0) - (f * 6 if k == 1 else 0)
+            if k == 2 and 10 <= f < 13:
+                continue  # occluded for three frames
+            boxes.append([x, 200, x + 40, 300])
+        out = tracker.update(_batch(boxes))
+        if f == 0:
+            first = out
+        last = out
+    assert sorted(first.track_ids.tolist()) == [1, 2, 3, 4]
+    start = _ids_by_x(first)
+    end = _ids_by_x(last)
+    # Player 0 moved right by 39 * 6 px, player 1 left by the same; 2 and 3 stayed put
+    assert end[100 + 39 * 6] == start[100]
+    assert end[250 - 39 * 6] == start[250]
+    assert end[400] == start[400] and end[550] == start[550]
+    assert sorted(last.track_ids.tolist()) == [1, 2, 3, 4]
+
+
+def test_max_tracks_keeps_confirmed_players_over_newcomers():
+    tracker = CourtflowTracker(max_tracks=4)
+    players = [[100 + k * 150, 200, 140 + k * 150, 300] for k in range(4)]
+    for _ in range(5):
+        tracker.update(_batch(players))
+    crowd = [[40 + k * 60, 20, 70 + k * 60, 80] for k in range(10)]
+    for _ in range(5):
+        out = tracker.update(_batch(players + crowd, [0.9] * 4 + [0.95] * 10))
+    assert len(tracker._mean) == 4
+    assert sorted(out.track_ids.tolist()) == [1, 2, 3, 4]
+    assert tracker._next_id == 5
+
+
+def test_max_tracks_zero_disables_the_cap():
+    tracker = CourtflowTracker(max_tracks=0)
+    boxes = [[k * 50, 0, k * 50 + 30, 60] for k in range(8)]
+    out = tracker.update(_batch(boxes))
+    assert len(out) == 8
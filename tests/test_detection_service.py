@@ -0,0 +1,61 @@
+"""Shared detection service: cross-stream batching, per-request results, errors."""
+import threading
+
+import pytest
+
+from src.vision.detection.service import DetectionService
+
+
+class _Model:
+    def __init__(self):
+        self.calls = []
+        self.gate = threading.Event()
+
+    def predict(self, frames, **kwargs):
+        self.gate.wait(5)
+        if "boom" in frames:
+            raise ValueError("bad frame")
+        self.calls.append((list(frames), kwargs))
+        return [f"{f}@{kwargs.get('conf')}" for f in frames]
+
+
+def _run_streams(service, requests):
+    out = {}
+
+    def _stream(name, frames, conf):
+        try:
+            out[name] = service.predict(frames, conf=conf)
+        except Exception as e:
+            out[name] = e
+
+    threads = [threading.Thread(target=_stream, args=r) for r in requests]
+    for t in threads:
+        t.start()
+    return threads, out
+
+
+def test_streams_batched_together_and_split_back():
+    model = _Model()
+    service = DetectionService(model, max_batch=8, max_wait_s=0.2)
+    threads, out = _run_streams(service, [("a", ["a0", "a1"], 0.4), ("b", ["b0"], 0.4), ("c", ["c0"], 0.6)])
+    model.gate.set()
+    for t in threads:
+        t.join()
+    service.close()
+    assert out["a"] == ["a0@0.4", "a1@0.4"] and out["b"] == ["b0@0.4"] and out["c"] == ["c0@0.6"]
+    # Same settings share one predict call; different conf never does
+    assert sorted(len(frames) for frames, _ in model.calls) == [1, 3]
+    stats = service.stats()
+    assert stats["frames"] == 4 and stats["calls"] == 2 and stats["multi_stream_calls"] == 1
+
+
+def test_error_reaches_only_its_callers_and_closed_service_refuses():
+    model = _Model()
+    model.gate.set()
+    service = DetectionService(model, max_wait_s=0)
+    with pytest.raises(ValueError):
+        service.predict(["boom"], conf=0.4)
+    assert service.predict(["x"], conf=0.4) == ["x@0.4"]
+    service.close()
+    with pytest.raises(RuntimeError):
+        service.predict(["y"], conf=0.4)
@@ -0,0 +1,71 @@
+"""Stage 02 execution engine: serial and threaded runs agree, errors surface, frame sources are closed."""
+import threading
+
+import numpy as np
+import pytest
+
+from src.vision.engine import iter_batches, run_serial, run_threaded
+
+
+def _frames(n, closed=None):
+    try:
+        for i in range(n):
+            yield i, np.full((2, 2, 3), i, dtype=np.uint8)
+    finally:
+        if closed is not None:
+            closed.set()
+
+
+def _collect(runner, n, batch_size, **kw):
+    out = []
+    runner(
+        _frames(n),
+        lambda batch: [int(f[0, 0, 0]) * 10 for _, f in batch],
+        lambda batch, res: out.extend(zip([i for i, _ in batch], res)),
+        batch_size=batch_size,
+        **kw,
+    )
+    return out
+
+
+def test_iter_batches_keeps_order_and_tail():
+    batches = list(iter_batches(((i, None) for i in range(7)), 3))
+    assert [[i for i, _ in b] for b in batches] == [[0, 1, 2], [3, 4, 5], [6]]
+
+
+@pytest.mark.parametrize("batch_size", [1, 4])
+def test_threaded_matches_serial(batch_size):
+    serial = _collect(run_serial, 25, batch_size)
+    threaded = _collect(run_threaded, 25, batch_size, queue_size=2)
+    assert threaded == serial == [(i, i * 10) for i in range(25)]
+
+
+def test_threaded_propagates_infer_exception_and_closes_frames():
+    closed = threading.Event()
+
+    def infer(batch):
+        if batch[0][0] >= 6:
+            raise ValueError("boom")
+        return [None] * len(batch)
+
+    with pytest.raises(ValueError, match="boom"):
+        run_threaded(_frames(1000, closed), infer, lambda b, r: None, batch_size=2, queue_size=1)
+    assert closed.is_set()
+    assert not [t for t in threading.enumerate() if t.name.startswith("stage02-")]
+
+
+def test_threaded_propagates_post_exception():
+    def post(batch, res):
+        raise RuntimeError("post failed")
+
+    with pytest.raises(RuntimeError, match="post failed"):
+        run_threaded(_frames(50), lambda b: [None] * len(b), post, batch_size=1, queue_size=1)
+
+
+def test_threaded_propagates_decoder_exception():
+    def bad_frames():
+        yield 0, np.zeros((1, 1, 3), dtype=np.uint8)
+        raise OSError("decode failed")
+
+    with pytest.raises(OSError, match="decode failed"):
+        run_threaded(bad_frames(), lambda b: [None] * len(b), lambda b, r: None)
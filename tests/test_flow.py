@@ -0,0 +1,43 @@
+"""Optical-flow box propagation between detector frames."""
+import numpy as np
+
+from src.vision.detection.batch import DetectionBatch
+from src.vision.tracking.flow import BoxFlow
+
+_RNG = np.random.default_rng(0)
+_BG = _RNG.integers(20, 60, (240, 320), dtype=np.uint8)
+_TEX = _RNG.integers(130, 256, (60, 24), dtype=np.uint8)
+
+
+def _frame(x, y, textured=True):
+    f = _BG.copy()
+    f[y:y + 60, x:x + 24] = _TEX if textured else 200
+    return f
+
+
+def _dets(x, y):
+    return DetectionBatch.from_arrays(np.array([[x, y, x + 24, y + 60]], float), np.array([0.9]), np.array([0]))
+
+
+def test_boxes_follow_textured_player():
+    flow = BoxFlow()
+    flow.reset(_frame(100, 80), _dets(100, 80))
+    for k in range(1, 6):
+        out = flow.propagate(_frame(100 + 3 * k, 80 + k))
+        assert out is not None
+        np.testing.assert_allclose(out.boxes[0], [100 + 3 * k, 80 + k, 124 + 3 * k, 140 + k], atol=0.5)
+        assert out.scores[0] == np.float64(0.9) and out.track_ids[0] == -1
+
+
+def test_lost_box_or_unseeded_asks_for_detector():
+    flow = BoxFlow()
+    assert flow.propagate(_frame(100, 80)) is None
+    flow.reset(_frame(100, 80), _dets(100, 80))
+    assert flow.propagate(_BG.copy()) is None  # player gone: points fail the forward-backward check
+
+
+def test_no_players_propagates_empty():
+    flow = BoxFlow()
+    flow.reset(_BG.copy(), DetectionBatch.empty())
+    out = flow.propagate(_BG.copy())
+    assert out is not None and len(out) == 0
@@ -0,0 +1,102 @@
+"""Shared-memory frame ring and the separate-process frame source, fed by a scripted stand-in ffmpeg."""
+import os
+import stat
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.video.frame_ring import ProcessFrameSource, SharedFrameRing
+
+W, H = 4, 2
+
+
+def _install_ffmpeg(tmp_path, monkeypatch, exit_code=0):
+    """ffmpeg writing 10 frames (frame k filled with byte k) to stdout; the decoder process inherits PATH."""
+    d = tmp_path / "bin"
+    d.mkdir()
+    script = d / "ffmpeg"
+    script.write_text(
+        f"#!{sys.executable}\n"
+        "import sys\n"
+        "for k in range(10):\n"
+        f"    sys.stdout.buffer.write(bytes([k]) * {W * H * 3})\n"
+        "sys.stdout.buffer.flush()\n"
+        f"sys.exit({exit_code})\n"
+    )
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", f"{d}{os.pathsep}{os.environ.get('PATH', '')}")
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    _install_ffmpeg(tmp_path, monkeypatch)
+
+
+def _spec(**kw):
+    spec = {
+        "decoder": "ffmpeg", "video_path": Path("match.mp4"), "width": W, "height": H, "fps": 30.0,
+        "size": None, "every_n": 1, "skip_decode": False, "start_frame": 0, "end_frame": None,
+    }
+    spec.update(kw)
+    return spec
+
+
+def test_ring_slot_of_and_close_while_referenced():
+    ring = SharedFrameRing.create(3, H, W)
+    try:
+        assert ring.slot_of(ring.frames[2]) == 2
+        assert ring.slot_of(ring.frames[1].copy()) is None
+        assert ring.slot_of(np.zeros((H, W, 3), np.uint8)) is None
+        view = ring.frames[0]
+        view[:] = 7
+    finally:
+        ring.unlink()
+    assert not ring.try_close()  # a frame is still referenced: the mapping stays
+    assert int(view.sum()) == 7 * W * H * 3
+    del view
+    assert ring.try_close()
+
+
+def test_process_source_yields_frames_without_copies(fake_ffmpeg):
+    counters = {}
+    source = ProcessFrameSource(_spec(), hold=2, counters=counters)
+    seen = [(idx, int(frame[0, 0, 0]), frame.copy()) for idx, frame in source]
+    source.close()
+    assert [(idx, v) for idx, v, _ in seen] == [(k, k) for k in range(10)]
+    assert all((f == k).all() for k, _, f in seen)
+    assert counters["frames_decoded"] == 10
+    assert counters["frame_transport"] == "shared_memory"
+    assert counters["frame_transport_slots"] == 2 + 4
+    assert counters["frame_transport_bytes_copied"] == 0
+    assert counters["frame_transport_bytes_copied_per_frame"] == 0.0
+    assert source.ring is None
+
+
+def test_process_source_held_frames_stay_valid(fake_ffmpeg):
+    source = ProcessFrameSource(_spec(), hold=3, lookahead=1)
+    held = []
+    for idx, frame in source:
+        held = (held + [(idx, frame)])[-3:]
+        assert all((f == i).all() for i, f in held)
+    del held, frame
+    source.close()
+
+
+def test_process_source_unreadable_video_is_empty(tmp_path):
+    source = ProcessFrameSource(_spec(decoder="opencv", video_path=tmp_path / "missing.mp4"), hold=1)
+    try:
+        # OpenCV yields nothing for an unreadable file: an empty stream, not a hang
+        assert list(source) == []
+    finally:
+        source.close()
+
+
+def test_process_source_surfaces_decoder_errors(tmp_path, monkeypatch):
+    _install_ffmpeg(tmp_path, monkeypatch, exit_code=1)
+    source = ProcessFrameSource(_spec(), hold=1)
+    with pytest.raises(RuntimeError, match="Frame decoder process failed: RuntimeError: ffmpeg failed"):
+        for _ in source:
+            pass
+    source.close()
@@ -0,0 +1,102 @@
+"""ffmpeg rawvideo frame source, driven by a scripted stand-in for the ffmpeg binary."""
+import os
+import stat
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.video.frames_ffmpeg import FfmpegFrameReader, iter_frames, iter_sampled_frames
+
+W, H = 4, 2
+
+
+def _fake_ffmpeg(bin_dir: Path, n_frames: int, exit_code: int = 0) -> None:
+    """Writes n_frames frames (frame k filled with byte k) to stdout, then exits with exit_code."""
+    script = bin_dir / "ffmpeg"
+    script.write_text(
+        f"#!{sys.executable}\n"
+        "import sys\n"
+        f"for k in range({n_frames}):\n"
+        f"    sys.stdout.buffer.write(bytes([k % 256]) * {W * H * 3})\n"
+        "sys.stdout.buffer.flush()\n"
+        f"sys.stderr.write('decode error at packet 42\\n' if {exit_code} else '')\n"
+        f"sys.exit({exit_code})\n"
+    )
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+
+
+def _fake_ffprobe(bin_dir: Path) -> None:
+    script = bin_dir / "ffprobe"
+    script.write_text(
+        f"#!{sys.executable}\n"
+        "import json\n"
+        f"print(json.dumps({{'streams': [{{'width': {W}, 'height': {H}, 'avg_frame_rate': '25/1', 'nb_frames': '9'}}]}}))\n"
+    )
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+
+
+@pytest.fixture
+def bin_dir(tmp_path, monkeypatch):
+    d = tmp_path / "bin"
+    d.mkdir()
+    monkeypatch.setenv("PATH", f"{d}{os.pathsep}{os.environ.get('PATH', '')}")
+    return d
+
+
+def _reader(**kw):
+    return FfmpegFrameReader(Path("match.mp4"), width=W, height=H, fps=30.0, **kw)
+
+
+def test_sampled_indices_counters_and_command(bin_dir):
+    _fake_ffmpeg(bin_dir, 4)  # ffmpeg's select already dropped the unsampled frames
+    reader = _reader(every_n=5, start_frame=7, ring=3)
+    counters = {}
+    got = [(idx, int(frame[0, 0, 0])) for idx, frame in iter_sampled_frames(reader, counters=counters)]
+    assert got == [(10, 0), (15, 1), (20, 2), (25, 3)]
+    assert counters == {"frames_decoded": 4, "frames_skipped": 3 + 4 + 4 + 4}
+    cmd = " ".join(reader._command())
+    assert "select='not(mod(n+7\\,5))'" in cmd and "-ss" in cmd and "scale=" not in cmd
+
+
+def test_frames_are_views_into_a_reused_ring(bin_dir):
+    _fake_ffmpeg(bin_dir, 5)
+    frames = [frame for _, frame in _reader(ring=2)]
+    assert all(f.shape == (H, W, 3) and f.dtype == np.uint8 for f in frames)
+    assert frames[0] is not frames[1] and np.shares_memory(frames[0], frames[2])
+
+
+def test_nonzero_exit_mid_stream_raises(bin_dir):
+    _fake_ffmpeg(bin_dir, 3, exit_code=1)
+    seen = []
+    with pytest.raises(RuntimeError, match="exit 1.*decode error at packet 42"):
+        for idx, _ in _reader():
+            seen.append(idx)
+    assert seen == [0, 1, 2]
+
+
+def test_end_frame_stops_without_waiting_for_eof(bin_dir):
+    _fake_ffmpeg(bin_dir, 1000)
+    reader = _reader(every_n=2, end_frame=7)
+    assert [idx for idx, _ in reader] == [0, 2, 4, 6]
+    assert reader._proc is None
+    assert "-frames:v 4" in " ".join(reader._command())
+
+
+def test_early_close_ends_the_subprocess(bin_dir):
+    _fake_ffmpeg(bin_dir, 1000)
+    reader = _reader()
+    frames = iter(reader)
+    next(frames)
+    proc = reader._proc
+    frames.close()
+    assert proc.poll() is not None and reader._proc is None
+
+
+def test_iter_frames_matches_the_opencv_contract(bin_dir):
+    _fake_ffmpeg(bin_dir, 3)
+    _fake_ffprobe(bin_dir)
+    got = [(idx, ts, frame.shape, int(frame[0, 0, 0])) for idx, ts, frame in iter_frames(Path("m.mp4"), every_n=3)]
+    assert got == [(0, 0.0, (H, W, 3), 0), (3, 0.12, (H, W, 3), 1), (6, 0.24, (H, W, 3), 2)]
+    assert [idx for idx, _, _ in iter_frames(Path("m.mp4"), max_frames=2)] == [0, 1]
@@ -0,0 +1,43 @@
+"""Task graph for the run_match tail: concurrency, dependencies, isolated failures."""
+import threading
+
+import pytest
+
+from src.pipeline.graph import run_graph
+
+
+def test_independent_tasks_run_concurrently():
+    both_started = threading.Barrier(2, timeout=5)
+
+    def task(name):
+        both_started.wait()  # deadlocks (BrokenBarrierError) unless the two run at the same time
+        return name
+
+    results = run_graph({"05": (lambda: task("05"), ()), "06": (lambda: task("06"), ())})
+    assert {n: r.result for n, r in results.items()} == {"05": "05", "06": "06"}
+
+
+def test_dependents_wait_and_failures_stay_isolated():
+    order = []
+
+    def fail():
+        order.append("05")
+        raise RuntimeError("render crashed")
+
+    results = run_graph({
+        "upload": (lambda: order.append("upload"), ("06",)),
+        "after_render": (lambda: order.append("after_render"), ("05",)),
+        "05": (fail, ()),
+        "06": (lambda: order.append("06") or "highlights.mp4", ()),
+    })
+    assert results["05"].status == "failed" and str(results["05"].error) == "render crashed"
+    assert results["06"].status == "ok" and results["06"].result == "highlights.mp4"
+    assert results["upload"].status == "ok" and order.index("06") < order.index("upload")
+    assert results["after_render"].status == "skipped" and "after_render" not in order
+
+
+def test_unknown_dependency_and_cycle_are_rejected():
+    with pytest.raises(ValueError, match="unknown"):
+        run_graph({"a": (lambda: None, ("b",))})
+    with pytest.raises(ValueError, match="cycle"):
+        run_graph({"a": (lambda: None, ("b",)), "b": (lambda: None, ("a",))})
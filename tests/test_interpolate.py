@@ -0,0 +1,45 @@
+"""Per-player gap interpolation of sampled tracks."""
+import pytest
+
+from src.vision.tracking.interpolate import interpolate_tracks
+
+
+def _rec(frame, pid, x, y=50.0):
+    return {"frame": frame, "timestamp": round(frame / 30.0, 3), "player_id": pid,
+            "x_pixel": x + 10.0, "y_pixel": y + 50.0, "bbox_xyxy": [x, y, x + 20.0, y + 50.0]}
+
+
+def test_linear_fills_each_player_gap():
+    tracks = [_rec(0, 1, 0.0), _rec(0, 2, 300.0), _rec(5, 1, 50.0), _rec(5, 2, 300.0)]
+    out = interpolate_tracks(tracks, max_gap_frames=5)
+    assert [r["frame"] for r in out] == [0, 0] + [f for f in range(1, 5) for _ in (1, 2)] + [5, 5]
+    p1 = [r for r in out if r["player_id"] == 1]
+    assert [r["bbox_xyxy"][0] for r in p1] == [0.0, 10.0, 20.0, 30.0, 40.0, 50.0]
+    assert [r["x_pixel"] for r in p1] == [10.0, 20.0, 30.0, 40.0, 50.0, 60.0]
+    assert p1[2] == {"frame": 2, "timestamp": 0.067, "player_id": 1, "x_pixel": 30.0, "y_pixel": 100.0,
+                     "bbox_xyxy": [20.0, 50.0, 40.0, 100.0], "interpolated": True}
+    assert sum(1 for r in out if r.get("interpolated")) == 8
+    assert [r for r in out if not r.get("interpolated")] == tracks
+
+
+def test_gaps_longer_than_max_stay_empty_and_rerun_is_stable():
+    tracks = [_rec(0, 1, 0.0), _rec(5, 1, 50.0), _rec(30, 1, 100.0)]
+    out = interpolate_tracks(tracks, max_gap_frames=10)
+    assert [r["frame"] for r in out] == [0, 1, 2, 3, 4, 5, 30]
+    assert interpolate_tracks(out, max_gap_frames=10) == out
+
+
+def test_spline_is_smooth_and_hits_observations():
+    # Constant acceleration: x = f^2; the cubic follows it much closer than straight segments
+    tracks = [_rec(f, 1, float(f * f)) for f in (0, 5, 10, 15, 20)]
+    lin = interpolate_tracks(tracks, max_gap_frames=5)
+    spl = interpolate_tracks(tracks, max_gap_frames=5, method="spline")
+    assert [r["frame"] for r in spl] == list(range(21))
+    err = lambda out: max(abs(r["bbox_xyxy"][0] - r["frame"] ** 2) for r in out if 5 <= r["frame"] <= 15)
+    assert err(spl) < 0.5 < err(lin)
+    assert [r for r in spl if not r.get("interpolated")] == tracks
+
+
+def test_unknown_method_raises():
+    with pytest.raises(ValueError):
+        interpolate_tracks([_rec(0, 1, 0.0)], max_gap_frames=5, method="nearest")
@@ -0,0 +1,136 @@
+"""Persistent job queue (claim/lease, heartbeats, retry with backoff, priorities) and the worker loop."""
+import threading
+
+import pytest
+
+import src.storage.match_db as match_db
+from src.pipeline.worker import run_worker
+from src.storage import jobs
+from src.storage.match_db import create_match, update_match, upsert_court
+
+
+@pytest.fixture(autouse=True)
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(match_db, "DB_PATH", tmp_path / "courtflow.db")
+    monkeypatch.setattr(match_db, "_DB_INITIALIZED", False)
+    upsert_court("c1")
+
+
+def _match(match_id, state="FINALIZED"):
+    create_match(match_id, "c1", "FILE", f"/videos/{match_id}.mp4", f"/out/{match_id}")
+    update_match(match_id, state=state)
+
+
+def _expire(job_id):
+    with match_db.connect() as conn:
+        conn.execute("UPDATE jobs SET lease_expires_at='2000-01-01T00:00:00+00:00' WHERE id=?", (job_id,))
+
+
+def test_one_active_job_per_match_and_priority_order():
+    for m in ("m1", "m2", "m3"):
+        _match(m)
+    first = jobs.enqueue_job("m1")
+    assert jobs.enqueue_job("m1") is None
+    jobs.enqueue_job("m2", priority=5)
+    jobs.enqueue_job("m3")
+    assert [jobs.claim_job("w")["match_id"] for _ in range(3)] == ["m2", "m1", "m3"]
+    assert jobs.claim_job("w") is None
+    assert jobs.get_job(first)["state"] == "RUNNING" and jobs.get_job(first)["attempts"] == 1
+
+
+def test_concurrent_claims_never_share_a_job():
+    for k in range(20):
+        _match(f"m{k}")
+        jobs.enqueue_job(f"m{k}")
+    claimed, lock = [], threading.Lock()
+
+    def claimer(name):
+        while True:
+            job = jobs.claim_job(name)
+            if job is None:
+                return
+            with lock:
+                claimed.append(job["id"])
+
+    threads = [threading.Thread(target=claimer, args=(f"w{i}",)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(claimed) == sorted(set(claimed)) and len(claimed) == 20
+
+
+def test_expired_lease_is_reclaimed_and_old_owner_fenced_off():
+    _match("m1")
+    job_id = jobs.enqueue_job("m1")
+    jobs.claim_job("dead")
+    assert jobs.claim_job("alive") is None  # lease still valid
+    _expire(job_id)
+    job = jobs.claim_job("alive")
+    assert job["id"] == job_id and job["lease_owner"] == "alive" and job["attempts"] == 2
+    assert not jobs.heartbeat_job(job_id, "dead")
+    assert not jobs.complete_job(job_id, "dead")
+    assert jobs.heartbeat_job(job_id, "alive")
+    assert jobs.complete_job(job_id, "alive") and jobs.get_job(job_id)["state"] == "DONE"
+
+
+def test_retry_with_backoff_then_failed():
+    _match("m1")
+    job_id = jobs.enqueue_job("m1", max_attempts=2)
+    jobs.claim_job("w")
+    assert jobs.fail_job(job_id, "w", "boom", backoff_s=3600) == "QUEUED"
+    assert jobs.claim_job("w") is None  # not due before the backoff
+    with match_db.connect() as conn:
+        conn.execute("UPDATE jobs SET run_after='2000-01-01T00:00:00+00:00' WHERE id=?", (job_id,))
+    jobs.claim_job("w")
+    assert jobs.fail_job(job_id, "w", "boom again") == "FAILED"
+    job = jobs.get_job(job_id)
+    assert job["state"] == "FAILED" and job["last_error"] == "boom again"
+    assert jobs.enqueue_job("m1") is not None  # a finished job does not block re-queuing
+
+
+def test_expired_lease_without_attempts_left_fails():
+    _match("m1")
+    job_id = jobs.enqueue_job("m1", max_attempts=1)
+    jobs.claim_job("dead")
+    _expire(job_id)
+    assert jobs.claim_job("w") is None
+    assert jobs.get_job(job_id)["state"] == "FAILED"
+
+
+def test_worker_once_processes_finalized_matches_and_retries_failures():
+    for m in ("m1", "m2", "m3"):
+        _match(m)
+    _match("m4", state="DONE")
+    seen = []
+
+    def process(match_id):
+        seen.append(match_id)
+        if match_id == "m2":
+            raise RuntimeError("decode error")
+
+    counts = run_worker(concurrency=2, once=True, poll_s=0.05, backoff_s=3600, process=process)
+    assert sorted(seen) == ["m1", "m2", "m3"]
+    assert counts == {"done": 2, "retried": 1, "failed": 0}
+    by_match = {j["match_id"]: j for j in jobs.list_jobs()}
+    assert by_match["m2"]["state"] == "QUEUED" and "decode error" in by_match["m2"]["last_error"]
+    # A second run does nothing: m2 is backing off, the others are done
+    assert run_worker(once=True, process=process) == {"done": 0, "retried": 0, "failed": 0}
+
+
+def test_worker_stops_after_running_jobs():
+    _match("m1")
+    stop = threading.Event()
+    started = threading.Event()
+
+    def process(match_id):
+        started.set()
+        stop.wait(5)
+
+    t = threading.Thread(target=lambda: run_worker(poll_s=0.05, stop=stop, process=process))
+    t.start()
+    assert started.wait(5)
+    stop.set()
+    t.join(5)
+    assert not t.is_alive()
+    assert jobs.list_jobs()[0]["state"] == "DONE"
@@ -0,0 +1,61 @@
+"""Segment planning and track-ID stitching for segment-parallel and resumed stage 02 runs."""
+from src.vision.parallel import _iter_frame_groups, plan_segments
+from src.vision.tracking.stitch import StreamStitcher, stitch_records
+
+
+def _rec(frame, pid, x):
+    return {"frame": frame, "timestamp": frame / 30.0, "player_id": pid, "x_pixel": x + 10.0,
+            "y_pixel": 100.0, "bbox_xyxy": [x, 50.0, x + 20.0, 100.0]}
+
+
+def test_plan_segments_covers_video_on_sampling_grid():
+    segs = plan_segments(1000, 3, 5, 60)
+    assert segs[0] == (0, 0, 335)
+    assert [s[1] for s in segs] == [0, 335, 670]
+    assert segs[-1][2] == 1000
+    for (run_start, own_start, _), (_, _, prev_end) in zip(segs[1:], segs):
+        assert own_start == prev_end and own_start % 5 == 0
+        assert own_start - run_start == 60
+
+
+def test_plan_segments_short_and_empty_videos():
+    assert plan_segments(0, 4, 5, 60) == []
+    assert plan_segments(3, 4, 5, 60) == [(0, 0, 3)]  # fewer frames than one sampling step
+    assert plan_segments(12, 8, 5, 0) == [(0, 0, 5), (5, 5, 10), (10, 10, 12)]
+
+
+def test_stitch_records_maps_ids_across_overlap():
+    prev = [_rec(f, 1, 0.0) for f in range(0, 10)] + [_rec(f, 2, 200.0) for f in range(0, 10)]
+    # Next run starts at frame 6 (warm-up 6..9) with its own IDs: 7 follows player 2, 8 follows player 1,
+    # 9 is a new player that appears after the boundary
+    nxt = ([_rec(f, 7, 200.0) for f in range(6, 14)] + [_rec(f, 8, 0.5) for f in range(6, 14)]
+           + [_rec(f, 9, 400.0) for f in range(11, 14)])
+    nxt.sort(key=lambda r: r["frame"])
+    out, next_free = stitch_records(prev, nxt, 10)
+    assert all(r["frame"] >= 10 for r in out)
+    ids = {(r["x_pixel"], r["player_id"]) for r in out}
+    assert ids == {(210.0, 2), (10.5, 1), (410.0, 3)}
+    assert next_free == 4
+
+
+def test_stream_stitcher_matches_batch_stitch():
+    prev = [_rec(f, 1, 0.0) for f in range(0, 10)] + [_rec(f, 2, 200.0) for f in range(0, 10)]
+    nxt = sorted(
+        [_rec(f, 5, 200.0) for f in range(6, 14)] + [_rec(f, 6, 0.0) for f in range(6, 14)],
+        key=lambda r: r["frame"],
+    )
+    expected, _ = stitch_records([r for r in prev if r["frame"] >= 6], nxt, 10, next_free_id=3)
+    stitcher = StreamStitcher([r for r in prev if r["frame"] >= 6], 10, next_free_id=3)
+    got = []
+    for frame, group in _iter_frame_groups(iter(nxt)):
+        got.extend(stitcher.feed(frame, group))
+    assert got == expected
+    assert {r["player_id"] for r in got} == {1, 2}
+
+
+def test_unmatched_tracks_get_fresh_ids():
+    prev = [_rec(f, 1, 0.0) for f in range(0, 10)]
+    nxt = [_rec(f, 4, 500.0) for f in range(6, 14)]
+    out, next_free = stitch_records(prev, nxt, 10, next_free_id=5)
+    assert {r["player_id"] for r in out} == {5}
+    assert next_free == 6
@@ -0,0 +1,79 @@
+"""Process-level model pool: reuse, tracker reset and eviction of replaced weights."""
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from src.vision.detection import registry
+
+
+class _Tracker:
+    def __init__(self):
+        self.resets = 0
+
+    def reset(self):
+        self.resets += 1
+
+
+class _Model:
+    def __init__(self, path):
+        self.path = path
+        self.predictor = SimpleNamespace(trackers=[_Tracker()], vid_path=["old.mp4"])
+
+    def predict(self, *a, **k):
+        return []
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    loads = []
+
+    def fake_get_model(path=None, *, backend="torch", imgsz=640):
+        loads.append(path)
+        return _Model(path)
+
+    monkeypatch.setattr("src.vision.detection.yolo._get_model", fake_get_model)
+    monkeypatch.setattr(registry, "_POOL", {})
+    monkeypatch.setattr(registry, "_SOURCES", {})
+    monkeypatch.setattr("src.vision.detection.yolo._IDENTITY_CACHE", {})
+    return loads
+
+
+def test_pooled_model_is_reused_and_tracker_reset(tmp_path, pool):
+    weights = tmp_path / "best.pt"
+    weights.write_bytes(b"v1")
+    stats = {}
+    a = registry.get_pooled_model(str(weights), tracker="botsort.yaml", stats=stats)
+    assert stats["model_pooled"] is False
+    b = registry.get_pooled_model(str(weights), tracker="botsort.yaml", stats=stats)
+    assert a is b and stats["model_pooled"] is True and len(pool) == 1
+    assert a.predictor.trackers[0].resets == 2
+    assert a.predictor.vid_path == [None]
+
+
+def test_replaced_weights_evict_the_stale_model(tmp_path, pool):
+    weights = tmp_path / "best.pt"
+    weights.write_bytes(b"v1")
+    old = registry.get_pooled_model(str(weights))
+    mtime_ns = weights.stat().st_mtime_ns
+    weights.write_bytes(b"v2")
+    os.utime(weights, ns=(mtime_ns + 1_000_000, mtime_ns + 1_000_000))  # same size: mtime must tell them apart
+    new = registry.get_pooled_model(str(weights))
+    assert new is not old and len(pool) == 2
+    assert list(registry._POOL.values()) == [new]
+
+
+def test_unchanged_weights_are_hashed_once(tmp_path, pool, monkeypatch):
+    import src.vision.detection.backends as backends
+
+    hashed = []
+    real_sha256 = backends.file_sha256
+    monkeypatch.setattr(backends, "file_sha256", lambda path: hashed.append(path) or real_sha256(path))
+    weights = tmp_path / "best.pt"
+    weights.write_bytes(b"v1")
+    for _ in range(3):
+        registry.get_pooled_model(str(weights))
+    assert len(hashed) == 1
+    weights.write_bytes(b"v1 retrained")
+    registry.get_pooled_model(str(weights))
+    assert len(hashed) == 2 and len(pool) == 2
@@ -0,0 +1,110 @@
+"""Stage 02 latency profile: histogram percentiles, per-frame step split, decode timing, stack sampling."""
+import pickle
+import random
+import time
+
+import numpy as np
+
+import src.vision.profile as profile_mod
+from src.vision.engine import run_threaded
+from src.vision.profile import LatencyHistogram, Stage02Profile, StepClock
+
+
+def test_histogram_percentiles_within_bucket_error_and_merge():
+    rng = random.Random(0)
+    values = [int(rng.lognormvariate(15, 1)) for _ in range(20000)]  # ~ms latencies in ns, long tail
+    a, b = LatencyHistogram(), LatencyHistogram()
+    for i, v in enumerate(values):
+        (a if i % 2 else b).record(v)
+    a.merge(pickle.loads(pickle.dumps(b)))
+    assert a.count == len(values) and a.max_ns == max(values) and a.min_ns == min(values)
+    exact = sorted(values)
+    for q in (0.5, 0.95, 0.99):
+        want = exact[int(q * len(values)) - 1]
+        assert abs(a.percentile(q) - want) / want < 0.02
+    assert a.percentile(1.0) == max(values)
+    assert len(a.counts) < 1000  # fixed-size buckets, not one per sample
+
+
+def test_step_clock_splits_batch_time_over_frames(monkeypatch):
+    now = [0]
+    monkeypatch.setattr(profile_mod, "perf_counter_ns", lambda: now[0])
+    prof = Stage02Profile()
+    clock = StepClock(prof)
+
+    def spend(ns, step):
+        now[0] += ns
+        clock.lap(step)
+
+    clock.start()
+    spend(4000, "tracker")  # whole batch of 2 frames
+    spend(1000, "roi_filter")
+    clock.split(2)
+    for records_ns in (300, 700):
+        spend(records_ns, "records")
+        spend(50, "output")
+        clock.frame_done()
+    d = prof.to_dict()["steps"]
+    assert d["tracker"]["frames"] == 2 and prof.hists["tracker"].total_ns == 4000
+    assert prof.hists["roi_filter"].max_ns == 500
+    assert sorted(prof.hists["records"].counts.values()) == [1, 1] and prof.hists["records"].max_ns == 700
+    assert "decode" not in d and "inference" not in d  # steps nobody timed are left out
+
+
+def test_threaded_engine_profiles_decode_inference_and_post():
+    prof = Stage02Profile(sample_stacks=True, stack_interval_s=0.002)
+    clock = StepClock(prof)
+    closed = []
+
+    def frames():
+        try:
+            for i in range(12):
+                time.sleep(0.002)
+                yield i, np.zeros((2, 2, 3), np.uint8)
+        finally:
+            closed.append(True)
+
+    def infer(batch):
+        t = time.perf_counter_ns()
+        time.sleep(0.004)
+        prof.add("inference", time.perf_counter_ns() - t, len(batch))
+        return [None] * len(batch)
+
+    def post(batch, _results):
+        clock.start()
+        clock.split(len(batch))
+        for _ in batch:
+            time.sleep(0.001)
+            clock.lap("records")
+            clock.frame_done()
+
+    prof.start_sampling()
+    try:
+        run_threaded(prof.timed_frames(frames()), infer, post, batch_size=3)
+    finally:
+        prof.stop_sampling()
+    steps = prof.to_dict()["steps"]
+    assert {s: steps[s]["frames"] for s in steps} == {"decode": 12, "inference": 12, "records": 12}
+    assert steps["decode"]["p50_ms"] >= 2.0 and steps["records"]["p50_ms"] >= 1.0
+    assert 1.0 <= steps["inference"]["p50_ms"] < 4.0  # 4 ms per batch of 3
+    assert closed == [True]
+    threads = {stack.split(";", 1)[0] for stack in prof.stacks}
+    assert "stage02-infer" in threads and "profile-sampler" not in threads
+    assert any("infer (test_stage02_profile.py" in f["function"] for f in prof.hot_functions())
+
+
+def test_profile_round_trips_from_segment_process_and_merges(tmp_path):
+    seg = Stage02Profile(sample_stacks=True)
+    seg.add("inference", 9_000_000, 3)
+    seg.stacks["MainThread;run_tracking (pipeline.py:43)"] = 4
+    seg.note("tracker: runs inside inference (model.track); a decoupled path times it on its own")
+    seg.start_sampling()
+    seg.stop_sampling()
+    parent = Stage02Profile(sample_stacks=True)
+    parent.merge(pickle.loads(pickle.dumps(seg)))
+    parent.merge(pickle.loads(pickle.dumps(seg)))
+    d = parent.to_dict()
+    assert d["steps"]["inference"]["frames"] == 6 and d["steps"]["inference"]["p50_ms"] == 3.0
+    assert d["stack_samples"] >= 8 and len(d["notes"]) == 1
+    parent.write_folded(tmp_path / "stacks.folded")
+    assert "MainThread;run_tracking (pipeline.py:43) 8" in (tmp_path / "stacks.folded").read_text()
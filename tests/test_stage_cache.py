@@ -0,0 +1,94 @@
+"""Stage cache: fingerprints of stage inputs, skips, and invalidation of downstream stages."""
+from src.pipeline.stage_cache import StageCache, content_hash
+from src.utils.io import read_json, write_json
+
+
+def _setup(tmp_path):
+    (tmp_path / "meta").mkdir()
+    write_json(tmp_path / "meta" / "meta.json", {"status": "running"})
+    video = tmp_path / "match.mp4"
+    video.write_bytes(b"frames")
+    return video
+
+
+def _runner(cache, calls):
+    def run(stage, *, params=None, files=(), upstream=(), output=None):
+        def fn():
+            calls.append(stage)
+            if output:
+                (cache.match_dir / output).write_text(stage)
+            return stage
+        return cache.run(stage, fn, version=1, params=params, files=files, upstream=upstream,
+                         outputs=(output,) if output else ())
+    return run
+
+
+def test_unchanged_stages_are_skipped(tmp_path):
+    video = _setup(tmp_path)
+    calls = []
+    run = _runner(StageCache(tmp_path), calls)
+    assert run("02", params={"conf": 0.4}, files=[video], output="tracks.json") == ("02", True)
+    run("06", params={"max_clips": 10}, upstream=("02",))
+    assert run("02", params={"conf": 0.4}, files=[video], output="tracks.json") == (None, False)
+    run("06", params={"max_clips": 10}, upstream=("02",))
+    assert calls == ["02", "06"]
+    # Only the highlight options changed: stage 02 stays cached
+    run("02", params={"conf": 0.4}, files=[video], output="tracks.json")
+    run("06", params={"max_clips": 3}, upstream=("02",))
+    assert calls == ["02", "06", "06"]
+    rec = read_json(tmp_path / "meta" / "meta.json")["stages"]["02"]
+    assert rec["outputs"] == ["tracks.json"] and rec["version"] == 1
+
+
+def test_changed_input_file_reruns_stage_and_downstream(tmp_path):
+    video = _setup(tmp_path)
+    calls = []
+    run = _runner(StageCache(tmp_path), calls)
+    run("02", files=[video], output="tracks.json")
+    run("03", upstream=("02",))
+    video.write_bytes(b"other frames")
+    run("02", files=[video], output="tracks.json")
+    run("03", upstream=("02",))
+    assert calls == ["02", "03", "02", "03"]
+
+
+def test_missing_output_or_force_reruns(tmp_path):
+    video = _setup(tmp_path)
+    calls = []
+    run = _runner(StageCache(tmp_path), calls)
+    run("02", files=[video], output="tracks.json")
+    (tmp_path / "tracks.json").unlink()
+    run("02", files=[video], output="tracks.json")
+    _runner(StageCache(tmp_path, force=True), calls)("02", files=[video], output="tracks.json")
+    assert calls == ["02", "02", "02"]
+    # Per-stage force (e.g. profiling stage 02) reruns that stage only
+    cache = StageCache(tmp_path)
+    assert cache.run("02", lambda: calls.append("02"), version=1, files=[video], force=True)[1]
+    assert not cache.run("02", lambda: calls.append("02"), version=1, files=[video])[1]
+    assert calls == ["02", "02", "02", "02"]
+
+
+def test_failed_stage_is_not_recorded(tmp_path):
+    _setup(tmp_path)
+    cache = StageCache(tmp_path)
+    cache.run("04", lambda: None, version=1)
+
+    def fail():
+        raise RuntimeError("boom")
+    try:
+        cache.run("04", fail, version=2)
+    except RuntimeError:
+        pass
+    assert "04" not in cache.records()
+
+
+def test_content_hash_samples_large_files(tmp_path, monkeypatch):
+    import src.pipeline.stage_cache as stage_cache
+    monkeypatch.setattr(stage_cache, "_FULL_HASH_MAX_BYTES", 64)
+    monkeypatch.setattr(stage_cache, "_SAMPLE_BYTES", 8)
+    path = tmp_path / "big.bin"
+    path.write_bytes(bytes(range(100)))
+    before = content_hash(path)
+    path.write_bytes(bytes(range(99)) + b"\xff")  # tail sample changes
+    assert content_hash(path) != before
+    assert content_hash(tmp_path / "missing.bin") is None
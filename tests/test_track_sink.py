@@ -0,0 +1,108 @@
+"""Streaming track sinks and stage 02 checkpoint/resume on top of them."""
+import json
+
+import pytest
+
+from src.pipeline.checkpoint import TrackCheckpoint, resume_start_frame
+from src.storage.track_sink import TRACK_SINK_FORMATS, open_track_sink
+
+
+def _records(frames, players=3):
+    out = []
+    for f in frames:
+        for p in range(1, players + 1):
+            x = 100.0 * p + f * 0.37
+            out.append({
+                "frame": f, "timestamp": round(f / 30.0, 3), "player_id": p,
+                "x_pixel": round(x + 10.0, 2), "y_pixel": 200.25,
+                "bbox_xyxy": [x, 120.5, x + 20.125, 200.25],
+            })
+    return out
+
+
+def _by_frame(records):
+    frames = {}
+    for r in records:
+        frames.setdefault(r["frame"], []).append(r)
+    return sorted(frames.items())
+
+
+@pytest.mark.parametrize("fmt", TRACK_SINK_FORMATS)
+def test_sink_round_trip(tmp_path, fmt):
+    recs = _records(range(0, 50, 5))
+    sink = open_track_sink(tmp_path, fmt)
+    sink.chunk_size = 7
+    sink.write(recs[:11])
+    sink.write(recs[11:])
+    assert list(sink.iter_records()) == recs
+    assert (sink.records, sink.frames, sink.player_ids) == (len(recs), 10, {1, 2, 3})
+    out = sink.finalize(tmp_path / "tracks.json")
+    assert json.loads(out.read_text()) == recs
+    assert not sink.path.exists()
+
+
+@pytest.mark.parametrize("fmt", TRACK_SINK_FORMATS)
+def test_truncate_rescans_counters_without_state(tmp_path, fmt):
+    sink = open_track_sink(tmp_path, fmt)
+    sink.write(_records(range(4)))
+    size = sink.flush()
+    sink.write(_records(range(4, 8)))
+    sink.flush()
+    sink.truncate(size)
+    assert (sink.records, sink.frames) == (12, 4)
+    assert [r["frame"] for r in sink.iter_records()][-1] == 3
+
+
+def _run(tmp_path, fmt, frames, *, crash_after=None):
+    """Feed frames through a checkpoint; with crash_after, stop there without a final checkpoint."""
+    sink = open_track_sink(tmp_path, fmt)
+    ckpt = TrackCheckpoint(tmp_path, sink, "fp", interval_frames=20, warmup_frames=7)
+    resume = ckpt.load()
+    for frame, recs in _by_frame(_records(f for f in frames if f >= resume)):
+        ckpt.add(frame, recs)
+        if crash_after is not None and frame >= crash_after:
+            sink.flush(fsync=False)  # records past the last checkpoint reached the disk
+            return ckpt, resume
+    ckpt.flush()
+    sink.finalize(tmp_path / "tracks.json")
+    ckpt.clear()
+    return ckpt, resume
+
+
+@pytest.mark.parametrize("fmt", TRACK_SINK_FORMATS)
+def test_resume_after_crash_matches_uninterrupted_run(tmp_path, fmt):
+    frames = range(0, 100)
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    _run(tmp_path / "a", fmt, frames)
+    expected = (tmp_path / "a" / "tracks.json").read_bytes()
+
+    ckpt, resume = _run(tmp_path / "b", fmt, frames, crash_after=57)
+    assert resume == 0
+    saved = json.loads((tmp_path / "b" / "checkpoint.json").read_text())
+    assert saved["last_frame"] == 39 and saved["window"][0] == resume_start_frame(40, 7) == 33
+
+    # Resume: counters come from checkpoint.json and the warm-up window is read from its byte offset
+    sink = open_track_sink(tmp_path / "b", fmt)
+    sink._iter_file_calls = []
+    original = sink._iter_file
+    sink._iter_file = lambda offset=0: (sink._iter_file_calls.append(offset), original(offset))[1]
+    ckpt = TrackCheckpoint(tmp_path / "b", sink, "fp", interval_frames=20, warmup_frames=7)
+    assert ckpt.load() == 40
+    assert sink._iter_file_calls == []  # no rescan on truncate
+    assert (sink.records, sink.frames, sink.max_player_id) == (40 * 3, 40, 3)
+    window = ckpt.window(33)
+    assert sink._iter_file_calls and sink._iter_file_calls[0] > 0
+    assert [r["frame"] for r in window] == [f for f in range(33, 40) for _ in range(3)]
+
+    _, resume = _run(tmp_path / "b", fmt, frames)
+    assert resume == 40
+    assert (tmp_path / "b" / "tracks.json").read_bytes() == expected
+    assert not (tmp_path / "b" / "checkpoint.json").exists()
+
+
+def test_mismatched_fingerprint_starts_over(tmp_path):
+    _run(tmp_path, "jsonl", range(30), crash_after=25)
+    sink = open_track_sink(tmp_path, "jsonl")
+    assert TrackCheckpoint(tmp_path, sink, "other", interval_frames=20).load() == 0
+    assert not sink.path.exists()